@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class calculators:
     # This class is a calculator that does addition, subtraction, multiplication, and division.
 
@@ -18,4 +21,47 @@ class calculators:
     def multiplication(self, a, b):
         # this method multiplies two numbers
         return a * b
-    
\ No newline at end of file
+
+
+class batch_calculators:
+    # This class does the same four operations as calculators, but on whole
+    # sequences or NumPy arrays at once (element by element).
+
+    def addition(self, a, b):
+        # this method adds two sequences of numbers
+        return np.add(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+
+    def subtraction(self, a, b_):
+        # this method subtracts two sequences of numbers
+        return np.subtract(np.asarray(a, dtype=float), np.asarray(b_, dtype=float))
+
+    def multiplication(self, a, b):
+        # this method multiplies two sequences of numbers
+        return np.multiply(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+
+    def division(self, a, b, fill_value=np.nan):
+        # this method divides two sequences of numbers; where b is 0 the result
+        # is fill_value instead of an error
+        a = np.asarray(a, dtype=float)
+        b = np.asarray(b, dtype=float)
+        result = np.full(np.broadcast(a, b).shape, fill_value, dtype=float)
+        np.divide(a, b, out=result, where=b != 0)
+        return result
+
+    def division_with_mask(self, a, b, fill_value=np.nan):
+        # this method divides like division() and also returns a bool array that
+        # is True where b was 0
+        zero = np.asarray(b) == 0
+        return self.division(a, b, fill_value), np.broadcast_to(zero, np.broadcast(np.asarray(a), zero).shape)
+
+    def stream(self, operation, chunks, **options):
+        # this method applies an operation ("addition", "subtraction",
+        # "multiplication" or "division") to an iterable of (a, b) chunks and
+        # yields one result per chunk, so the input never has to be in memory at once.
+        # options such as fill_value only go to the divisions, the other
+        # operations have none.
+        method = getattr(self, operation)
+        if not operation.startswith("division"):
+            options = {}
+        for a, b in chunks:
+            yield method(a, b, **options)
\ No newline at end of file
@@ -1,6 +1,6 @@
-from calculator import calculators
-# This imports the class calculators from the calculator module
-from shopping import ShoppingBasket
-# This imports the class ShoppingBasket from the shopping module
+from calculator import calculators, batch_calculators
+# This imports the classes calculators and batch_calculators from the calculator module
+from shopping import ShoppingBasket, FastShoppingBasket
+# This imports the classes ShoppingBasket and FastShoppingBasket from the shopping module
 
-__all__ = ["calculators", "ShoppingBasket"]
\ No newline at end of file
+__all__ = ["calculators", "batch_calculators", "ShoppingBasket", "FastShoppingBasket"]
\ No newline at end of file
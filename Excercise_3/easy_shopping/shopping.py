@@ -1,3 +1,7 @@
+from collections import Counter
+from types import MappingProxyType
+
+
 class ShoppingBasket:
     # This class represents a shopping basket.
 
@@ -31,4 +35,95 @@ class ShoppingBasket:
     def list_items(self):
         # This method lists all the items in the shopping basket.
         return dict(self.items)
-        # This returns a dictionary of all items in the shopping basket.
\ No newline at end of file
+        # This returns a dictionary of all items in the shopping basket.
+
+
+class FastShoppingBasket:
+    # This class is a shopping basket for collecting many orders. It keeps the
+    # total number of items up to date instead of adding it up on every call,
+    # and __slots__ keeps every basket small.
+    __slots__ = ("_items", "_total", "_view")
+
+    def __init__(self, items=None):
+        # This method initiates the shopping basket, optionally with items.
+        self._items = {}
+        self._total = 0
+        self._view = MappingProxyType(self._items)
+        # This is a read-only view of the items that follows every change.
+        if items:
+            self.add_many(items)
+
+    @property
+    def items(self):
+        # This property gives read-only access to the items.
+        return self._view
+
+    def __getstate__(self):
+        # This method gives what pickle saves: the read-only view cannot be
+        # pickled, so only the items and the total are kept.
+        return {"items": self._items, "total": self._total}
+
+    def __setstate__(self, state):
+        # This method restores a pickled basket and makes a new view for it.
+        self._items = state["items"]
+        self._total = state["total"]
+        self._view = MappingProxyType(self._items)
+
+    @staticmethod
+    def _quantities(items):
+        # This method turns a dict or Counter of name: quantity, or an iterable
+        # of names (every name counts once), into a list of (name, quantity).
+        if hasattr(items, "items"):
+            return list(items.items())
+        return list(Counter(items).items())
+
+    def add_an_item(self, name, Quantity=1):
+        # This method adds an item to the shopping basket.
+        if Quantity < 1:
+            raise ValueError("Quantity must be at least 1")
+        self._items[name] = self._items.get(name, 0) + Quantity
+        self._total += Quantity
+
+    def remove_an_item(self, name, Quantity=1):
+        # This method removes an item from the shopping basket.
+        if name not in self._items:
+            raise ValueError("Item is not in the basket")
+        if Quantity is None or Quantity >= self._items[name]:
+            self._total -= self._items.pop(name)
+        else:
+            self._items[name] -= Quantity
+            self._total -= Quantity
+
+    def add_many(self, items):
+        # This method adds many items at once. Nothing is added if one of the
+        # quantities is below 1.
+        quantities = self._quantities(items)
+        if any(quantity < 1 for _, quantity in quantities):
+            raise ValueError("Quantity must be at least 1")
+        basket = self._items
+        for name, quantity in quantities:
+            basket[name] = basket.get(name, 0) + quantity
+            self._total += quantity
+
+    def remove_many(self, items):
+        # This method removes many items at once. Nothing is removed if one of
+        # the items is not in the basket.
+        quantities = self._quantities(items)
+        if any(name not in self._items for name, _ in quantities):
+            raise ValueError("Item is not in the basket")
+        for name, quantity in quantities:
+            self.remove_an_item(name, quantity)
+
+    def merge(self, other):
+        # This method adds all items of another basket (for example one filled in
+        # a worker process) to this basket and returns this basket.
+        self.add_many(other.list_items())
+        return self
+
+    def total_items(self):
+        # This method returns the total number of items in the shopping basket.
+        return self._total
+
+    def list_items(self):
+        # This method returns a read-only view of the items, nothing is copied.
+        return self._view
\ No newline at end of file
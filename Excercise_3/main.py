@@ -1,5 +1,5 @@
-from calculator import calculators
-# This imports the class calculators from the calculator module
+from calculator import calculators, batch_calculators
+# This imports the classes calculators and batch_calculators from the calculator module
 
 def calculator_tests():
     # This function tests the calculators class.
@@ -20,6 +20,15 @@ def calculator_tests():
             print(f"{desc} = Error: {e}")
 
 
+def batch_calculator_tests():
+    # This function tests the batch_calculators class: all divisions in one call,
+    # a division by zero gives nan instead of an error.
+    calc = batch_calculators()
+    a = [7, 34, 144, 45, 12]
+    b = [5, 12, 2, 0, 3]
+    print("a + b =", calc.addition(a, b))
+    print("a / b =", calc.division(a, b))
+
 
 # Calling the shopping Module
 from shopping import ShoppingBasket
@@ -45,4 +54,6 @@ def shopping_tests():
 if __name__ == "__main__":
     calculator_tests()
     # This function runs the calculator tests.
+    batch_calculator_tests()
+    # This function runs the batch calculator tests.
     shopping_tests()
\ No newline at end of file
@@ -1,35 +1,30 @@
 # exercise_4_2.py
 # Task here is to extract Name and X,Y of selected school features into a CSV.
 
+import os
 from qgis.core import QgsProject
+from muenster_tools.point_export import export_points_csv
+
+# Where the CSV file is written, and whether only the selected schools (True)
+# or the whole layer (False) are exported
+output_path = os.path.join(os.path.expanduser('~'), 'SchoolReport.csv')
+selected_only = True
+# Whether longitude / latitude (WGS84) columns are written next to the UTM X/Y
+add_wgs84 = True
 
 # find the Schools layer by name
 layer_list = QgsProject.instance().mapLayersByName('Schools')
 if not layer_list:
     raise Exception("Layer not found. Please check the layer name.")
 layer = layer_list[0]
-# Fetch only the selected features
-selected_feats = layer.selectedFeatures()
-if not selected_feats:
+# Check that something is selected before exporting the selection
+if selected_only and layer.selectedFeatureCount() == 0:
     raise Exception("No features selected. Please select at least one school first.")
 
-# Writing the CSV file
-output_path = r'C:\Users\User\Desktop\PIQAA\SchoolReport.csv'  
-with open(output_path, 'w', encoding='utf-8') as f:
-    # Write the header
-    f.write('Name;X;Y\n')
-    
-    # Loop through each selected feature
-    for feat in selected_feats:
-        name = feat['Name']  # attribute field
-        geom = feat.geometry()
-        # If the layer is point-based, asPoint() gives you a QgsPointXY
-        pt = geom.asPoint()
-        x = pt.x()
-        y = pt.y()
-        # Write a semicolon-delimited line
-        f.write(f"{name};{x};{y}\n")
+# Writing the CSV file: only the Name field and the point geometry are read,
+# and the rows are written in batches
+count = export_points_csv(layer, output_path, name_field='Name', selected_only=selected_only,
+                          wgs84=add_wgs84)
 
 #  Inform user about the output
-print(f"SchoolReport.csv written with {len(selected_feats)} records to:\n{output_path}")
-
+print(f"SchoolReport.csv written with {count} records to:\n{output_path}")
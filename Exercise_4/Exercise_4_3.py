@@ -1,10 +1,12 @@
 import os
 import sys
+import time
 from qgis.core import (
     QgsApplication,
     QgsVectorLayer,
     QgsProject
 )
+from muenster_tools.project_builder import build_project, format_report, shapefile_paths
 
 # Configuring the QGIS install path 
 QGIS_PREFIX = r"C:\OSGeo4W\apps\qgis" 
@@ -19,26 +21,36 @@ qgs.initQgis()
 data_folder  = r"C:\Users\User\Desktop\PIQAA\Muenster"
 project_path = r"C:\Users\User\Desktop\PIQAA\myFirstProject.qgs"
 
-# Iterating all .shp files
-shp_files = [
-    os.path.join(data_folder, fn)
-    for fn in os.listdir(data_folder)
-    if fn.lower().endswith(".shp")
-]
+# Open the layers in parallel threads (True) or one after another (False),
+# and build missing .qix spatial indexes
+parallel = True
+max_workers = None
 
 # start up a fresh project
 project = QgsProject.instance()
 project.clear()
 
-# Load each shapefile
-for shp in shp_files:
-    layer_name = os.path.splitext(os.path.basename(shp))[0]
-    layer = QgsVectorLayer(shp, layer_name, "ogr")
-    if not layer.isValid():
-        print(f" Failed to load {layer_name}")
-        continue
-    project.addMapLayer(layer)
-    print(f" Loaded {layer_name}")
+start = time.perf_counter()
+if parallel:
+    # the layers are opened in a thread pool and added in file name order
+    results = build_project(project, data_folder, max_workers=max_workers)
+    for result in results:
+        if result["layer"] is None:
+            print(f" Failed to load {result['name']}")
+        else:
+            print(f" Loaded {result['name']}")
+    print(format_report(results))
+else:
+    # Load each shapefile
+    for shp in shapefile_paths(data_folder):
+        layer_name = os.path.splitext(os.path.basename(shp))[0]
+        layer = QgsVectorLayer(shp, layer_name, "ogr")
+        if not layer.isValid():
+            print(f" Failed to load {layer_name}")
+            continue
+        project.addMapLayer(layer)
+        print(f" Loaded {layer_name}")
+print(f" Layers loaded in {time.perf_counter() - start:.2f} s")
 
 # Save the project
 if project.write(project_path):
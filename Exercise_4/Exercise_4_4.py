@@ -4,21 +4,36 @@
 # Importing the necessary libraries
 import processing
 from qgis.core import QgsProject
+from muenster_tools.aggregate_store import AggregateStore, update_store, population_csv_for
+
+# Read the counts from the precomputed district store (True) or run
+# qgis:countpointsinpolygon again (False)
+use_store = True
 
 # Setting up the layers
 schools_layer   = QgsProject.instance().mapLayersByName('Schools')[0]
 districts_layer = QgsProject.instance().mapLayersByName('Muenster_City_Districts')[0]
-# Setting  up the parameters
-params = {
-    'POLYGONS': districts_layer,
-    'POINTS':   schools_layer,
-    'FIELD':    'school_count',   # name of the new count field
-    'OUTPUT':   'memory:'         # keep the result in memory
-}
-#processing.run('qgis:countpointsinpolygon', params)
-result = processing.run('qgis:countpointsinpolygon', params)
-out_layer = result['OUTPUT']
-for feat in out_layer.getFeatures():
-    name  = feat['Name']           # or whatever your district-name field is
-    count = feat['school_count']   # the count field you specified
-    print(f"{name}: {count}")
+
+if use_store:
+    # The schools are only counted again when the Schools or district layer has changed
+    with AggregateStore() as store:
+        update_store(store, districts_layer, {'Schools': (schools_layer, 'SchoolType')},
+                     population_csv_for(districts_layer))
+        counts = store.counts('Schools')
+    for name in sorted(counts):
+        print(f"{name}: {counts[name]}")
+else:
+    # Setting  up the parameters
+    params = {
+        'POLYGONS': districts_layer,
+        'POINTS':   schools_layer,
+        'FIELD':    'school_count',   # name of the new count field
+        'OUTPUT':   'memory:'         # keep the result in memory
+    }
+    #processing.run('qgis:countpointsinpolygon', params)
+    result = processing.run('qgis:countpointsinpolygon', params)
+    out_layer = result['OUTPUT']
+    for feat in out_layer.getFeatures():
+        name  = feat['Name']           # or whatever your district-name field is
+        count = feat['school_count']   # the count field you specified
+        print(f"{name}: {count}")
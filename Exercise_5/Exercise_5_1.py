@@ -3,8 +3,10 @@
 
 # Importing necessary modules
 from qgis.PyQt.QtWidgets import QInputDialog, QMessageBox
-from qgis.core import QgsProject, QgsVectorLayer, QgsPointXY, QgsFeatureRequest, QgsDistanceArea
+from qgis.core import QgsProject, QgsVectorLayer, QgsFeatureRequest
 from qgis.utils import iface
+from muenster_tools.prepared_polygon import prepared_feature
+from muenster_tools.distances import ground_distances
 
 # first thing is to get the layers ready
 districts_Layer = QgsProject.instance().mapLayersByName("Muenster_City_Districts")[0]
@@ -34,11 +36,14 @@ else:
     district_centroid = district_geometry.centroid().asPoint()
 
     # Filter schools within the selected district
+    # all schools in the bounding box are tested against the district in one vectorized call;
+    # the district is prepared once and kept for the next run
     request = QgsFeatureRequest().setFilterRect(district_geometry.boundingBox())
-    inside = [
-        feature for feature in schools_Layer.getFeatures(request)
-        if district_geometry.contains(feature.geometry())
-    ]
+    candidates = list(schools_Layer.getFeatures(request))
+    coordinates = [(feature.geometry().asPoint().x(), feature.geometry().asPoint().y())
+                   for feature in candidates]
+    mask = prepared_feature(districts_Layer, selected[0].id()).contains_points(coordinates)
+    inside = [feature for feature, is_inside in zip(candidates, mask) if is_inside]
     if not inside:
         QMessageBox.information(parent, f"schools in {sDistrict}", "No schools found in this district")
     else:
@@ -49,23 +54,21 @@ else:
         lines = []
     
         # Distance calculation Task
-        da = QgsDistanceArea()
-        da.setSourceCrs(schools_Layer.crs(), QgsProject.instance().transformContext())
-        da.setEllipsoid(schools_Layer.crs().ellipsoidAcronym())
-        for feature in inside:
+        # the distances of all schools to the centroid on the ellipsoid are computed
+        # in one call from the UTM coordinates (EPSG:25832)
+        school_points = [(feature.geometry().asPoint().x(), feature.geometry().asPoint().y())
+                         for feature in inside]
+        distances = ground_distances(school_points, (district_centroid.x(), district_centroid.y()))
+        for feature, distance in zip(inside, distances):
             # Get the school name
             school_name = feature["Name"]
             stype = feature["SchoolType"] 
             # centriod distance
-            dist = da.measureLine(
-                QgsPointXY(feature.geometry().asPoint()),
-                QgsPointXY(district_centroid.x(), district_centroid.y())
-            ) / 1000
-            dist = round(dist, 2)
+            dist = round(distance / 1000, 2)
             # build the line
             lines.append(f"{school_name} ({stype}) - {dist} km")
-            # Now select the school
-            schools_Layer.selectByExpression(f"\"Name\" = '{school_name}'", QgsVectorLayer.AddToSelection)
+        # Now select all schools at once
+        schools_Layer.selectByIds([feature.id() for feature in inside], QgsVectorLayer.AddToSelection)
 
         # To show some results
         QMessageBox.information(
@@ -1,6 +1,7 @@
 from qgis.PyQt.QtWidgets       import QInputDialog, QMessageBox
-from qgis.core          import ( QgsProject, QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsPointXY, QgsGeometry)
+from qgis.core          import QgsProject
 from qgis.utils                import iface
+from muenster_tools.reverse_geocode import lookup_for_layer
 
 # Ask the user  to input Coordinates
 parent = iface.mainWindow()
@@ -20,23 +21,11 @@ else:
         QMessageBox.warning(parent, "Geoguesser_Game", "Invalid input format. Please enter coordinates as latitude, longitude.")
         raise e
     
-# Transform the coordinates from WGS84 to the layer CRS
+# Find the district of the coordinates
+# the lookup keeps the coordinate transform and the district polygons between runs,
+# so only the first question has to build them
 district_layer = QgsProject.instance().mapLayersByName("Muenster_City_Districts")[0]
-crs84 = QgsCoordinateReferenceSystem("EPSG:4326") #WGS84
-crs_layer = district_layer.crs()       # Etrs89 / UTM zone 32N
-transform = QgsCoordinateTransform(crs84, crs_layer, QgsProject.instance()) # creates a coordinate transform object
-
-# Create a point geometry from the coordinates
-point_in_wgs84 = QgsPointXY( longitude, latitude)
-point_in_layer = transform.transform(point_in_wgs84) 
-point_geometry = QgsGeometry.fromPointXY(point_in_layer)
-
-# test if the point is within the district layer
-found = None
-for feature in district_layer.getFeatures():
-    if feature.geometry().contains(point_geometry):
-        found = feature['Name']
-        break
+found = lookup_for_layer(district_layer).lookup(latitude, longitude)
 
 # Display the result
 if found:
@@ -11,17 +11,31 @@ from qgis.core import (
     QgsProcessingAlgorithm,
     QgsProcessingParameterEnum,
     QgsProcessingParameterFileDestination,
+    QgsProcessingParameterBoolean,
+    QgsProcessingParameterFolderDestination,
     QgsProcessingException
 )
 from qgis.PyQt.QtCore import QCoreApplication
-from qgis.utils import iface
 from pathlib import Path
-import tempfile, time
 from qgis.core import QgsFeature, QgsGeometry
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-import matplotlib.pyplot as plt
-from collections import Counter
+from muenster_tools import map_data, layer_points, profile_from_store
+from muenster_tools.profile_report import write_profile_pdf, write_profiles
+from muenster_tools.district_catalogue import catalogue_for_layer
+from muenster_tools.aggregate_store import AggregateStore, update_store, population_csv_for
+from muenster_tools.point_index import index_for_layer
+from muenster_tools.orthophoto import orthophoto
+import os
+
+# Helper function to get the cached district catalogue of the project
+def getDistrictCatalogue():
+    """
+    Returns the district catalogue of the layer 'Muenster_City_Districts'.
+    It is read once and only read again when the layer data changes.
+    """
+    layer_list = QgsProject.instance().mapLayersByName("Muenster_City_Districts")
+    if not layer_list:
+        raise ValueError("Layer 'Muenster_City_Districts' not found.")
+    return catalogue_for_layer(layer_list[0])
 
 # Helper function to get the list of districts from the project
 def getDistrictNames():
@@ -29,13 +43,56 @@ def getDistrictNames():
     Returns a sorted list of district names Alphabetically
     from the layer 'Muenster_City_Districts'
     """
-    layer_list = QgsProject.instance().mapLayersByName("Muenster_City_Districts")
-    if not layer_list:
-        raise ValueError("Layer 'Muenster_City_Districts' not found.")
-    layer = layer_list[0]
-    district_names = [feature["Name"] for feature in layer.getFeatures()]
-    district_names.sort()
-    return district_names
+    return getDistrictCatalogue().names()
+
+# Helper function to bring the district store up to date for a theme
+def updateDistrictStore(store, district_layer, theme, findlayer):
+    """
+    Counts the households, the theme layer and the parcel overlay of all districts
+    again where the layers have changed, and returns the theme layer name.
+    """
+    theme_layer_name = "Schools" if theme == "Schools" else "public_swimming_pools"
+    type_field = "SchoolType" if theme == "Schools" else "Type"
+    # the parcels are overlaid with the districts, so parcels that cross
+    # the district boundary are counted too
+    update_store(store, district_layer, {
+        "House_Numbers": (findlayer("House_Numbers"), None),
+        theme_layer_name: (findlayer(theme_layer_name), type_field),
+    }, population_csv_for(district_layer),
+        overlay_layers={"Muenster_Parcels": findlayer("Muenster_Parcels")})
+    return theme_layer_name
+
+# Helper function to get the map of one district
+def districtMap(district, households_layer, theme_layer, theme):
+    """
+    Returns the map data of a district from the catalogue: its households and
+    theme points, and the aerial image below it when it is next to the shapefile.
+    """
+    geometry = district["geometry"]
+
+    # the positions of the features of a layer inside the district
+    def members(layer):
+        if layer is None:
+            return []
+        return index_for_layer(layer).contained_positions(geometry)
+
+    # The map is drawn straight from the geometries, without the map canvas
+    data = map_data(
+        geometry,
+        layer_points(households_layer, members(households_layer)),
+        layer_points(theme_layer, members(theme_layer)),
+        theme,
+    )
+    # If the aerial image is next to the district shapefile, only the part
+    # under the district is read and drawn below the map
+    district_layer = getDistrictCatalogue().layer
+    image_path = os.path.join(os.path.dirname(district_layer.source().split("|")[0]),
+                              "Luftbild_MS.tif")
+    if os.path.exists(image_path):
+        bbox = district["bbox"]
+        data["background"] = orthophoto(image_path).read_window(
+            (bbox.xMinimum(), bbox.yMinimum(), bbox.xMaximum(), bbox.yMaximum()), max_size=1000)
+    return data
 
 # This class defines the custom processing algorithm built for creating a city district profile.
 class CreateCityDistictsProfile(QgsProcessingAlgorithm):
@@ -104,17 +161,96 @@ class CreateCityDistictsProfile(QgsProcessingAlgorithm):
                 fileFilter="PDF files (*.pdf)",
             )
         )
+        # Option to draw the pie chart as vector graphics instead of a png
+        self.addParameter(
+            QgsProcessingParameterBoolean(
+                "VECTOR_PIE",
+                QCoreApplication.translate(
+                    "CreateCityDistrictsProfile",
+                    "Draw the pie chart as vector graphics"
+                ),
+                defaultValue=False,
+            )
+        )
+        # Batch mode: one PDF per district written into a folder
+        self.addParameter(
+            QgsProcessingParameterBoolean(
+                "ALL_DISTRICTS",
+                QCoreApplication.translate(
+                    "CreateCityDistrictsProfile",
+                    "Create profiles for all districts"
+                ),
+                defaultValue=False,
+            )
+        )
+        self.addParameter(
+            QgsProcessingParameterFolderDestination(
+                "OUTPUT_FOLDER",
+                QCoreApplication.translate(
+                    "CreateCityDistrictsProfile",
+                    "Save all district PDFs to"
+                ),
+                optional=True,
+            )
+        )
+
+    # This function creates the profiles of all districts in one run
+    def processAllDistricts(self, theme, output_folder, vector_pie, feedback):
+        def findlayer(layer_name):
+            layer_list = QgsProject.instance().mapLayersByName(layer_name)
+            if not layer_list:
+                feedback.pushInfo(f"Layer '{layer_name}' not found, returning count = 0")
+                return None
+            return layer_list[0]
+
+        catalogue = getDistrictCatalogue()
+
+        # The numbers of all districts come from the district store; the layers
+        # are only counted again when they have changed
+        with AggregateStore() as store:
+            theme_layer_name = updateDistrictStore(store, catalogue.layer, theme, findlayer)
+            profiles = [profile_from_store(store.district(name), theme, theme_layer_name)
+                        for name in store.district_names()]
+        feedback.pushInfo(f"Counted objects for {len(profiles)} districts")
+        feedback.setProgress(50)
+
+        households_layer = findlayer("House_Numbers")
+        theme_layer = findlayer(theme_layer_name)
+        for profile in profiles:
+            district = catalogue.district(profile["district_name"])
+            profile["map"] = districtMap(district, households_layer, theme_layer, theme)
+
+        # The maps are drawn without the map canvas, so the PDFs and their maps
+        # are made together in a process pool
+        Path(output_folder).mkdir(parents=True, exist_ok=True)
+        jobs = []
+        for profile in profiles:
+            output_file = str(Path(output_folder) / f"{profile['district_name']}.pdf")
+            jobs.append((profile, output_file, None))
+        written = write_profiles(jobs, vector_pie=vector_pie)
+        feedback.pushInfo(f"{len(written)} PDF reports generated successfully.")
+        return {"OUTPUT_FOLDER": output_folder}
 
     # This function will read the parameters and execute the algorithm
     def processAlgorithm(self, parameters, context, feedback):
-        district_index = self.parameterAsEnum(parameters, "DISTRICT", context)
-        district_list = getDistrictNames()
-        district_name = district_list[district_index]
-
         # Getting the theme index and corresponding theme name
         theme_index = self.parameterAsEnum(parameters, "THEME", context)
         themes = ["Schools", "Pools"]
         theme = themes[theme_index]
+        vector_pie = self.parameterAsBoolean(parameters, "VECTOR_PIE", context)
+
+        # Batch mode for all districts
+        if self.parameterAsBoolean(parameters, "ALL_DISTRICTS", context):
+            output_folder = self.parameterAsString(parameters, "OUTPUT_FOLDER", context)
+            if not output_folder:
+                raise QgsProcessingException("Please choose a folder for the district PDFs.")
+            feedback.pushInfo(f"Theme: {theme}")
+            feedback.pushInfo(f"Output folder: {output_folder}")
+            return self.processAllDistricts(theme, output_folder, vector_pie, feedback)
+
+        district_index = self.parameterAsEnum(parameters, "DISTRICT", context)
+        catalogue = getDistrictCatalogue()
+        district_name = catalogue.names()[district_index]
 
         # Getting the output file path from the parameters
         output_file = self.parameterAsFileOutput(parameters, "OUTPUT", context)
@@ -124,123 +260,33 @@ class CreateCityDistictsProfile(QgsProcessingAlgorithm):
         feedback.pushInfo(f"Theme: {theme}")
         feedback.pushInfo(f"Output: {output_file}")
         
-        # Getting the district layer and the feature for the selected district
-        district_layer = QgsProject.instance().mapLayersByName("Muenster_City_Districts")[0]
-        
-        # Finding the feature for the selected district
-        district_feature = None
-        for feature in district_layer.getFeatures():
-            if feature["Name"] == district_name:
-                district_feature = feature
-                break
+        # Getting the selected district from the catalogue, without scanning the layer
+        district = catalogue.district(district_name)
         # If no feature is found, raise an exception
-        if district_feature is None:
+        if district is None:
             raise QgsProcessingException(
                 f"District '{district_name}' not found."
             )
-        # Extracting the parent district name, geometry, and area
-        parent_name = district_feature["P_District"]
-        geometry = district_feature.geometry()
-        area_m2 = geometry.area()
-        area_km2 = round(area_m2 / 1_000_000, 2)
-         
-        # Function to count points in a layer that fall within the district geometry
-        def countpoints(layer_name, field_name):
+        # Function to find a layer of the project, or None if it is not loaded
+        def findlayer(layer_name):
             layer_list = QgsProject.instance().mapLayersByName(layer_name)
             if not layer_list:
                 feedback.pushInfo(f"Layer '{layer_name}' not found, returning count = 0")
-                return 0
-            layer = layer_list[0]
-            count = 0
-            for point in layer.getFeatures():
-                if geometry.contains(point.geometry()):
-                    count += 1
-            return count      # Count points in the specified layer that fall within the district geometry
-        
-        # Counting households, parcels, and theme-specific points
-        households_count = countpoints("House_Numbers", "AnyField")
-        parcels_count = countpoints("Muenster_Parcels", "AnyField")
-        theme_layer_name = "Schools" if theme == "Schools" else "public_swimming_pools"
-        theme_count_raw = countpoints(theme_layer_name, "Name")
-        
-        # Preparing the text for the theme count
-        if theme_count_raw == 0:
-            theme_count_text = f"No {theme.lower()} in this district"
-        else:
-            theme_count_text = f"{theme}: {theme_count_raw}"
-
-        # Building a pie chart for the theme layer if it exists
-        type_counts = Counter()
-        layer_list = QgsProject.instance().mapLayersByName(theme_layer_name)
-        if layer_list:
-            tlayer = layer_list[0]
-            for pt in tlayer.getFeatures():
-                if geometry.contains(pt.geometry()):
-                    if theme == "Schools":
-                            t = pt["SchoolType"]
-                    else:  
-                            t = pt["Type"]
-                    type_counts[t] += 1
-        # If the theme layer exists, count the types and prepare data for the pie chart
-        pie_path = None
-        if type_counts:
-            labels = list(type_counts.keys())
-            sizes  = list(type_counts.values())
-            # Creating a pie chart using matplotlib
-            fig, ax = plt.subplots(figsize=(4, 4))
-            ax.pie(sizes, labels=labels, autopct="%1.1f%%", startangle=90)
-            ax.axis("equal")
-
-           # Saving the pie chart to a temporary file
-            pie_path = str(Path(tempfile.gettempdir()) / f"{district_name}_pie.png")
-            fig.savefig(pie_path, bbox_inches="tight")
-            plt.close(fig)
-        
+                return None
+            return layer_list[0]
 
-        # Setting the map canvas to the district geometry and saving the map as an image
-        iface.mapCanvas().setExtent(geometry.boundingBox())
-        iface.mapCanvas().refresh()
-        time.sleep(1)
+        # The counts, types and population of all districts are kept in the
+        # district store; the layers are only counted again when they have changed
+        with AggregateStore() as store:
+            theme_layer_name = updateDistrictStore(store, catalogue.layer, theme, findlayer)
+            numbers = store.district(district_name)
         feedback.setProgress(50)
-        # Save the map canvas as an image
-        image_path = str(Path(tempfile.gettempdir()) / f"{district_name}.png")
-        iface.mapCanvas().saveAsImage(image_path)
- 
-        # Creating the PDF report using ReportLab
-        c = canvas.Canvas(output_file, pagesize=A4)
-        width, height = A4
-    
-        # Setting the PDF title and adding district information
-        c.setFont("Helvetica", 16)
-        c.drawString(100, height - 50, f"City District Profile: {district_name}")
-
-        # Adding district information to the PDF
-        c.setFont("Helvetica", 12)
-        text = (
-            f"Parent District: {parent_name}\n"
-            f"District Name: {district_name}\n"
-            f"Area: {area_km2} km²\n"
-            f"Households: {households_count}\n"
-            f"Parcels: {parcels_count}\n"
-            f"{theme_count_text}"
-        )
-        
-        # this adds the text to the PDF
-        y = height - 100
-        for line in text.split("\n"):
-            c.drawString(100, y, line)
-            y -= 20
-
-        # Adding the map image to the PDF
-        c.drawImage(image_path, 50, 200, width=500, preserveAspectRatio=True, mask="auto")
-
-        #Embedding  the pie chart 
-        if pie_path:
-            c.drawImage(pie_path, 50, 50, width=200, preserveAspectRatio=True, mask="auto")
-        
 
-        c.showPage()
-        c.save()
+        # Creating the PDF report using ReportLab, with the map in memory
+        profile = profile_from_store(numbers, theme, theme_layer_name)
+        profile["map"] = districtMap(district, findlayer("House_Numbers"),
+                                     findlayer(theme_layer_name), theme)
+        write_profile_pdf(profile, output_file, vector_pie=vector_pie)
         feedback.pushInfo("PDF report generated successfully.")
 
         return {"OUTPUT": output_file}
@@ -0,0 +1,59 @@
+# benchmark_nearest_neighbour.py
+# Compares the grid based nearest neighbour search from muenster_tools with
+# measuring every pair, on the Schools and House_Numbers shapefiles. It reads the
+# shapefiles directly, so no QGIS is needed:
+#   python benchmarks/benchmark_nearest_neighbour.py
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from muenster_tools.shapefile_reader import open_shapefile
+from muenster_tools.nearest_neighbour import PointGrid, brute_force_nearest
+
+data_folder = os.path.join(os.path.dirname(__file__), "..", "Muenster")
+
+
+def compare(title, points, queries, k):
+    # This function runs both searches, checks that they agree and prints the times
+    start = time.perf_counter()
+    grid = PointGrid(points)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, grid_distances = grid.nearest(queries, k)
+    grid_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, brute_distances = brute_force_nearest(points, queries, k)
+    brute_time = time.perf_counter() - start
+
+    # positions can differ for points at the same distance, the distances cannot
+    same = np.allclose(grid_distances, brute_distances)
+    print(title)
+    print(f"  brute force    : {brute_time:8.3f} s")
+    print(f"  grid           : {grid_time:8.3f} s (+ {build_time:.3f} s to build)")
+    print(f"  speedup        : {brute_time / max(grid_time, 1e-9):8.1f} x, same result: {same}")
+
+
+def main():
+    households = np.array(open_shapefile(data_folder, "House_Numbers").points())[:, :2]
+    schools = np.array(open_shapefile(data_folder, "Schools").points())[:, :2]
+
+    compare(f"Nearest school for all {len(households)} households", schools, households, 1)
+    compare(f"3 nearest schools for all {len(households)} households", schools, households, 3)
+    sample = households[::10]
+    compare(f"5 nearest households for {len(sample)} households", households, sample, 5)
+
+    grid = PointGrid(households)
+    start = time.perf_counter()
+    found = grid.within(schools, 500)
+    radius_time = time.perf_counter() - start
+    print(f"Households within 500 m of each of the {len(schools)} schools: {radius_time:.3f} s, "
+          f"{sum(len(positions) for positions, _ in found)} found")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# benchmark_point_counting.py
+# Compares the old full scan in countpoints (Exercise_7.py) with the grid index
+# from muenster_tools on the Muenster data. Run it with the python of a QGIS install:
+#   python benchmarks/benchmark_point_counting.py
+
+import os
+import sys
+import time
+from qgis.core import QgsApplication, QgsVectorLayer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from muenster_tools.point_index import FeatureIndex, count_points_full_scan
+
+data_folder = os.path.join(os.path.dirname(__file__), "..", "Muenster")
+
+
+def load(name):
+    # This function loads a shapefile from the Muenster folder
+    layer = QgsVectorLayer(os.path.join(data_folder, name + ".shp"), name, "ogr")
+    if not layer.isValid():
+        raise Exception(f"Could not load {name}")
+    return layer
+
+
+def main():
+    districts = load("Muenster_City_Districts")
+    district_features = list(districts.getFeatures())
+
+    for layer_name in ["House_Numbers", "Muenster_Parcels", "Schools"]:
+        layer = load(layer_name)
+
+        # the old way: one full scan of the layer per district
+        start = time.perf_counter()
+        scan_counts = [count_points_full_scan(layer, d.geometry()) for d in district_features]
+        scan_time = time.perf_counter() - start
+
+        # the new way: build the index once, then query every district
+        start = time.perf_counter()
+        index = FeatureIndex.from_layer(layer)
+        build_time = time.perf_counter() - start
+        start = time.perf_counter()
+        index_counts = [index.count_contained(d.geometry()) for d in district_features]
+        query_time = time.perf_counter() - start
+
+        if scan_counts != index_counts:
+            print(f"{layer_name}: counts differ!")
+        print(f"{layer_name} ({layer.featureCount()} features, {len(district_features)} districts)")
+        print(f"  full scan : {scan_time:8.3f} s")
+        print(f"  index     : {build_time + query_time:8.3f} s "
+              f"(build {build_time:.3f} s, queries {query_time:.3f} s)")
+        print(f"  speedup   : {scan_time / max(build_time + query_time, 1e-9):8.1f} x")
+
+
+if __name__ == "__main__":
+    qgs = QgsApplication([], False)
+    qgs.initQgis()
+    main()
+    qgs.exitQgis()
@@ -0,0 +1,73 @@
+# benchmark_point_in_polygon.py
+# Compares a point by point ray casting test (like one contains call per feature)
+# with the vectorized kernel from muenster_tools on House_Numbers. It reads the
+# shapefiles directly, so no QGIS is needed:
+#   python benchmarks/benchmark_point_in_polygon.py
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from muenster_tools.shapefile_reader import open_shapefile
+from muenster_tools.point_in_polygon import points_in_polygon, points_in_polygons
+from muenster_tools.prepared_polygon import PreparedPolygon
+
+data_folder = os.path.join(os.path.dirname(__file__), "..", "Muenster")
+
+
+def point_in_rings(x, y, rings):
+    # This function is the plain python ray casting test for a single point
+    inside = False
+    for ring in rings:
+        for i in range(len(ring) - 1):
+            x1, y1 = ring[i]
+            x2, y2 = ring[i + 1]
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+    return inside
+
+
+def main():
+    households = open_shapefile(data_folder, "House_Numbers")
+    districts = open_shapefile(data_folder, "Muenster_City_Districts")
+    points = np.array(households.points())
+    names = districts.column("Name")
+    all_rings = [districts.rings(i) for i in range(len(districts))]
+
+    # one district, every household point
+    rings = all_rings[0]
+    python_rings = [ring.tolist() for ring in rings]
+    start = time.perf_counter()
+    loop_count = sum(point_in_rings(x, y, python_rings) for x, y in points.tolist())
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    kernel_count = int(points_in_polygon(points, rings).sum())
+    kernel_time = time.perf_counter() - start
+
+    print(f"{len(points)} household points against '{names[0]}'")
+    print(f"  point by point : {loop_time:8.3f} s ({loop_count} inside)")
+    print(f"  vectorized     : {kernel_time:8.3f} s ({kernel_count} inside)")
+    print(f"  speedup        : {loop_time / max(kernel_time, 1e-9):8.1f} x")
+
+    start = time.perf_counter()
+    prepared = PreparedPolygon(rings)
+    prepare_time = time.perf_counter() - start
+    start = time.perf_counter()
+    prepared_count = int(prepared.contains_points(points).sum())
+    prepared_time = time.perf_counter() - start
+    print(f"  prepared       : {prepared_time:8.3f} s ({prepared_count} inside, "
+          f"+ {prepare_time:.3f} s to prepare)")
+
+    # every household point against every district
+    start = time.perf_counter()
+    owner = points_in_polygons(points, all_rings)
+    join_time = time.perf_counter() - start
+    print(f"All {len(all_rings)} districts: {join_time:.3f} s, "
+          f"{int((owner >= 0).sum())} of {len(points)} points assigned")
+
+
+if __name__ == "__main__":
+    main()
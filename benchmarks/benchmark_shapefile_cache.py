@@ -0,0 +1,52 @@
+# benchmark_shapefile_cache.py
+# Compares opening the shapefiles and decoding all their columns and geometries
+# with ShapefileReader against opening the columnar cache from muenster_tools:
+#   python benchmarks/benchmark_shapefile_cache.py
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from muenster_tools.shapefile_reader import open_shapefile, POINT_TYPES
+from muenster_tools.shapefile_cache import open_cached, _cached_shapefiles
+
+data_folder = os.path.join(os.path.dirname(__file__), "..", "Muenster")
+
+
+def read_everything(shapefile):
+    # This function decodes every column and every geometry once
+    for name in shapefile.fields:
+        shapefile.column(name)
+    if shapefile.shape_type in POINT_TYPES:
+        shapefile.points()
+    else:
+        for i in range(len(shapefile)):
+            shapefile.rings(i)
+
+
+def main():
+    for name in ("Schools", "Muenster_City_Districts", "Muenster_Parcels", "House_Numbers"):
+        start = time.perf_counter()
+        read_everything(open_shapefile(data_folder, name))
+        reader_time = time.perf_counter() - start
+
+        # the first call builds the cache if it is missing or out of date
+        start = time.perf_counter()
+        open_cached(data_folder, name)
+        build_time = time.perf_counter() - start
+
+        # a new run of a script: nothing is kept in memory
+        _cached_shapefiles.clear()
+        start = time.perf_counter()
+        read_everything(open_cached(data_folder, name))
+        cache_time = time.perf_counter() - start
+
+        print(name)
+        print(f"  shapefile      : {reader_time:8.4f} s")
+        print(f"  cache          : {cache_time:8.4f} s (first call {build_time:.4f} s)")
+        print(f"  speedup        : {reader_time / max(cache_time, 1e-9):8.1f} x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# benchmark_spatial_index.py
+# Compares bounding box queries through the spatial index files next to the
+# shapefiles (.qix and .sbn) with checking the bounding box of every record:
+#   python benchmarks/benchmark_spatial_index.py
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from muenster_tools.shapefile_reader import open_shapefile
+from muenster_tools.spatial_index_files import spatial_index, query_records
+
+data_folder = os.path.join(os.path.dirname(__file__), "..", "Muenster")
+
+
+def scan(reader, bbox):
+    # This function finds the records by reading the bounding box of every record
+    xmin, ymin, xmax, ymax = bbox
+    b = reader.bboxes()
+    return np.flatnonzero((b[:, 0] <= xmax) & (b[:, 2] >= xmin) & (b[:, 1] <= ymax) & (b[:, 3] >= ymin))
+
+
+def compare(name, boxes):
+    # This function runs both queries for every box, checks that they agree and prints the times
+    reader = open_shapefile(data_folder, name)
+    start = time.perf_counter()
+    index = spatial_index(reader)
+    open_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [query_records(reader, bbox, index) for bbox in boxes]
+    index_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scanned = [scan(reader, bbox) for bbox in boxes]
+    scan_time = time.perf_counter() - start
+
+    same = all(np.array_equal(a, b) for a, b in zip(indexed, scanned))
+    print(f"{name} ({len(reader)} records, {type(index).__name__})")
+    print(f"  every record   : {scan_time:8.3f} s")
+    print(f"  spatial index  : {index_time:8.3f} s (+ {open_time:.3f} s to open)")
+    print(f"  speedup        : {scan_time / max(index_time, 1e-9):8.1f} x, same result: {same}")
+
+
+def main():
+    # 200 boxes of 500 x 500 m around the city centre
+    rng = np.random.default_rng(0)
+    corners = rng.uniform((400000, 5752000), (410000, 5762000), size=(200, 2))
+    boxes = [(x, y, x + 500, y + 500) for x, y in corners]
+    for name in ("Schools", "Muenster_City_Districts", "Muenster_Parcels", "House_Numbers"):
+        compare(name, boxes)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,17 +5,12 @@ csv_path = r"C:\Users\User\Desktop\PIQAA\Data for Session 6\standard_land_value_
 # Importing the required libraries
 from qgis.core import QgsProject, QgsField, QgsVectorLayer
 from PyQt5.QtCore import QVariant
-from qgis.core import QgsFeature, QgsGeometry
-import csv, sys
+from muenster_tools.csv_loader import load_csv_to_layer, decimal_comma_float, text
 
-# Trying to increase the maximum size of the csv field to avoid errors when reading the files
-max_int = sys.maxsize
-while True:
-    try:
-        csv.field_size_limit(max_int)   # setting the maximum size of the csv field
-        break                           # if successful
-    except OverflowError:               # to catch the error if the size is too large
-        max_int //= 10                  # reduce the size by a factor of 10
+# Number of rows that are parsed and added to the layer at once,
+# and number of worker processes for the WKT parsing (0 = parse in QGIS itself)
+batch_size = 5000
+workers = 0
 
 # Creating a new vector layer using the uri string
 # "polygon" is the geometry type
@@ -30,41 +25,21 @@ layer = QgsVectorLayer(uri, "temp_standard_land_value_muenster", "memory")
 # Adding the layer to the map
 QgsProject.instance().addMapLayer(layer)
 
-# Getting access to the layer's data provider
-provider = layer.dataProvider()
-# Getting access to the layers fields
-fields = layer.fields()  # this is a QgsFields object
+# Columns of the csv file that go into the layer fields, in the order of the fields:
+# standard_land_value (with a decimal comma), type and district.
+# The WKT geometry is in column 3.
+columns = [(0, decimal_comma_float), (1, text), (2, text)]
 
-features = []  # a list to store the features
+# Function to show how far the loading is
+def show_progress(percent):
+    print(f"Loaded {percent:.0f}% of the csv file")
 
-# setting up to read and parse the csv file
-with open(csv_path, 'r', newline='', encoding='utf-8') as csvfile:
-    # ← tell Python it’s semicolon-delimited
-    reader = csv.reader(csvfile, delimiter=';')
-    # Skip the header row
-    next(reader)
-    # Loop through each row in the CSV file
-    for row in reader:
-        raw = row[0]                             
-        normalized = raw.strip().strip('"').replace(',', '.')  # to replace the comma with a dot
-        value = float(normalized)                      # new standard_land_value               
-        type_     = row[1]                             # type
-        district  = row[2]                             # district
-        geometry  = row[3]                             # WKT format geometry
+# Reading the csv file in batches; every batch is added to the data provider right away,
+# so the features of the whole file are never in memory at the same time
+count = load_csv_to_layer(csv_path, layer, columns, 3, delimiter=';',
+                          batch_size=batch_size, workers=workers, progress=show_progress)
+print(f"{count} features added")
 
-        # Creating new feature to set its field and geometry
-        feature = QgsFeature(fields)
-        # Setting the attributes for the feature
-        feature.setAttribute("standard_land_value",value)
-        feature.setAttribute("type",type_)
-        feature.setAttribute("district",district)
-        feature.setGeometry(QgsGeometry.fromWkt(geometry))
-
-        # Adding the feature to the list of features
-        features.append(feature)
-
-# Using the data provider to add features to the layer
-provider.addFeatures(features)
 # Updating the layer to reflect the changes
 layer.updateExtents()
 # Refreshing the layer to show the changes in the map canvas
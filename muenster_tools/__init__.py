@@ -0,0 +1,66 @@
+from .point_index import GridIndex, FeatureIndex, index_for_layer, count_points_in_polygon
+# This imports the grid index used for fast point in polygon counting
+from .district_profile import make_profile, map_data, layer_points, profile_from_store
+# This imports the helpers that collect the numbers for the district profiles
+from .shapefile_reader import ShapefileReader, open_shapefile
+# This imports the shapefile reader that works without QGIS
+from .point_in_polygon import (points_in_polygon, points_in_polygon_chunked, points_in_polygons,
+    rings_from_geometry)
+# This imports the vectorized point in polygon test
+from .spatial_join import polygon_values, join_attribute, write_attribute_values
+# This imports the spatial join of polygon attributes to points
+from .csv_loader import load_csv_to_layer, wkt_to_wkb, decimal_comma_float
+# This imports the streaming CSV to layer loader
+from .columnar_csv import read_columns, iter_column_chunks, convert_column, decimal_comma_floats
+# This imports the columnar reader for semicolon / decimal comma CSV files
+from .point_export import export_points_csv
+# This imports the streaming point to CSV export
+from .project_builder import build_project, format_report
+# This imports the parallel project builder
+from .district_catalogue import DistrictCatalogue, catalogue_for_layer, layer_version
+# This imports the cached district catalogue
+from .aggregate_store import AggregateStore, update_store, read_population
+# This imports the SQLite store of the per district numbers
+from .polygon_overlay import overlay, feature_shares
+# This imports the polygon overlay with partial overlap areas
+from .distances import planar_distances, ground_distances, vincenty_distances, distance_matrix
+# This imports the batched distance functions
+from .nearest_neighbour import PointGrid
+# This imports the nearest neighbour index for point layers
+from .orthophoto import Orthophoto, WorldFile, orthophoto
+# This imports the windowed reader for the aerial image
+from .spatial_index_files import QixIndex, SbnIndex, spatial_index, build_qix, query_records
+# This imports the readers of the .qix and .sbn spatial index files
+from .coordinate_transform import transformer, transform_points, to_utm, to_wgs84
+# This imports the cached, vectorized coordinate transforms
+from .prepared_polygon import PreparedPolygon, prepared_feature, prepared_geometry
+# This imports the prepared polygons for repeated containment tests
+from .shapefile_cache import CachedShapefile, cached_shapefile, open_cached
+# This imports the columnar cache of the shapefiles
+
+__all__ = ["GridIndex", "FeatureIndex", "index_for_layer", "count_points_in_polygon",
+           "make_profile", "map_data", "layer_points", "profile_from_store",
+           "ShapefileReader", "open_shapefile",
+           "points_in_polygon", "points_in_polygon_chunked", "points_in_polygons",
+           "rings_from_geometry", "polygon_values", "join_attribute", "write_attribute_values",
+           "DistrictLookup", "lookup_for_layer", "load_csv_to_layer", "wkt_to_wkb",
+           "decimal_comma_float", "read_columns", "iter_column_chunks", "convert_column",
+           "decimal_comma_floats", "export_points_csv",
+           "build_project", "format_report",
+           "DistrictCatalogue", "catalogue_for_layer", "layer_version",
+           "AggregateStore", "update_store", "read_population", "overlay", "feature_shares",
+           "planar_distances", "ground_distances", "vincenty_distances", "distance_matrix",
+           "PointGrid", "Orthophoto", "WorldFile", "orthophoto",
+           "QixIndex", "SbnIndex", "spatial_index", "build_qix", "query_records",
+           "transformer", "transform_points", "to_utm", "to_wgs84",
+           "PreparedPolygon", "prepared_feature", "prepared_geometry",
+           "CachedShapefile", "cached_shapefile", "open_cached"]
+
+
+def __getattr__(name):
+    # This function imports the lat/lon to district lookup when it is first used,
+    # so "python -m muenster_tools.reverse_geocode" does not import it twice
+    if name in ("DistrictLookup", "lookup_for_layer"):
+        from . import reverse_geocode
+        return getattr(reverse_geocode, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,225 @@
+# aggregate_store.py
+# Keeping the per district numbers (households, parcels, schools, pools, their
+# types, the area and the population) in a small SQLite file, so the district
+# profiles (Exercise_7.py) and the count script (Exercise_4_4.py) can read them
+# in milliseconds instead of joining the layers again.
+# update_store() remembers a version of every input (file modification time
+# and number of features) and only counts a layer again when it has changed.
+# Reading the store only needs sqlite3, not QGIS.
+
+import os
+import sqlite3
+from collections import Counter
+from .columnar_csv import read_columns
+from .district_catalogue import layer_version
+from .point_index import index_for_layer
+from .polygon_overlay import overlay
+
+DEFAULT_STORE_PATH = os.path.join(os.path.expanduser("~"), ".muenster_tools", "district_aggregates.sqlite")
+
+POPULATION_CSV = "Population_Data_per_City_District_2022.csv"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (name TEXT PRIMARY KEY, version TEXT);
+CREATE TABLE IF NOT EXISTS districts (name TEXT PRIMARY KEY, number TEXT, parent TEXT,
+                                      area_m2 REAL, population INTEGER);
+CREATE TABLE IF NOT EXISTS counts (district TEXT, layer TEXT, count INTEGER,
+                                   PRIMARY KEY (district, layer));
+CREATE TABLE IF NOT EXISTS categories (district TEXT, layer TEXT, category TEXT, count INTEGER,
+                                       PRIMARY KEY (district, layer, category));
+CREATE TABLE IF NOT EXISTS overlays (district TEXT, layer TEXT, inside INTEGER, partial INTEGER,
+                                     inside_area REAL, partial_area REAL, area_share REAL,
+                                     PRIMARY KEY (district, layer));
+"""
+
+
+def read_population(csv_path):
+    # This function reads Population_Data_per_City_District_2022.csv into
+    # {district number: population}; the District column looks like "11 Aegidii"
+    columns = read_columns(csv_path, ["District", "Population"],
+                           dtypes={"District": "str", "Population": "int"})
+    return {district.split(" ", 1)[0]: int(population)
+            for district, population in zip(columns["District"], columns["Population"])}
+
+
+def population_csv_for(district_layer):
+    # This function returns the population CSV next to the district shapefile, or None
+    folder = os.path.dirname(district_layer.source().split("|")[0])
+    path = os.path.join(folder, POPULATION_CSV)
+    return path if os.path.exists(path) else None
+
+
+def file_version(path):
+    # This function returns the version of a file that is not a layer
+    return (os.path.getmtime(path), os.path.getsize(path))
+
+
+class AggregateStore:
+    # This class reads and writes the SQLite file with the district numbers.
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def version(self, name):
+        # This method returns the stored version text of an input, or None
+        row = self.connection.execute("SELECT version FROM sources WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_version(self, name, version):
+        self.connection.execute("INSERT OR REPLACE INTO sources VALUES (?, ?)", (name, repr(version)))
+
+    def district_names(self):
+        # This method returns the stored district names sorted alphabetically
+        return [row[0] for row in self.connection.execute("SELECT name FROM districts ORDER BY name")]
+
+    def counts(self, layer_name):
+        # This method returns {district name: count} for one layer
+        rows = self.connection.execute("SELECT district, count FROM counts WHERE layer = ?", (layer_name,))
+        return dict(rows)
+
+    def district(self, name):
+        # This method returns the numbers of one district as a dictionary with
+        # "name", "number", "parent", "area_m2", "population", "counts" ({layer: count})
+        # "categories" ({layer: Counter}) and "overlays" ({layer: overlay numbers}),
+        # or None for an unknown district
+        row = self.connection.execute(
+            "SELECT name, number, parent, area_m2, population FROM districts WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            return None
+        result = dict(zip(("name", "number", "parent", "area_m2", "population"), row))
+        result["counts"] = dict(self.connection.execute(
+            "SELECT layer, count FROM counts WHERE district = ?", (name,)))
+        result["categories"] = {}
+        for layer_name, category, count in self.connection.execute(
+                "SELECT layer, category, count FROM categories WHERE district = ?", (name,)):
+            result["categories"].setdefault(layer_name, Counter())[category] = count
+        columns = ("inside", "partial", "inside_area", "partial_area", "area_share")
+        result["overlays"] = {
+            row[0]: dict(zip(columns, row[1:])) for row in self.connection.execute(
+                "SELECT layer, inside, partial, inside_area, partial_area, area_share "
+                "FROM overlays WHERE district = ?", (name,))}
+        return result
+
+    def write_districts(self, rows):
+        # This method replaces the district table with (name, number, parent, area_m2) rows.
+        # The counts of all layers belong to the old districts and are removed.
+        self.connection.execute("DELETE FROM districts")
+        self.connection.execute("DELETE FROM counts")
+        self.connection.execute("DELETE FROM categories")
+        self.connection.execute("DELETE FROM overlays")
+        self.connection.execute("DELETE FROM sources")
+        self.connection.executemany(
+            "INSERT INTO districts (name, number, parent, area_m2) VALUES (?, ?, ?, ?)", rows)
+
+    def write_population(self, population):
+        # This method writes {district number: population} into the district table
+        self.connection.execute("UPDATE districts SET population = NULL")
+        self.connection.executemany("UPDATE districts SET population = ? WHERE number = ?",
+                                    [(value, number) for number, value in population.items()])
+
+    def write_layer(self, layer_name, names, results):
+        # This method replaces the counts and categories of one layer. results has
+        # one {"count", "categories"} dictionary per district in names.
+        self.connection.execute("DELETE FROM counts WHERE layer = ?", (layer_name,))
+        self.connection.execute("DELETE FROM categories WHERE layer = ?", (layer_name,))
+        self.connection.executemany(
+            "INSERT INTO counts VALUES (?, ?, ?)",
+            [(name, layer_name, result["count"]) for name, result in zip(names, results)])
+        self.connection.executemany(
+            "INSERT INTO categories VALUES (?, ?, ?, ?)",
+            [(name, layer_name, None if category is None else str(category), count)
+             for name, result in zip(names, results)
+             for category, count in result["categories"].items()])
+
+    def write_overlay(self, layer_name, names, results):
+        # This method replaces the overlay numbers of one polygon layer, results
+        # come from polygon_overlay.overlay(). The count of the layer is the number
+        # of features completely inside a district.
+        self.write_layer(layer_name, names,
+                         [{"count": len(result["inside"]), "categories": {}} for result in results])
+        self.connection.execute("DELETE FROM overlays WHERE layer = ?", (layer_name,))
+        self.connection.executemany(
+            "INSERT INTO overlays VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(name, layer_name, len(result["inside"]), len(result["partial"]),
+              result["inside_area"], result["partial_area"], result["area_share"])
+             for name, result in zip(names, results)])
+
+
+def update_store(store, district_layer, layers, population_csv=None, overlay_layers=None):
+    # This function brings the store up to date and returns the names of the
+    # inputs that were counted again. layers is a {name: (layer, category field or
+    # None)} dictionary; layers that are None are skipped. overlay_layers is a
+    # {name: polygon layer} dictionary of layers that are overlaid with the
+    # districts, so features crossing a boundary are counted with their area.
+    # When the district layer changes everything is counted again, otherwise
+    # only the changed layers; when nothing changed no feature is read at all.
+    updated = []
+    # the district features are only read when something has to be counted
+    read = {}
+
+    def districts():
+        # This function returns the district features, names and geometries
+        # sorted by name; the layer is read the first time only
+        if not read:
+            features = sorted(district_layer.getFeatures(), key=lambda feature: feature["Name"])
+            read["districts"] = (features, [feature["Name"] for feature in features],
+                                 [feature.geometry() for feature in features])
+        return read["districts"]
+
+    districts_changed = store.version("districts") != repr(layer_version(district_layer))
+    if districts_changed:
+        has_number = district_layer.fields().lookupField("Number") >= 0
+        store.write_districts([
+            (feature["Name"], str(feature["Number"]) if has_number else None,
+             feature["P_District"], feature.geometry().area())
+            for feature in districts()[0]])
+        store.set_version("districts", layer_version(district_layer))
+        updated.append("districts")
+
+    if population_csv and (districts_changed
+                           or store.version("population") != repr(file_version(population_csv))):
+        store.write_population(read_population(population_csv))
+        store.set_version("population", file_version(population_csv))
+        updated.append("population")
+
+    for layer_name, (layer, category_field) in layers.items():
+        if layer is None:
+            continue
+        # the category field is part of the version, a different field means counting again
+        version = (layer_version(layer), category_field)
+        if store.version(layer_name) == repr(version):
+            continue
+        _, names, geometries = districts()
+        results = index_for_layer(layer).aggregate_by_polygon(geometries, category_field)
+        store.write_layer(layer_name, names, results)
+        store.set_version(layer_name, version)
+        updated.append(layer_name)
+
+    for layer_name, layer in (overlay_layers or {}).items():
+        if layer is None:
+            continue
+        version = (layer_version(layer), "overlay")
+        if store.version(layer_name) == repr(version):
+            continue
+        _, names, geometries = districts()
+        store.write_overlay(layer_name, names, overlay(geometries, index_for_layer(layer)))
+        store.set_version(layer_name, version)
+        updated.append(layer_name)
+
+    store.connection.commit()
+    return updated
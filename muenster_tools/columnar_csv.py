@@ -0,0 +1,113 @@
+# columnar_csv.py
+# Reading the semicolon separated CSV files with a decimal comma that come out of
+# German software (Population_Data_per_City_District_2022.csv, SchoolReport.csv,
+# the land value export) column by column into NumPy arrays.
+# Only the requested columns are kept, and the number conversion runs on a whole
+# column at once instead of one float() call per cell.
+
+import csv
+from array import array
+from itertools import islice
+import numpy as np
+
+
+def convert_column(values, dtype=None, decimal=",", thousands=None):
+    # This function converts a column of strings into a typed NumPy array.
+    # dtype can be "int", "float", "date", "str" or None to guess it: a column
+    # becomes int if every value is a whole number, float if every value is a
+    # number, date if every value is YYYY-MM-DD and str otherwise.
+    # Empty values are NaN in float columns and NaT in date columns.
+    values = np.char.strip(np.char.strip(np.asarray(values, dtype=str)), '"')
+    if dtype == "str":
+        return values
+
+    if dtype in (None, "int"):
+        try:
+            return values.astype(np.int64)
+        except ValueError:
+            if dtype == "int":
+                raise
+
+    if dtype in (None, "float"):
+        numbers = values
+        if thousands:
+            numbers = np.char.replace(numbers, thousands, "")
+        if decimal != ".":
+            numbers = np.char.replace(numbers, decimal, ".")
+        numbers = np.where(numbers == "", "nan", numbers)
+        try:
+            return numbers.astype(float)
+        except ValueError:
+            if dtype == "float":
+                raise
+
+    if dtype in (None, "date"):
+        try:
+            return np.where(values == "", "NaT", values).astype("datetime64[D]")
+        except ValueError:
+            if dtype == "date":
+                raise
+
+    return values
+
+
+def decimal_comma_floats(values):
+    # This function is the vectorized form of csv_loader.decimal_comma_float():
+    # "1.234,5" -> 1234.5, "12.5" -> 12.5 and empty values -> NaN
+    values = np.char.strip(np.char.strip(np.asarray(values, dtype=str)), '"')
+    values = np.where(np.char.find(values, ",") >= 0,
+                      np.char.replace(np.char.replace(values, ".", ""), ",", "."),
+                      values)
+    return np.where(values == "", "nan", values).astype(float)
+
+
+def _raw_chunks(path, columns, chunk_size, delimiter, encoding):
+    # This function yields {column name: array of strings} for chunks of rows
+    with open(path, "r", newline="", encoding=encoding) as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        header = [name.strip() for name in next(reader)]
+        names = list(columns) if columns else header
+        missing = [name for name in names if name not in header]
+        if missing:
+            raise ValueError(f"Columns {missing} not found in {path}")
+        positions = [header.index(name) for name in names]
+
+        while True:
+            rows = [row for row in islice(reader, chunk_size) if row]
+            if not rows:
+                break
+            yield {name: np.array([row[position] if position < len(row) else "" for row in rows], dtype=str)
+                   for name, position in zip(names, positions)}
+
+
+def iter_column_chunks(path, columns=None, chunk_size=100_000, delimiter=";", decimal=",",
+                       thousands=None, dtypes=None, encoding="utf-8-sig"):
+    # This function reads a CSV file in chunks and yields one {column name: array}
+    # dictionary per chunk. Only the columns in columns are kept (all if None).
+    # dtypes is an optional {column name: dtype} dictionary, see convert_column();
+    # without it the type of every chunk is guessed on its own.
+    # The default encoding removes the byte order mark at the start of the file.
+    dtypes = dtypes or {}
+    for chunk in _raw_chunks(path, columns, chunk_size, delimiter, encoding):
+        yield {name: convert_column(values, dtypes.get(name), decimal, thousands)
+               for name, values in chunk.items()}
+
+
+def read_columns(path, columns=None, delimiter=";", decimal=",", thousands=None,
+                 dtypes=None, encoding="utf-8-sig", chunk_size=100_000):
+    # This function reads the whole file and returns {column name: array}.
+    # The type of a column is guessed once for the whole column.
+    dtypes = dtypes or {}
+    raw = {}
+    for chunk in _raw_chunks(path, columns, chunk_size, delimiter, encoding):
+        for name, values in chunk.items():
+            raw.setdefault(name, []).append(values)
+    return {name: convert_column(np.concatenate(parts), dtypes.get(name), decimal, thousands)
+            for name, parts in raw.items()}
+
+
+def to_array(column):
+    # This function turns a numeric NumPy column into an array.array ("q" or "d")
+    # for code that should not depend on NumPy
+    typecode = "q" if np.issubdtype(column.dtype, np.integer) else "d"
+    return array(typecode, column.astype(np.int64 if typecode == "q" else float).tobytes())
@@ -0,0 +1,201 @@
+# coordinate_transform.py
+# Transforming whole coordinate arrays between WGS84 longitude / latitude
+# (EPSG:4326) and ETRS89 / UTM zone 32N (EPSG:25832), the CRS of the Muenster
+# shapefiles, in one call instead of one QgsCoordinateTransform call per point.
+# transformer() builds a transform once per pair of CRS and keeps it. pyproj is
+# used when it is installed (it comes with QGIS); without it the Transverse
+# Mercator projection is computed with NumPy (Krueger's series to the 6th order
+# as given by Karney 2011, which is exact to well below a millimetre inside a
+# UTM zone), so bulk reprojection of the UTM CRS works without QGIS and pyproj.
+
+import numpy as np
+
+try:
+    from pyproj import Transformer
+except ImportError:
+    Transformer = None
+
+# the ellipsoids of ETRS89 (GRS80) and WGS84 as (semi-major axis, flattening)
+GRS80 = (6378137.0, 1 / 298.257222101)
+WGS84 = (6378137.0, 1 / 298.257223563)
+
+# UTM parameters
+UTM_K0 = 0.9996
+UTM_FALSE_EASTING = 500000.0
+UTM_FALSE_NORTHING_SOUTH = 10000000.0
+
+# geographic CRS that are handled as longitude / latitude in degrees. ETRS89 and
+# WGS84 differ by less than a metre; like PROJ without a grid, no datum shift is applied.
+GEOGRAPHIC_CRS = {"EPSG:4326": WGS84, "EPSG:4258": GRS80, "OGC:CRS84": WGS84}
+
+# Newton steps for the latitude of the inverse projection, 3 are already enough
+INVERSE_ITERATIONS = 5
+
+
+def utm_crs(crs):
+    # This function returns (zone, south, ellipsoid) of a UTM CRS code like
+    # "EPSG:25832" (ETRS89), "EPSG:32632" (WGS84 north) or "EPSG:32732" (south),
+    # or None if the code is not a UTM CRS
+    crs = str(crs).upper()
+    if not crs.startswith("EPSG:") or not crs[5:].isdigit():
+        return None
+    code = int(crs[5:])
+    if 25828 <= code <= 25838:
+        return code - 25800, False, GRS80
+    if 32601 <= code <= 32660:
+        return code - 32600, False, WGS84
+    if 32701 <= code <= 32760:
+        return code - 32700, True, WGS84
+    return None
+
+
+def _series(f):
+    # This function returns the rectifying radius factor and the coefficients of
+    # the forward (alpha) and inverse (beta) series for a flattening f
+    n = f / (2 - f)
+    n2, n3, n4, n5, n6 = n ** 2, n ** 3, n ** 4, n ** 5, n ** 6
+    radius = (1 + n2 / 4 + n4 / 64 + n6 / 256) / (1 + n)
+    alpha = [
+        n / 2 - 2 * n2 / 3 + 5 * n3 / 16 + 41 * n4 / 180 - 127 * n5 / 288 + 7891 * n6 / 37800,
+        13 * n2 / 48 - 3 * n3 / 5 + 557 * n4 / 1440 + 281 * n5 / 630 - 1983433 * n6 / 1935360,
+        61 * n3 / 240 - 103 * n4 / 140 + 15061 * n5 / 26880 + 167603 * n6 / 181440,
+        49561 * n4 / 161280 - 179 * n5 / 168 + 6601661 * n6 / 7257600,
+        34729 * n5 / 80640 - 3418889 * n6 / 1995840,
+        212378941 * n6 / 319334400,
+    ]
+    beta = [
+        n / 2 - 2 * n2 / 3 + 37 * n3 / 96 - n4 / 360 - 81 * n5 / 512 + 96199 * n6 / 604800,
+        n2 / 48 + n3 / 15 - 437 * n4 / 1440 + 46 * n5 / 105 - 1118711 * n6 / 3870720,
+        17 * n3 / 480 - 37 * n4 / 840 - 209 * n5 / 4480 + 5569 * n6 / 90720,
+        4397 * n4 / 161280 - 11 * n5 / 504 - 830251 * n6 / 7257600,
+        4583 * n5 / 161280 - 108847 * n6 / 3991680,
+        20648693 * n6 / 638668800,
+    ]
+    return radius, alpha, beta
+
+
+def _conformal_tan(tau, e):
+    # This function returns tan of the conformal latitude for tau = tan(latitude)
+    sigma = np.sinh(e * np.arctanh(e * tau / np.hypot(1, tau)))
+    return tau * np.hypot(1, sigma) - sigma * np.hypot(1, tau)
+
+
+def tm_forward(lon, lat, lon0, ellipsoid=GRS80, k0=UTM_K0, false_easting=UTM_FALSE_EASTING,
+               false_northing=0.0):
+    # This function projects longitude / latitude arrays in degrees with the
+    # Transverse Mercator projection around the meridian lon0 and returns (x, y)
+    a, f = ellipsoid
+    e = np.sqrt(f * (2 - f))
+    radius, alpha, _ = _series(f)
+    lam = np.radians(np.asarray(lon, dtype=float) - lon0)
+    tau = np.tan(np.radians(np.asarray(lat, dtype=float)))
+    tau1 = _conformal_tan(tau, e)
+    xi1 = np.arctan2(tau1, np.cos(lam))
+    eta1 = np.arcsinh(np.sin(lam) / np.hypot(tau1, np.cos(lam)))
+    xi = xi1.copy()
+    eta = eta1.copy()
+    for j, coefficient in enumerate(alpha, start=1):
+        xi += coefficient * np.sin(2 * j * xi1) * np.cosh(2 * j * eta1)
+        eta += coefficient * np.cos(2 * j * xi1) * np.sinh(2 * j * eta1)
+    scale = k0 * a * radius
+    return false_easting + scale * eta, false_northing + scale * xi
+
+
+def tm_inverse(x, y, lon0, ellipsoid=GRS80, k0=UTM_K0, false_easting=UTM_FALSE_EASTING,
+               false_northing=0.0, iterations=INVERSE_ITERATIONS):
+    # This function turns Transverse Mercator (x, y) arrays back into
+    # longitude / latitude in degrees
+    a, f = ellipsoid
+    e = np.sqrt(f * (2 - f))
+    radius, _, beta = _series(f)
+    scale = k0 * a * radius
+    xi = (np.asarray(y, dtype=float) - false_northing) / scale
+    eta = (np.asarray(x, dtype=float) - false_easting) / scale
+    xi1 = xi.copy()
+    eta1 = eta.copy()
+    for j, coefficient in enumerate(beta, start=1):
+        xi1 -= coefficient * np.sin(2 * j * xi) * np.cosh(2 * j * eta)
+        eta1 -= coefficient * np.cos(2 * j * xi) * np.sinh(2 * j * eta)
+    lam = np.arctan2(np.sinh(eta1), np.cos(xi1))
+    tau1 = np.sin(xi1) / np.hypot(np.sinh(eta1), np.cos(xi1))
+
+    # the latitude from the conformal latitude, with Newton's method
+    e2 = e * e
+    tau = tau1.copy()
+    for _ in range(iterations):
+        tau_i = _conformal_tan(tau, e)
+        tau += ((tau1 - tau_i) / np.hypot(1, tau_i)
+                * (1 + (1 - e2) * tau * tau) / ((1 - e2) * np.hypot(1, tau)))
+    return lon0 + np.degrees(lam), np.degrees(np.arctan(tau))
+
+
+def _numpy_transform(source, target):
+    # This function returns a NumPy transform between a geographic CRS and a UTM
+    # CRS (either way round), or None if the pair is not supported
+    source = str(source).upper()
+    target = str(target).upper()
+    if source == target:
+        return lambda x, y: (np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+    if source in GEOGRAPHIC_CRS and utm_crs(target):
+        zone, south, ellipsoid = utm_crs(target)
+        false_northing = UTM_FALSE_NORTHING_SOUTH if south else 0.0
+        return lambda lon, lat: tm_forward(lon, lat, zone * 6 - 183, ellipsoid,
+                                           false_northing=false_northing)
+    if utm_crs(source) and target in GEOGRAPHIC_CRS:
+        zone, south, ellipsoid = utm_crs(source)
+        false_northing = UTM_FALSE_NORTHING_SOUTH if south else 0.0
+        return lambda x, y: tm_inverse(x, y, zone * 6 - 183, ellipsoid,
+                                       false_northing=false_northing)
+    return None
+
+
+def _pyproj_transform(source, target):
+    # This function returns a pyproj transform that takes and returns x / longitude first
+    transformer = Transformer.from_crs(source, target, always_xy=True)
+
+    def transform(x, y):
+        return transformer.transform(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+
+    return transform
+
+
+# one transform per (source, target, use_pyproj), so it is only built once
+_transformers = {}
+
+
+def transformer(source, target, use_pyproj=None):
+    # This function returns a cached transform function (x array, y array) ->
+    # (x array, y array) from source to target, given as "EPSG:xxxx" codes;
+    # longitude / latitude are x / y. use_pyproj=None uses pyproj when it is
+    # installed, False always uses the NumPy projection.
+    if use_pyproj is None:
+        use_pyproj = Transformer is not None
+    key = (source, target, use_pyproj)
+    if key not in _transformers:
+        if use_pyproj:
+            if Transformer is None:
+                raise ImportError("pyproj is not installed")
+            transform = _pyproj_transform(source, target)
+        else:
+            transform = _numpy_transform(source, target)
+            if transform is None:
+                raise ValueError(f"Transforming from {source} to {target} needs pyproj")
+        _transformers[key] = transform
+    return _transformers[key]
+
+
+def transform_points(points, source, target, use_pyproj=None):
+    # This function transforms an (n, 2) array of points and returns an (n, 2) array
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    x, y = transformer(source, target, use_pyproj)(points[:, 0], points[:, 1])
+    return np.column_stack([x, y])
+
+
+def to_utm(lon, lat, target="EPSG:25832", use_pyproj=None):
+    # This function returns the UTM (x, y) arrays of WGS84 longitude / latitude arrays
+    return transformer("EPSG:4326", target, use_pyproj)(lon, lat)
+
+
+def to_wgs84(x, y, source="EPSG:25832", use_pyproj=None):
+    # This function returns the WGS84 (longitude, latitude) arrays of UTM x / y arrays
+    return transformer(source, "EPSG:4326", use_pyproj)(x, y)
@@ -0,0 +1,211 @@
+# csv_loader.py
+# Loading a big CSV file with WKT geometries into a QGIS layer (exercise_6_1.py)
+# without keeping every feature in memory. The rows are read in batches of a
+# fixed size and each batch is added to the data provider right away. The WKT
+# text can be turned into WKB in a pool of worker processes; the main process
+# then only builds the QgsFeature objects.
+
+import csv
+import os
+import re
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from .columnar_csv import decimal_comma_floats
+
+# the largest value csv.field_size_limit accepts on every platform (a C long on Windows)
+FIELD_SIZE_LIMIT = 2**31 - 1
+
+# WKB type codes of the 2D geometries, 1000 is added for the Z variants
+WKB_TYPES = {
+    "POINT": 1,
+    "LINESTRING": 2,
+    "POLYGON": 3,
+    "MULTIPOINT": 4,
+    "MULTILINESTRING": 5,
+    "MULTIPOLYGON": 6,
+}
+
+_TOKEN = re.compile(r"\(|\)|[^(),]+")
+
+
+def decimal_comma_float(value):
+    # This function reads a number with a decimal comma like "1.234,5" or "\"12,5\""
+    value = value.strip().strip('"')
+    if not value:
+        return None
+    if "," in value:
+        value = value.replace(".", "").replace(",", ".")
+    return float(value)
+
+
+def text(value):
+    # This function keeps a value as text
+    return value
+
+
+def _parse_nested(body):
+    # This function turns "((1 2, 3 4), (5 6, 7 8))" into nested lists of tuples
+    stack = [[]]
+    for token in _TOKEN.findall(body):
+        if token == "(":
+            child = []
+            stack[-1].append(child)
+            stack.append(child)
+        elif token == ")":
+            stack.pop()
+        else:
+            token = token.strip()
+            if token:
+                stack[-1].append(tuple(float(v) for v in token.split()))
+    if len(stack) != 1 or len(stack[0]) != 1:
+        raise ValueError("The brackets of the WKT do not match")
+    return stack[0][0]
+
+
+def _pack(type_name, coordinates, dims):
+    # This function writes one geometry as little endian WKB
+    code = WKB_TYPES[type_name] + (1000 if dims == 3 else 0)
+    point = struct.Struct("<" + "d" * dims)
+
+    def points(sequence):
+        return struct.pack("<I", len(sequence)) + b"".join(point.pack(*p) for p in sequence)
+
+    header = struct.pack("<BI", 1, code)
+    if type_name == "POINT":
+        return header + point.pack(*coordinates[0])
+    if type_name == "LINESTRING":
+        return header + points(coordinates)
+    if type_name == "POLYGON":
+        return header + struct.pack("<I", len(coordinates)) + b"".join(points(r) for r in coordinates)
+    # multi geometries are a count followed by complete WKB geometries
+    single = type_name[len("MULTI"):]
+    parts = []
+    for part in coordinates:
+        if single == "POINT" and isinstance(part, tuple):
+            part = [part]    # MULTIPOINT (1 2, 3 4) without inner brackets
+        parts.append(_pack(single, part, dims))
+    return header + struct.pack("<I", len(parts)) + b"".join(parts)
+
+
+def wkt_to_wkb(wkt):
+    # This function converts 2D and Z (multi)point, linestring and polygon WKT to WKB.
+    # It returns None for everything else (EMPTY, M values, collections), those
+    # geometries are then parsed by QGIS.
+    head, bracket, body = wkt.strip().partition("(")
+    words = head.upper().split()
+    if not bracket or not words or words[0] not in WKB_TYPES or len(words) > 2:
+        return None
+    if len(words) == 2 and words[1] != "Z":
+        return None
+    try:
+        coordinates = _parse_nested(bracket + body)
+    except (ValueError, IndexError):
+        return None
+    first = coordinates
+    while isinstance(first, list):
+        if not first:
+            return None
+        first = first[0]
+    dims = len(first)
+    if dims not in (2, 3):
+        return None
+    return _pack(words[0], coordinates, dims)
+
+
+def parse_rows(rows, columns, wkt_column):
+    # This function converts a batch of CSV rows into (attributes, WKB or WKT) pairs.
+    # It only uses plain python values, so it can run in a worker process.
+    # The attributes are converted column by column; decimal comma columns are
+    # converted for the whole batch at once with NumPy.
+    converted = []
+    for index, converter in columns:
+        raw = [row[index] for row in rows]
+        if converter is decimal_comma_float:
+            numbers = decimal_comma_floats(raw)
+            converted.append([None if value != value else value for value in numbers.tolist()])
+        else:
+            converted.append([converter(value) for value in raw])
+    parsed = []
+    for row, attributes in zip(rows, zip(*converted) if converted else ([] for _ in rows)):
+        wkt = row[wkt_column]
+        wkb = wkt_to_wkb(wkt)
+        parsed.append((list(attributes), wkb if wkb is not None else wkt))
+    return parsed
+
+
+def read_batches(csv_path, batch_size, delimiter=";", skip_header=True, encoding="utf-8"):
+    # This function yields (rows, fraction of the file read) for fixed size batches
+    csv.field_size_limit(FIELD_SIZE_LIMIT)
+    total = max(os.path.getsize(csv_path), 1)
+    with open(csv_path, "r", newline="", encoding=encoding) as csvfile:
+        reader = csv.reader(csvfile, delimiter=delimiter)
+        if skip_header:
+            next(reader, None)
+        batch = []
+        for row in reader:
+            if not row:
+                continue
+            batch.append(row)
+            if len(batch) >= batch_size:
+                # the binary buffer below the text file still knows its position
+                yield batch, csvfile.buffer.tell() / total
+                batch = []
+        if batch:
+            yield batch, 1.0
+
+
+def load_csv_to_layer(csv_path, layer, columns, wkt_column, delimiter=";", batch_size=5000,
+                      workers=0, progress=None, skip_header=True, encoding="utf-8"):
+    # This function streams a CSV file into the data provider of layer.
+    # columns is a list of (csv column index, converter) in the order of the layer
+    # fields, the converters must be module level functions such as
+    # decimal_comma_float or text so they can be sent to worker processes.
+    # With workers > 0 the rows are parsed in that many processes. progress is
+    # called with a percentage after every batch. Returns the number of features.
+    from qgis.core import QgsFeature, QgsGeometry
+
+    provider = layer.dataProvider()
+    fields = layer.fields()
+    added = 0
+
+    def commit(parsed):
+        # This function builds the features of one batch and adds them to the provider
+        features = []
+        for attributes, geometry_data in parsed:
+            feature = QgsFeature(fields)
+            feature.setAttributes(attributes)
+            if isinstance(geometry_data, bytes):
+                geometry = QgsGeometry()
+                geometry.fromWkb(geometry_data)
+            else:
+                geometry = QgsGeometry.fromWkt(geometry_data)
+            feature.setGeometry(geometry)
+            features.append(feature)
+        if not provider.addFeatures(features)[0]:
+            raise RuntimeError(f"Could not add features to layer '{layer.name()}'")
+        return len(features)
+
+    batches = read_batches(csv_path, batch_size, delimiter, skip_header, encoding)
+    if workers > 0:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # only a few batches are in flight at a time so memory stays flat
+            pending = []
+            for rows, fraction in batches:
+                pending.append((executor.submit(parse_rows, rows, columns, wkt_column), fraction))
+                if len(pending) >= workers * 2:
+                    future, done = pending.pop(0)
+                    added += commit(future.result())
+                    if progress:
+                        progress(done * 100)
+            for future, done in pending:
+                added += commit(future.result())
+                if progress:
+                    progress(done * 100)
+    else:
+        for rows, fraction in batches:
+            added += commit(parse_rows(rows, columns, wkt_column))
+            if progress:
+                progress(fraction * 100)
+
+    layer.updateExtents()
+    return added
@@ -0,0 +1,125 @@
+# distances.py
+# Distances between many points in one NumPy call, instead of one
+# QgsDistanceArea.measureLine call per pair (Exercise_5_1.py).
+# All functions take arrays of points and work one-to-many (others is a single
+# point) or many-to-many (the result is a matrix with one row per point).
+#   planar_distances:  straight line distances in the layer CRS (EPSG:25832)
+#   ground_distances:  UTM grid distances corrected by the UTM scale factor, which
+#                      matches the ellipsoidal distance to about 1 mm per km for
+#                      distances inside a city
+#   vincenty_distances: distances on the ellipsoid from longitude / latitude
+
+import numpy as np
+
+# GRS80 ellipsoid, used by ETRS89 / UTM (EPSG:25832); WGS84 differs by 0.1 mm
+GRS80_A = 6378137.0
+GRS80_F = 1 / 298.257222101
+
+# UTM parameters: scale factor on the central meridian and its false easting
+UTM_K0 = 0.9996
+UTM_FALSE_EASTING = 500000.0
+# radius of the earth used for the scale factor, the mean radius at about 52 deg north
+EARTH_RADIUS = 6381000.0
+
+
+def _pairs(points, others):
+    # This function returns the points and others as (N, 1, 2) and (1, M, 2)
+    # arrays, and whether others was a single point
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    others = np.asarray(others, dtype=float)
+    single = others.ndim == 1
+    others = others.reshape(-1, 2)
+    return points[:, None, :], others[None, :, :], single
+
+
+def planar_distances(points, others):
+    # This function returns the straight line distances between points and others.
+    # With a single other point the result has one distance per point, otherwise
+    # it is an (N, M) matrix.
+    a, b, single = _pairs(points, others)
+    distances = np.hypot(a[..., 0] - b[..., 0], a[..., 1] - b[..., 1])
+    return distances[:, 0] if single else distances
+
+
+def ground_distances(points, others, k0=UTM_K0, false_easting=UTM_FALSE_EASTING,
+                     radius=EARTH_RADIUS):
+    # This function returns the distances on the ellipsoid between UTM points.
+    # The grid distance is divided by the mean scale factor along the line
+    # (Simpson's rule over the two end points and the middle).
+    a, b, single = _pairs(points, others)
+    x1 = a[..., 0] - false_easting
+    x2 = b[..., 0] - false_easting
+    grid = np.hypot(a[..., 0] - b[..., 0], a[..., 1] - b[..., 1])
+    scale = k0 * (1 + (x1 * x1 + x1 * x2 + x2 * x2) / (6 * radius * radius))
+    distances = grid / scale
+    return distances[:, 0] if single else distances
+
+
+def vincenty_distances(lon1, lat1, lon2, lat2, a=GRS80_A, f=GRS80_F, max_iterations=200,
+                       tolerance=1e-12):
+    # This function returns the ellipsoidal distances in metres between
+    # (lon1, lat1) and (lon2, lat2) in degrees with Vincenty's inverse formula.
+    # The inputs are broadcast against each other, so lon1[:, None] with lon2[None, :]
+    # gives a matrix. Nearly antipodal pairs, where the iteration does not
+    # converge, are NaN.
+    b = (1 - f) * a
+    lon1, lat1, lon2, lat2 = np.broadcast_arrays(*(np.radians(np.asarray(v, dtype=float))
+                                                  for v in (lon1, lat1, lon2, lat2)))
+    u1 = np.arctan((1 - f) * np.tan(lat1))
+    u2 = np.arctan((1 - f) * np.tan(lat2))
+    sin_u1, cos_u1 = np.sin(u1), np.cos(u1)
+    sin_u2, cos_u2 = np.sin(u2), np.cos(u2)
+    big_l = lon2 - lon1
+    lam = big_l.copy()
+
+    converged = np.zeros(lam.shape, dtype=bool)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for _ in range(max_iterations):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.hypot(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+            cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cos_u1 * cos_u2 * sin_lam / sin_sigma)
+            cos2_alpha = 1 - sin_alpha * sin_alpha
+            # on the equator cos2_alpha is 0 and cos_2sigma_m is not used
+            cos_2sigma_m = np.where(cos2_alpha == 0, 0.0, cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alpha)
+            c = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+            lam_new = big_l + (1 - c) * f * sin_alpha * (
+                sigma + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+            converged = np.abs(lam_new - lam) <= tolerance
+            lam = lam_new
+            if converged.all():
+                break
+
+        u_sq = cos2_alpha * (a * a - b * b) / (b * b)
+        big_a = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+        big_b = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+        delta_sigma = big_b * sin_sigma * (cos_2sigma_m + big_b / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+            - big_b / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+        distances = b * big_a * (sigma - delta_sigma)
+    return np.where(converged, distances, np.nan)
+
+
+def distance_matrix(points, others, method="ground"):
+    # This function returns the (N, M) matrix of distances between all points and
+    # all others with method "planar" or "ground" (both in a projected CRS), or
+    # "vincenty" for (lon, lat) points
+    if method == "planar":
+        return planar_distances(points, np.asarray(others, dtype=float).reshape(-1, 2))
+    if method == "ground":
+        return ground_distances(points, np.asarray(others, dtype=float).reshape(-1, 2))
+    if method == "vincenty":
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        others = np.asarray(others, dtype=float).reshape(-1, 2)
+        return vincenty_distances(points[:, 0, None], points[:, 1, None],
+                                  others[None, :, 0], others[None, :, 1])
+    raise ValueError(f"Unknown distance method '{method}'")
+
+
+def nearest(points, others, method="ground"):
+    # This function returns, for every point, the position of the closest other
+    # point and the distance to it
+    matrix = distance_matrix(points, others, method)
+    positions = np.argmin(matrix, axis=1)
+    return positions, matrix[np.arange(len(positions)), positions]
@@ -0,0 +1,99 @@
+# district_catalogue.py
+# The district layer is read once and kept for the next runs of the processing
+# algorithm (Exercise_7.py). The district names for the drop down list are read
+# without geometries; the geometries, attributes, areas and bounding boxes are
+# read in one pass the first time a district is needed. A name -> feature id
+# dictionary finds a district without scanning the layer.
+# The catalogue is read again when the shapefile (or one of its .dbf, .shx and
+# .cpg files) changes on disk or the number of features changes.
+
+import os
+from .shapefile_cache import _source_versions
+
+
+def layer_version(layer):
+    # This function returns a value that changes when the data of layer changes:
+    # the modification time and size of its source files and its number of
+    # features. For a shapefile the .dbf, .shx and .cpg count as well, editing
+    # only the attributes rewrites nothing but the .dbf.
+    source = layer.source().split("|")[0]
+    base, extension = os.path.splitext(source)
+    if extension.lower() == ".shp":
+        versions = _source_versions(base)
+    elif os.path.exists(source):
+        versions = {extension: [os.path.getmtime(source), os.path.getsize(source)]}
+    else:
+        versions = {}
+    files = tuple((name, tuple(version)) for name, version in sorted(versions.items()))
+    return (files, layer.featureCount())
+
+
+class DistrictCatalogue:
+    # This class holds the names, attributes, geometries, areas and bounding boxes
+    # of the features of a district layer.
+
+    def __init__(self, layer, name_field="Name"):
+        self.layer = layer
+        self.name_field = name_field
+        self.version = layer_version(layer)
+        self._ids_by_name = None
+        self._features = None
+
+    def _read_names(self):
+        # This method reads only the name field, without geometries
+        from qgis.core import QgsFeatureRequest
+        request = QgsFeatureRequest()
+        request.setFlags(QgsFeatureRequest.NoGeometry)
+        request.setSubsetOfAttributes([self.name_field], self.layer.fields())
+        self._ids_by_name = {feature[self.name_field]: feature.id()
+                             for feature in self.layer.getFeatures(request)}
+
+    def _read_features(self):
+        # This method reads every feature once with all attributes and its geometry
+        field_names = self.layer.fields().names()
+        self._features = {}
+        self._ids_by_name = {}
+        for feature in self.layer.getFeatures():
+            geometry = feature.geometry()
+            self._features[feature.id()] = {
+                "attributes": dict(zip(field_names, feature.attributes())),
+                "geometry": geometry,
+                "area": geometry.area(),
+                "bbox": geometry.boundingBox(),
+            }
+            self._ids_by_name[feature[self.name_field]] = feature.id()
+
+    def names(self):
+        # This method returns the district names sorted alphabetically
+        if self._ids_by_name is None:
+            self._read_names()
+        return sorted(self._ids_by_name)
+
+    def feature_id(self, name):
+        # This method returns the feature id of a district, or None
+        if self._ids_by_name is None:
+            self._read_names()
+        return self._ids_by_name.get(name)
+
+    def district(self, name):
+        # This method returns {"attributes", "geometry", "area", "bbox"} of a
+        # district, or None if there is no district with that name
+        if self._features is None:
+            self._read_features()
+        feature_id = self._ids_by_name.get(name)
+        return None if feature_id is None else self._features[feature_id]
+
+
+# one catalogue per district layer, reused between runs of the processing algorithm
+_catalogues = {}
+
+
+def catalogue_for_layer(layer, name_field="Name"):
+    # This function returns a cached DistrictCatalogue for a layer and reads it
+    # again when the source file or the number of features has changed
+    key = (layer.id(), name_field)
+    cached = _catalogues.get(key)
+    if cached is None or cached.version != layer_version(layer):
+        cached = DistrictCatalogue(layer, name_field)
+        _catalogues[key] = cached
+    return cached
@@ -0,0 +1,84 @@
+# district_profile.py
+# Turning the per district numbers into city district profiles and map data.
+# The numbers of all districts are counted in one spatial join pass per layer and
+# kept in the SQLite store (aggregate_store.py); profile_from_store() builds the
+# profile of one district from them, including the parcel overlay.
+
+from .point_index import index_for_layer
+
+
+# how the point layers are drawn: (colour, marker size, label)
+HOUSEHOLD_STYLE = ("#7f7f7f", 1, "Households")
+THEME_STYLE = ("#d62728", 30, None)
+
+
+def polygon_rings(geometry):
+    # This function turns a (multi)polygon QgsGeometry into plain lists:
+    # a list of parts, every part a list of rings, every ring a list of (x, y)
+    if geometry.isMultipart():
+        polygons = geometry.asMultiPolygon()
+    else:
+        polygons = [geometry.asPolygon()]
+    return [[[(p.x(), p.y()) for p in ring] for ring in polygon] for polygon in polygons]
+
+
+def map_layers(households, theme_points, theme):
+    # This function puts the household and theme points into the list that
+    # render_district_map() expects
+    colour, size, label = HOUSEHOLD_STYLE
+    layers = [(households[0], households[1], colour, size, label)]
+    colour, size, _ = THEME_STYLE
+    layers.append((theme_points[0], theme_points[1], colour, size, theme))
+    return layers
+
+
+def make_profile(district_name, parent_name, area_m2, households, parcels,
+                 theme, theme_count, type_counts, population=None):
+    # This function collects everything the report shows in one dictionary
+    return {
+        "district_name": district_name,
+        "parent_name": parent_name,
+        "area_km2": round(area_m2 / 1_000_000, 2),
+        "households": households,
+        "parcels": parcels,
+        "theme": theme,
+        "theme_count": theme_count,
+        "type_counts": dict(type_counts),
+        "population": population,
+    }
+
+
+def profile_from_store(numbers, theme, theme_layer_name, households_layer_name="House_Numbers",
+                       parcels_layer_name="Muenster_Parcels"):
+    # This function builds the profile of one district from the numbers that
+    # AggregateStore.district() returns, including the population and the
+    # parcel overlay when the store has them
+    counts = numbers["counts"]
+    profile = make_profile(numbers["name"], numbers["parent"], numbers["area_m2"],
+                           counts.get(households_layer_name, 0),
+                           counts.get(parcels_layer_name, 0), theme,
+                           counts.get(theme_layer_name, 0),
+                           numbers["categories"].get(theme_layer_name, {}),
+                           numbers["population"])
+    parcel_overlay = numbers["overlays"].get(parcels_layer_name)
+    if parcel_overlay:
+        profile["parcels_partial"] = parcel_overlay["partial"]
+        profile["parcel_area_share"] = parcel_overlay["area_share"]
+    return profile
+
+
+def map_data(geometry, households_points, theme_points, theme):
+    # This function returns the plain data needed to draw the map of one district
+    return {
+        "parts": polygon_rings(geometry),
+        "layers": map_layers(households_points, theme_points, theme),
+    }
+
+
+def layer_points(layer, members):
+    # This function returns the x and y lists of the features of layer at the
+    # positions in members, as returned by contained_positions() or aggregate_by_polygon()
+    if layer is None:
+        return [], []
+    return index_for_layer(layer).points(members)
+
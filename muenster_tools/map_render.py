@@ -0,0 +1,64 @@
+# map_render.py
+# Drawing the district map for the profile without the QGIS map canvas.
+# The district polygon and its points are drawn from plain coordinate lists with
+# matplotlib's Agg backend, so it needs no GUI, no sleep and gives the same image
+# for the same input every time.
+
+from matplotlib.figure import Figure
+from matplotlib.patches import PathPatch
+from matplotlib.path import Path as MplPath
+
+
+def _rings_path(parts):
+    # This function builds one matplotlib path from all rings, holes included
+    vertices = []
+    codes = []
+    for part in parts:
+        for ring in part:
+            if len(ring) < 3:
+                continue
+            vertices.extend(ring)
+            vertices.append(ring[0])
+            codes.append(MplPath.MOVETO)
+            codes.extend([MplPath.LINETO] * (len(ring) - 1))
+            codes.append(MplPath.CLOSEPOLY)
+    return MplPath(vertices, codes)
+
+
+def render_district_map(parts, point_layers, output, width_px=1000, height_px=800, dpi=100,
+                        background=None):
+    # This function draws the district and its points and saves it as a png.
+    # parts comes from polygon_rings() in district_profile.py, point_layers is a list of
+    # (xs, ys, colour, marker size, label) and output a file path or a file object.
+    # background is an optional (pixels, extent) pair from Orthophoto.read_window()
+    # that is drawn below the district.
+    fig = Figure(figsize=(width_px / dpi, height_px / dpi), dpi=dpi)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_axis_off()
+    ax.set_aspect("equal")
+
+    path = _rings_path(parts)
+    # an empty window means the district is not on the image
+    if background is not None and background[0].size:
+        pixels, extent = background
+        ax.imshow(pixels, extent=extent, interpolation="nearest", zorder=0)
+        ax.add_patch(PathPatch(path, facecolor="none", edgecolor="#ffff00", linewidth=2, zorder=1))
+    else:
+        ax.add_patch(PathPatch(path, facecolor="#e8f0e0", edgecolor="#333333", linewidth=1.5))
+
+    for xs, ys, colour, size, label in point_layers:
+        if len(xs):
+            ax.scatter(xs, ys, s=size, c=colour, label=label, linewidths=0, zorder=2)
+
+    # zoom to the district with a small margin around it
+    (xmin, ymin), (xmax, ymax) = path.get_extents().get_points()
+    margin = max(xmax - xmin, ymax - ymin) * 0.05
+    ax.set_xlim(xmin - margin, xmax + margin)
+    ax.set_ylim(ymin - margin, ymax + margin)
+
+    if any(layer[4] for layer in point_layers if len(layer[0])):
+        ax.legend(loc="lower right", fontsize=8, markerscale=3)
+
+    # no software version in the png, so the file only depends on the input
+    fig.savefig(output, format="png", metadata={"Software": None})
+    return output
@@ -0,0 +1,194 @@
+# nearest_neighbour.py
+# Answering "which schools are closest to this address?" for one address or for
+# all ~65k households at once. The points of a layer (Schools, House_Numbers,
+# public_swimming_pools) are sorted into a regular grid. Queries are handled in
+# groups: all query points in the same group cell share the same candidate cells,
+# so the distances of a whole group are computed with one NumPy call. A handful
+# of points is searched by measuring every pair.
+
+import numpy as np
+from .point_in_polygon import MAX_BLOCK_ELEMENTS
+
+# up to this many points, measuring every pair is as fast as the grid, and a grid
+# of a few points close together has very small cells
+BRUTE_FORCE_POINTS = 32
+# the queries are grouped so that a group holds at least about this many of them
+QUERIES_PER_GROUP = 8
+
+
+class PointGrid:
+    # This class answers k nearest neighbour and radius queries over a set of points.
+
+    def __init__(self, xy, cell_size=None, points_per_cell=4):
+        # xy is an (n, 2) array of points in a projected CRS. Without cell_size the
+        # cells are made about points_per_cell points large on average.
+        self.xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        if len(self.xy) == 0:
+            raise ValueError("A PointGrid needs at least one point")
+        self.xmin, self.ymin = self.xy.min(axis=0)
+        xmax, ymax = self.xy.max(axis=0)
+        if cell_size is None:
+            area = max((xmax - self.xmin) * (ymax - self.ymin), 1.0)
+            cell_size = np.sqrt(area * points_per_cell / len(self.xy))
+        self.cell_size = float(cell_size) or 1.0
+        self.nx = int((xmax - self.xmin) // self.cell_size) + 1
+        self.ny = int((ymax - self.ymin) // self.cell_size) + 1
+
+        # the point positions sorted by cell; the points of cell c are
+        # order[starts[c]:starts[c + 1]], cells are numbered row by row
+        cx = ((self.xy[:, 0] - self.xmin) // self.cell_size).astype(np.int64)
+        cy = ((self.xy[:, 1] - self.ymin) // self.cell_size).astype(np.int64)
+        cells = cy * self.nx + cx
+        self.order = np.argsort(cells, kind="stable")
+        self.starts = np.searchsorted(cells[self.order], np.arange(self.nx * self.ny + 1))
+
+    @classmethod
+    def from_layer(cls, layer, cell_size=None):
+        # This method builds the grid from a QGIS point layer; grid.ids holds the
+        # feature id of every point
+        from .point_index import index_for_layer
+        index = index_for_layer(layer)
+        if index.xy is None:
+            raise ValueError(f"Layer '{layer.name()}' is not a point layer")
+        grid = cls(index.xy, cell_size)
+        grid.ids = np.array(index.ids, dtype=np.int64)
+        return grid
+
+    def __len__(self):
+        return len(self.xy)
+
+    def _window(self, xmin, ymin, xmax, ymax):
+        # This method returns the positions of the points in all cells that
+        # touch the box (xmin, ymin, xmax, ymax)
+        size = self.cell_size
+        cx0 = max(int((xmin - self.xmin) // size), 0)
+        cy0 = max(int((ymin - self.ymin) // size), 0)
+        cx1 = min(int((xmax - self.xmin) // size), self.nx - 1)
+        cy1 = min(int((ymax - self.ymin) // size), self.ny - 1)
+        if cx0 > cx1 or cy0 > cy1:
+            return np.empty(0, dtype=np.int64)
+        parts = [self.order[self.starts[cy * self.nx + cx0]:self.starts[cy * self.nx + cx1 + 1]]
+                 for cy in range(cy0, cy1 + 1)]
+        return np.concatenate(parts)
+
+    def _covers_all(self, xmin, ymin, xmax, ymax):
+        # This method returns True if the box contains every cell of the grid
+        return (xmin <= self.xmin and ymin <= self.ymin
+                and xmax >= self.xmin + self.nx * self.cell_size
+                and ymax >= self.ymin + self.ny * self.cell_size)
+
+    def _groups(self, queries):
+        # This method returns the positions of the query points per group of
+        # nearby queries
+        # the groups are grid cells, made larger when that still leaves fewer than
+        # QUERIES_PER_GROUP queries per group on average: a grid of a few close
+        # points has tiny cells and would give every query its own group
+        xmin, ymin = queries.min(axis=0)
+        xmax, ymax = queries.max(axis=0)
+        area = max((xmax - xmin) * (ymax - ymin), 1.0)
+        size = max(self.cell_size, np.sqrt(area * QUERIES_PER_GROUP / len(queries)))
+        cx = np.floor((queries[:, 0] - self.xmin) / size).astype(np.int64)
+        cy = np.floor((queries[:, 1] - self.ymin) / size).astype(np.int64)
+        # one number per cell, so a plain sort groups them
+        cx -= cx.min()
+        cy -= cy.min()
+        cells = cy * (cx.max() + 1) + cx
+        order = np.argsort(cells, kind="stable")
+        bounds = np.flatnonzero(np.diff(cells[order])) + 1
+        return np.split(order, bounds)
+
+    def _distances(self, queries, candidates):
+        # This method returns the (queries x candidates) distance matrix
+        points = self.xy[candidates]
+        return np.hypot(queries[:, 0, None] - points[None, :, 0],
+                        queries[:, 1, None] - points[None, :, 1])
+
+    def _k_best(self, query_points, candidates, k, max_elements):
+        # This method returns the positions in candidates and the distances of the
+        # k nearest candidates of every query point (not sorted), measured in
+        # blocks of at most max_elements distances
+        best = np.empty((len(query_points), k), dtype=np.int64)
+        best_distances = np.empty((len(query_points), k), dtype=float)
+        block = max(1, max_elements // len(candidates))
+        for start in range(0, len(query_points), block):
+            matrix = self._distances(query_points[start:start + block], candidates)
+            part = np.argpartition(matrix, k - 1, axis=1)[:, :k]
+            best[start:start + block] = part
+            best_distances[start:start + block] = np.take_along_axis(matrix, part, axis=1)
+        return best, best_distances
+
+    def nearest(self, queries, k=1, max_elements=MAX_BLOCK_ELEMENTS):
+        # This method returns the positions and distances of the k nearest points
+        # of every query point as two (number of queries, k) arrays, closest first
+        queries = np.asarray(queries, dtype=float).reshape(-1, 2)
+        if len(queries) == 0 or len(self.xy) <= BRUTE_FORCE_POINTS:
+            return brute_force_nearest(self.xy, queries, k, max_elements)
+        k = min(k, len(self.xy))
+        positions = np.empty((len(queries), k), dtype=np.int64)
+        distances = np.empty((len(queries), k), dtype=float)
+        for group in self._groups(queries):
+            group_points = queries[group]
+            qxmin, qymin = group_points.min(axis=0)
+            qxmax, qymax = group_points.max(axis=0)
+
+            # grow the window until it holds k points ...
+            reach = self.cell_size
+            while True:
+                box = (qxmin - reach, qymin - reach, qxmax + reach, qymax + reach)
+                candidates = self._window(*box)
+                if len(candidates) >= k or self._covers_all(*box):
+                    break
+                reach *= 2
+            best, best_distances = self._k_best(group_points, candidates, k, max_elements)
+            # ... and then far enough that no closer point can be outside of it
+            farthest = best_distances.max()
+            if farthest > reach and not self._covers_all(*box):
+                candidates = self._window(qxmin - farthest, qymin - farthest,
+                                          qxmax + farthest, qymax + farthest)
+                best, best_distances = self._k_best(group_points, candidates, k, max_elements)
+            sort = np.argsort(best_distances, axis=1, kind="stable")
+            positions[group] = candidates[np.take_along_axis(best, sort, axis=1)]
+            distances[group] = np.take_along_axis(best_distances, sort, axis=1)
+        return positions, distances
+
+    def within(self, queries, radius, max_elements=MAX_BLOCK_ELEMENTS):
+        # This method returns, for every query point, a (positions, distances) pair
+        # of the points at most radius away, closest first
+        queries = np.asarray(queries, dtype=float).reshape(-1, 2)
+        if len(queries) == 0:
+            return []
+        result = [None] * len(queries)
+        for group in self._groups(queries):
+            group_points = queries[group]
+            qxmin, qymin = group_points.min(axis=0)
+            qxmax, qymax = group_points.max(axis=0)
+            candidates = self._window(qxmin - radius, qymin - radius, qxmax + radius, qymax + radius)
+            block = max(1, max_elements // max(len(candidates), 1))
+            for start in range(0, len(group), block):
+                rows = group[start:start + block]
+                matrix = self._distances(queries[rows], candidates)
+                for row, query_distances in zip(rows, matrix):
+                    hits = np.flatnonzero(query_distances <= radius)
+                    sort = np.argsort(query_distances[hits], kind="stable")
+                    result[row] = (candidates[hits[sort]], query_distances[hits[sort]])
+        return result
+
+
+def brute_force_nearest(points, queries, k=1, max_elements=MAX_BLOCK_ELEMENTS):
+    # This function finds the k nearest points by measuring every pair. It is the
+    # baseline for the benchmark and for checking PointGrid.
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    queries = np.asarray(queries, dtype=float).reshape(-1, 2)
+    k = min(k, len(points))
+    positions = np.empty((len(queries), k), dtype=np.int64)
+    distances = np.empty((len(queries), k), dtype=float)
+    block = max(1, max_elements // len(points))
+    for start in range(0, len(queries), block):
+        q = queries[start:start + block]
+        matrix = np.hypot(q[:, 0, None] - points[None, :, 0], q[:, 1, None] - points[None, :, 1])
+        best = np.argpartition(matrix, k - 1, axis=1)[:, :k]
+        best_distances = np.take_along_axis(matrix, best, axis=1)
+        sort = np.argsort(best_distances, axis=1, kind="stable")
+        positions[start:start + block] = np.take_along_axis(best, sort, axis=1)
+        distances[start:start + block] = np.take_along_axis(best_distances, sort, axis=1)
+    return positions, distances
@@ -0,0 +1,182 @@
+# orthophoto.py
+# Cutting the part of the Luftbild_MS aerial image that lies under a district,
+# without loading the whole image. The .tfw world file turns a bounding box in
+# map coordinates into a pixel window. The compressed GeoTIFF is unpacked once,
+# strip by strip, into uncompressed .npy files next to it (a cache), together
+# with smaller copies of half, a quarter, ... the size (the overview pyramid).
+# The .npy files are memory mapped, so reading a window only touches the pixels
+# of that window, and the smallest level that is still detailed enough is used.
+# Building the cache needs GDAL (it comes with QGIS), reading it only NumPy.
+
+import json
+import math
+import os
+import numpy as np
+
+# rows that are read from the GeoTIFF at a time while the cache is built
+STRIP_ROWS = 512
+# the pyramid stops when the smallest level is below this size in pixels
+SMALLEST_LEVEL = 256
+
+
+class WorldFile:
+    # This class reads a .tfw world file: pixel size, rotation and the map
+    # coordinates of the centre of the upper left pixel.
+
+    def __init__(self, path):
+        with open(path, "r") as f:
+            values = [float(line) for line in f if line.strip()]
+        if len(values) != 6:
+            raise ValueError(f"{path} is not a world file")
+        self.pixel_width, rotation_y, rotation_x, self.pixel_height, self.x0, self.y0 = values
+        if rotation_x or rotation_y:
+            raise ValueError(f"Rotated images are not supported ({path})")
+
+    def scaled(self, factor):
+        # This method returns the world file of the image shrunk by factor
+        scaled = object.__new__(WorldFile)
+        scaled.pixel_width = self.pixel_width * factor
+        scaled.pixel_height = self.pixel_height * factor
+        # the upper left pixel centre moves, because the pixels get bigger
+        scaled.x0 = self.x0 - self.pixel_width / 2 + scaled.pixel_width / 2
+        scaled.y0 = self.y0 - self.pixel_height / 2 + scaled.pixel_height / 2
+        return scaled
+
+    def pixel_window(self, bbox, width, height):
+        # This method returns (column, row, columns, rows) of the pixels that cover
+        # bbox = (xmin, ymin, xmax, ymax), cut to an image of width x height pixels
+        xmin, ymin, xmax, ymax = bbox
+        left = self.x0 - self.pixel_width / 2
+        top = self.y0 - self.pixel_height / 2
+        col0 = max(int(math.floor((xmin - left) / self.pixel_width)), 0)
+        col1 = min(int(math.ceil((xmax - left) / self.pixel_width)), width)
+        # pixel_height is negative, rows count down from the top
+        row0 = max(int(math.floor((ymax - top) / self.pixel_height)), 0)
+        row1 = min(int(math.ceil((ymin - top) / self.pixel_height)), height)
+        return col0, row0, max(col1 - col0, 0), max(row1 - row0, 0)
+
+    def window_extent(self, column, row, columns, rows):
+        # This method returns (xmin, xmax, ymin, ymax) of a pixel window, the order
+        # matplotlib's imshow expects
+        left = self.x0 - self.pixel_width / 2 + column * self.pixel_width
+        top = self.y0 - self.pixel_height / 2 + row * self.pixel_height
+        return (left, left + columns * self.pixel_width, top + rows * self.pixel_height, top)
+
+
+def _source_version(path):
+    # This function returns what the cache remembers about the GeoTIFF
+    return [os.path.getmtime(path), os.path.getsize(path)]
+
+
+class Orthophoto:
+    # This class reads windows of a georeferenced image from its memory mapped cache.
+
+    def __init__(self, tif_path, cache_folder=None):
+        self.tif_path = tif_path
+        base = os.path.splitext(tif_path)[0]
+        self.world = WorldFile(base + ".tfw")
+        name = os.path.basename(base)
+        self.cache_base = os.path.join(cache_folder or os.path.dirname(tif_path), name + ".cache")
+        self.levels = None
+
+    def _level_path(self, level):
+        return f"{self.cache_base}.level{level}.npy"
+
+    def _info_path(self):
+        return self.cache_base + ".json"
+
+    def cache_is_current(self):
+        # This method returns True if the cache exists and was built from the
+        # GeoTIFF as it is now
+        if not os.path.exists(self._info_path()):
+            return False
+        with open(self._info_path(), "r") as f:
+            info = json.load(f)
+        if os.path.exists(self.tif_path) and info["source"] != _source_version(self.tif_path):
+            return False
+        return all(os.path.exists(self._level_path(level)) for level in range(info["levels"]))
+
+    def build_cache(self, strip_rows=STRIP_ROWS, dataset=None):
+        # This method unpacks the GeoTIFF strip by strip into level 0 and halves it
+        # again and again for the pyramid (nearest neighbour, like the .aux.xml says).
+        # dataset is the opened image (RasterXSize, RasterYSize, RasterCount and
+        # ReadAsArray like a GDAL dataset); by default the GeoTIFF is opened with GDAL.
+        if dataset is None:
+            from osgeo import gdal
+            dataset = gdal.Open(self.tif_path)
+            if dataset is None:
+                raise IOError(f"Could not open {self.tif_path}")
+        width, height, bands = dataset.RasterXSize, dataset.RasterYSize, dataset.RasterCount
+        folder = os.path.dirname(self.cache_base)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        level0 = np.lib.format.open_memmap(self._level_path(0), mode="w+", dtype=np.uint8,
+                                           shape=(height, width, bands))
+        for row in range(0, height, strip_rows):
+            rows = min(strip_rows, height - row)
+            strip = dataset.ReadAsArray(0, row, width, rows)
+            level0[row:row + rows] = strip.reshape(bands, rows, width).transpose(1, 2, 0)
+        level0.flush()
+        del level0, dataset
+
+        level = 0
+        previous = np.load(self._level_path(0), mmap_mode="r")
+        while max(previous.shape[:2]) > SMALLEST_LEVEL:
+            level += 1
+            smaller = np.lib.format.open_memmap(
+                self._level_path(level), mode="w+", dtype=np.uint8,
+                shape=((previous.shape[0] + 1) // 2, (previous.shape[1] + 1) // 2, bands))
+            for row in range(0, smaller.shape[0], strip_rows):
+                smaller[row:row + strip_rows] = previous[2 * row:2 * (row + strip_rows):2, ::2]
+            smaller.flush()
+            del smaller
+            previous = np.load(self._level_path(level), mmap_mode="r")
+
+        with open(self._info_path(), "w") as f:
+            json.dump({"source": _source_version(self.tif_path), "levels": level + 1}, f)
+        self.levels = None
+
+    def _open_levels(self):
+        # This method memory maps all levels of the cache, building it if needed
+        current = self.cache_is_current()
+        if self.levels is None or not current:
+            # the old memory maps are closed before the files are written again
+            self.levels = None
+            if not current:
+                self.build_cache()
+            with open(self._info_path(), "r") as f:
+                count = json.load(f)["levels"]
+            self.levels = [np.load(self._level_path(level), mmap_mode="r") for level in range(count)]
+        return self.levels
+
+    def read_window(self, bbox, max_size=None):
+        # This method returns (pixels, extent) for bbox = (xmin, ymin, xmax, ymax):
+        # pixels is a (rows, columns, bands) uint8 array and extent is
+        # (xmin, xmax, ymin, ymax) of the pixels that were read. With max_size the
+        # smallest pyramid level with at least max_size pixels on the longer side
+        # is used.
+        levels = self._open_levels()
+        level = 0
+        if max_size:
+            columns, rows = self.world.pixel_window(bbox, levels[0].shape[1], levels[0].shape[0])[2:]
+            while (level + 1 < len(levels)
+                   and max(columns, rows) / 2 ** (level + 1) >= max_size):
+                level += 1
+        pixels = levels[level]
+        world = self.world.scaled(2 ** level) if level else self.world
+        column, row, columns, rows = world.pixel_window(bbox, pixels.shape[1], pixels.shape[0])
+        window = np.array(pixels[row:row + rows, column:column + columns])
+        return window, world.window_extent(column, row, columns, rows)
+
+
+# one Orthophoto per image, so the memory maps are opened once
+_orthophotos = {}
+
+
+def orthophoto(tif_path, cache_folder=None):
+    # This function returns a cached Orthophoto for an image path
+    key = (os.path.abspath(tif_path), cache_folder)
+    if key not in _orthophotos:
+        _orthophotos[key] = Orthophoto(tif_path, cache_folder)
+    return _orthophotos[key]
@@ -0,0 +1,57 @@
+# point_export.py
+# Writing the name and the X/Y coordinates of point features into a CSV file
+# (Exercise_4_2.py). Only the name field and the geometry are requested from
+# the data provider, the features are streamed with a QgsFeatureRequest instead
+# of building the whole selection first, and the rows are written in batches.
+# With wgs84=True every batch also gets longitude / latitude columns, transformed
+# in one call per batch.
+
+import csv
+from .coordinate_transform import transformer
+
+
+def export_points_csv(layer, output_path, name_field="Name", selected_only=True,
+                      batch_size=10000, buffer_size=1024 * 1024, delimiter=";", wgs84=False):
+    # This function writes "name;x;y" rows for the selected features of layer
+    # (or for all features with selected_only=False) and returns the number of rows.
+    # batch_size rows are collected before they go to the csv writer, and the file
+    # itself is buffered with buffer_size bytes. wgs84=True adds "lon;lat" columns.
+    from qgis.core import QgsFeatureRequest
+
+    request = QgsFeatureRequest()
+    request.setSubsetOfAttributes([name_field], layer.fields())
+    if selected_only:
+        selected_ids = layer.selectedFeatureIds()
+        if not selected_ids:
+            return 0
+        request.setFilterFids(selected_ids)
+
+    name_index = layer.fields().lookupField(name_field)
+    if name_index < 0:
+        raise ValueError(f"Field '{name_field}' not found in layer '{layer.name()}'")
+
+    to_wgs84 = transformer(layer.crs().authid(), "EPSG:4326") if wgs84 else None
+
+    def write_batch(writer, batch):
+        # This function writes one batch of rows, with the WGS84 columns if wanted
+        if to_wgs84 is not None and batch:
+            xs = [row[1] for row in batch]
+            ys = [row[2] for row in batch]
+            lons, lats = to_wgs84(xs, ys)
+            batch = [row + (lon, lat) for row, lon, lat in zip(batch, lons.tolist(), lats.tolist())]
+        writer.writerows(batch)
+        return len(batch)
+
+    written = 0
+    with open(output_path, "w", newline="", encoding="utf-8", buffering=buffer_size) as f:
+        writer = csv.writer(f, delimiter=delimiter, lineterminator="\n")
+        writer.writerow(["Name", "X", "Y"] + (["Lon", "Lat"] if wgs84 else []))
+        batch = []
+        for feature in layer.getFeatures(request):
+            point = feature.geometry().asPoint()
+            batch.append((feature.attribute(name_index), point.x(), point.y()))
+            if len(batch) >= batch_size:
+                written += write_batch(writer, batch)
+                batch = []
+        written += write_batch(writer, batch)
+    return written
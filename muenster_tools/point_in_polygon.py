@@ -0,0 +1,127 @@
+# point_in_polygon.py
+# A vectorized point in polygon test with NumPy.
+# Instead of one QgsGeometry.contains call per feature, a whole (N, 2) array of
+# points is classified against a polygon in one call with the even-odd ray casting
+# rule. All rings of all parts are tested together, so holes and multipart
+# polygons work without extra code. Points exactly on the boundary can end up on
+# either side.
+
+import numpy as np
+
+# the largest (points x edges) block that is computed at once, about 32 MB per array
+MAX_BLOCK_ELEMENTS = 4_000_000
+
+
+def rings_from_geometry(geometry):
+    # This function turns a (multi)polygon QgsGeometry into a list of (n, 2) arrays
+    if geometry.isMultipart():
+        polygons = geometry.asMultiPolygon()
+    else:
+        polygons = [geometry.asPolygon()]
+    return [np.array([(p.x(), p.y()) for p in ring], dtype=float)
+            for polygon in polygons for ring in polygon]
+
+
+def polygon_edges(rings):
+    # This function returns the edges of all rings as four arrays x1, y1, x2, y2.
+    # Rings may be closed (last point == first point) or open.
+    x1 = []
+    y1 = []
+    x2 = []
+    y2 = []
+    for ring in rings:
+        ring = np.asarray(ring, dtype=float)
+        if len(ring) < 3:
+            continue
+        start = ring
+        end = np.roll(ring, -1, axis=0)
+        if np.array_equal(ring[0], ring[-1]):
+            start = ring[:-1]
+            end = ring[1:]
+        x1.append(start[:, 0])
+        y1.append(start[:, 1])
+        x2.append(end[:, 0])
+        y2.append(end[:, 1])
+    if not x1:
+        empty = np.empty(0)
+        return empty, empty, empty, empty
+    return np.concatenate(x1), np.concatenate(y1), np.concatenate(x2), np.concatenate(y2)
+
+
+def rings_bbox(rings):
+    # This function returns (xmin, ymin, xmax, ymax) of a list of rings
+    points = np.concatenate([np.asarray(ring, dtype=float).reshape(-1, 2) for ring in rings])
+    return points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max()
+
+
+def _crossings(px, py, edges, max_elements):
+    # This function counts, for every point, the edges a ray to +x crosses, and
+    # returns True where the count is odd. The points are handled in blocks so that
+    # a block never has more than max_elements (point, edge) pairs.
+    x1, y1, x2, y2 = edges
+    inside = np.zeros(len(px), dtype=bool)
+    if len(x1) == 0 or len(px) == 0:
+        return inside
+    # edges that are horizontal never count, so dividing by dy is safe where used
+    dy = y2 - y1
+    slope = np.divide(x2 - x1, dy, out=np.zeros_like(dy), where=dy != 0)
+    block = max(1, max_elements // len(x1))
+    for start in range(0, len(px), block):
+        bx = px[start:start + block, None]
+        by = py[start:start + block, None]
+        straddles = (y1 > by) != (y2 > by)
+        x_cross = x1 + (by - y1) * slope
+        hits = straddles & (bx < x_cross)
+        inside[start:start + block] = (np.count_nonzero(hits, axis=1) & 1).astype(bool)
+    return inside
+
+
+def points_in_polygon(points, rings, bbox=None, max_elements=MAX_BLOCK_ELEMENTS, edges=None):
+    # This function returns a bool array that is True for the points inside the
+    # polygon given by rings (exterior rings and holes of all parts).
+    # Only points inside the bounding box get the exact test, and the exact test
+    # runs in blocks of at most max_elements (point, edge) pairs.
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    result = np.zeros(len(points), dtype=bool)
+    if len(points) == 0 or not rings:
+        return result
+    if bbox is None:
+        bbox = rings_bbox(rings)
+    if edges is None:
+        edges = polygon_edges(rings)
+    xmin, ymin, xmax, ymax = bbox
+    px = points[:, 0]
+    py = points[:, 1]
+    candidates = np.flatnonzero((px >= xmin) & (px <= xmax) & (py >= ymin) & (py <= ymax))
+    if len(candidates):
+        result[candidates] = _crossings(px[candidates], py[candidates], edges, max_elements)
+    return result
+
+
+def points_in_polygon_chunked(points, rings, chunk_size=100_000, max_elements=MAX_BLOCK_ELEMENTS):
+    # This function does the same as points_in_polygon() for very large inputs or
+    # iterators of point arrays: it yields one bool array per chunk, so neither the
+    # input nor the result has to be in memory at once.
+    bbox = rings_bbox(rings)
+    edges = polygon_edges(rings)
+    if isinstance(points, np.ndarray):
+        chunks = (points[start:start + chunk_size] for start in range(0, len(points), chunk_size))
+    else:
+        chunks = points
+    for chunk in chunks:
+        yield points_in_polygon(chunk, rings, bbox, max_elements, edges)
+
+
+def points_in_polygons(points, polygons, max_elements=MAX_BLOCK_ELEMENTS):
+    # This function assigns every point to the first polygon that contains it.
+    # polygons is a list of ring lists; the result has the polygon position for
+    # every point, or -1 for points outside all polygons.
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    owner = np.full(len(points), -1, dtype=np.int64)
+    for p, rings in enumerate(polygons):
+        free = np.flatnonzero(owner < 0)
+        if len(free) == 0:
+            break
+        inside = points_in_polygon(points[free], rings, max_elements=max_elements)
+        owner[free[inside]] = p
+    return owner
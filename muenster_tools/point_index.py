@@ -0,0 +1,225 @@
+# point_index.py
+# A small grid based spatial index for counting features inside a district polygon.
+# The index is built once per layer. A district query only looks at the grid cells
+# that overlap the district bounding box, and the exact contains test only runs on
+# the features that survive this prefilter.
+
+import math
+from collections import Counter
+import numpy as np
+from .district_catalogue import layer_version
+from .prepared_polygon import prepared_geometry
+
+
+class GridIndex:
+    # This class stores bounding boxes (xmin, ymin, xmax, ymax) in a regular grid.
+
+    def __init__(self, boxes, cell_size=None):
+        # boxes is a list of (xmin, ymin, xmax, ymax) tuples, the position in the
+        # list is the id that the queries return
+        self.boxes = list(boxes)
+        self.cells = {}
+        self.multi_cell = False
+        if not self.boxes:
+            self.xmin = self.ymin = 0.0
+            self.cell_size = 1.0
+            self.last_cell = (-1, -1)
+            return
+
+        self.xmin = min(b[0] for b in self.boxes)
+        self.ymin = min(b[1] for b in self.boxes)
+        xmax = max(b[2] for b in self.boxes)
+        ymax = max(b[3] for b in self.boxes)
+        if cell_size is None:
+            # aim for a handful of features per cell
+            area = max((xmax - self.xmin) * (ymax - self.ymin), 1.0)
+            cell_size = math.sqrt(area / len(self.boxes)) * 2
+        self.cell_size = max(cell_size, 1e-9)
+        # the (column, row) of the last occupied cell; queries never look further
+        self.last_cell = self._cell(xmax, ymax)
+
+        for i, box in enumerate(self.boxes):
+            c0, r0 = self._cell(box[0], box[1])
+            c1, r1 = self._cell(box[2], box[3])
+            if c0 != c1 or r0 != r1:
+                self.multi_cell = True
+            for c in range(c0, c1 + 1):
+                for r in range(r0, r1 + 1):
+                    self.cells.setdefault((c, r), []).append(i)
+
+    def _cell(self, x, y):
+        # This method returns the grid cell (column, row) of a coordinate
+        return (int((x - self.xmin) // self.cell_size),
+                int((y - self.ymin) // self.cell_size))
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def query(self, bbox, within=False):
+        # This method returns the ids of the boxes intersecting bbox.
+        # With within=True only boxes that lie completely inside bbox are returned,
+        # which is a necessary condition for a contains test to succeed.
+        qxmin, qymin, qxmax, qymax = bbox
+        # only the cells of the query box that hold boxes are visited, a small
+        # grid queried with a large box would loop over millions of empty cells
+        c0, r0 = self._cell(qxmin, qymin)
+        c1, r1 = self._cell(qxmax, qymax)
+        c0, r0 = max(c0, 0), max(r0, 0)
+        c1, r1 = min(c1, self.last_cell[0]), min(r1, self.last_cell[1])
+        found = []
+        seen = set() if self.multi_cell else None
+        boxes = self.boxes
+        for c in range(c0, c1 + 1):
+            for r in range(r0, r1 + 1):
+                for i in self.cells.get((c, r), ()):
+                    if seen is not None:
+                        if i in seen:
+                            continue
+                        seen.add(i)
+                    b = boxes[i]
+                    if within:
+                        if b[0] >= qxmin and b[1] >= qymin and b[2] <= qxmax and b[3] <= qymax:
+                            found.append(i)
+                    elif b[0] <= qxmax and b[2] >= qxmin and b[1] <= qymax and b[3] >= qymin:
+                        found.append(i)
+        found.sort()
+        return found
+
+
+def rect_to_tuple(rect):
+    # This function turns a QgsRectangle into a (xmin, ymin, xmax, ymax) tuple
+    return (rect.xMinimum(), rect.yMinimum(), rect.xMaximum(), rect.yMaximum())
+
+
+class FeatureIndex:
+    # This class reads a layer once and keeps the feature ids, geometries and a
+    # GridIndex over their bounding boxes, so many districts can be counted
+    # without scanning the layer again.
+
+    def __init__(self, ids, geometries, cell_size=None, fields=None, attributes=None):
+        self.ids = list(ids)
+        self.geometries = list(geometries)
+        # field names and one attribute list per feature, used by aggregate_by_polygon()
+        self.fields = list(fields or [])
+        self.attributes = list(attributes) if attributes is not None else None
+        self.grid = GridIndex(
+            [rect_to_tuple(g.boundingBox()) for g in self.geometries], cell_size
+        )
+        # for point layers the coordinates are also kept in one array, so the exact
+        # test can run vectorized over all candidates at once
+        boxes = self.grid.boxes
+        self.xy = None
+        if boxes and all(b[0] == b[2] and b[1] == b[3] for b in boxes):
+            self.xy = np.array([(b[0], b[1]) for b in boxes], dtype=float)
+
+    @classmethod
+    def from_layer(cls, layer, cell_size=None):
+        # This method builds the index from every feature of a QGIS vector layer
+        ids = []
+        geometries = []
+        attributes = []
+        for feature in layer.getFeatures():
+            geometry = feature.geometry()
+            if geometry is None or geometry.isEmpty():
+                continue
+            ids.append(feature.id())
+            geometries.append(geometry)
+            attributes.append(feature.attributes())
+        fields = [field.name() for field in layer.fields()]
+        return cls(ids, geometries, cell_size, fields, attributes)
+
+    def candidates(self, geometry):
+        # This method returns the positions of the features that can be inside geometry
+        return self.grid.query(rect_to_tuple(geometry.boundingBox()), within=True)
+
+    def inside(self, geometry, positions):
+        # This method returns the positions (from the given ones) that are inside
+        # geometry. geometry is prepared once and kept (prepared_polygon.py); point
+        # layers use its vectorized test, other layers its GEOS engine.
+        if not len(positions):
+            return []
+        prepared = prepared_geometry(geometry)
+        if self.xy is not None:
+            mask = prepared.contains_points(self.xy[positions])
+            return np.asarray(positions)[mask].tolist()
+        mask = prepared.contains_geometries([self.geometries[i] for i in positions])
+        return [i for i, is_inside in zip(positions, mask) if is_inside]
+
+    def contained_positions(self, geometry):
+        # This method returns the positions of all features inside geometry
+        return self.inside(geometry, self.candidates(geometry))
+
+    def contained(self, geometry):
+        # This method returns the feature ids of all features inside geometry
+        return [self.ids[i] for i in self.contained_positions(geometry)]
+
+    def points(self, positions):
+        # This method returns the x and y lists of the features at positions.
+        # For points this is the point itself, otherwise the bounding box centre.
+        boxes = self.grid.boxes
+        xs = [(boxes[i][0] + boxes[i][2]) / 2 for i in positions]
+        ys = [(boxes[i][1] + boxes[i][3]) / 2 for i in positions]
+        return xs, ys
+
+    def count_contained(self, geometry):
+        # This method counts the features inside geometry
+        return len(self.contained_positions(geometry))
+
+    def assign(self, polygons):
+        # This method does a spatial join of all features against a list of polygon
+        # geometries. It returns one entry per feature: the position of the first
+        # polygon that contains it, or None. Every feature is tested only against the
+        # polygons whose bounding box contains it, and is skipped once assigned.
+        owner = [None] * len(self.geometries)
+        for p, polygon in enumerate(polygons):
+            free = [i for i in self.candidates(polygon) if owner[i] is None]
+            for i in self.inside(polygon, free):
+                owner[i] = p
+        return owner
+
+    def aggregate_by_polygon(self, polygons, category_field=None):
+        # This method joins the features to the polygons once and returns, for every
+        # polygon, the count, a Counter of category_field values and the positions
+        # of the features inside it
+        category_pos = self.fields.index(category_field) if category_field else None
+        results = [{"count": 0, "categories": Counter(), "members": []} for _ in polygons]
+        for i, p in enumerate(self.assign(polygons)):
+            if p is None:
+                continue
+            results[p]["count"] += 1
+            results[p]["members"].append(i)
+            if category_pos is not None:
+                results[p]["categories"][self.attributes[i][category_pos]] += 1
+        return results
+
+
+# one FeatureIndex per layer, reused between runs of the processing algorithm
+_layer_indexes = {}
+
+
+def index_for_layer(layer):
+    # This function returns a cached FeatureIndex for a layer and rebuilds it
+    # when the layer has changed (see layer_version): features that were moved
+    # change the file, even when their number stays the same
+    key = layer.id()
+    cached = _layer_indexes.get(key)
+    version = layer_version(layer)
+    if cached is None or cached[0] != version:
+        cached = (version, FeatureIndex.from_layer(layer))
+        _layer_indexes[key] = cached
+    return cached[1]
+
+
+def count_points_in_polygon(layer, geometry):
+    # This function counts the features of layer that lie inside geometry
+    return index_for_layer(layer).count_contained(geometry)
+
+
+def count_points_full_scan(layer, geometry):
+    # This function is the old way of counting, one contains test per feature.
+    # It is kept as the baseline for the benchmark.
+    count = 0
+    for feature in layer.getFeatures():
+        if geometry.contains(feature.geometry()):
+            count += 1
+    return count
@@ -0,0 +1,58 @@
+# polygon_overlay.py
+# Overlaying the parcels with the districts: which parcels lie completely inside
+# a district, which ones cross its boundary, and how much of their area falls
+# into the district. The parcels are found through the grid index of their
+# bounding boxes, and every district is prepared once (GEOS prepared geometry)
+# before it is tested against its candidate parcels. Only the parcels that cross
+# the boundary need the expensive intersection.
+
+from .point_index import rect_to_tuple
+from .prepared_polygon import prepared_geometry
+
+INSIDE = "inside"
+PARTIAL = "partial"
+
+
+def classify(polygon, index, engine=None):
+    # This function yields (position, INSIDE or PARTIAL, overlapping area) for the
+    # features of a FeatureIndex that overlap polygon. Features that only touch
+    # the boundary of polygon are left out.
+    engine = engine or prepared_geometry(polygon).engine()
+    for i in index.grid.query(rect_to_tuple(polygon.boundingBox())):
+        other = index.geometries[i]
+        if engine.contains(other.constGet()):
+            yield i, INSIDE, other.area()
+        elif engine.intersects(other.constGet()):
+            area = polygon.intersection(other).area()
+            if area > 0:
+                yield i, PARTIAL, area
+
+
+def overlay(polygons, index):
+    # This function overlays every polygon with the features of index at once and
+    # returns one dictionary per polygon with the positions of the features
+    # "inside" and "partial" (partly inside), their overlapping areas
+    # "inside_area" and "partial_area", and "area_share", the part of the polygon
+    # covered by the features
+    results = []
+    for polygon in polygons:
+        stats = {"inside": [], "partial": [], "inside_area": 0.0, "partial_area": 0.0}
+        for i, status, area in classify(polygon, index):
+            stats[status].append(i)
+            stats[status + "_area"] += area
+        polygon_area = polygon.area()
+        covered = stats["inside_area"] + stats["partial_area"]
+        stats["area_share"] = covered / polygon_area if polygon_area else 0.0
+        results.append(stats)
+    return results
+
+
+def feature_shares(polygons, index):
+    # This function returns, for every feature of index, a list of
+    # (polygon position, share of the feature area inside that polygon)
+    shares = [[] for _ in index.geometries]
+    for p, polygon in enumerate(polygons):
+        for i, status, area in classify(polygon, index):
+            feature_area = index.geometries[i].area()
+            shares[i].append((p, 1.0 if status == INSIDE else area / feature_area))
+    return shares
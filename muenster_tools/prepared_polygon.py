@@ -0,0 +1,155 @@
+# prepared_polygon.py
+# Preparing a district polygon once for many containment tests. The same
+# district is tested against thousands of points (countpoints in Exercise_7.py,
+# the school filter of Exercise_5_1.py), and every QgsGeometry.contains call or
+# plain ray casting test walks all edges of all rings again.
+# A PreparedPolygon cuts the polygon into horizontal bands and remembers which
+# edges cross each band (an edge interval index over y). A point is then only
+# tested against the few edges of its own band. For other geometries than points
+# a prepared GEOS engine is kept as well.
+# Prepared polygons are kept in a small least recently used cache, keyed by the
+# layer, feature id and layer version, or by the geometry itself.
+
+from collections import OrderedDict
+import numpy as np
+from .point_in_polygon import (MAX_BLOCK_ELEMENTS, _crossings, polygon_edges, rings_bbox,
+                               rings_from_geometry)
+from .district_catalogue import layer_version
+
+# how many prepared polygons are kept; the 45 districts fit
+MAX_PREPARED = 64
+# about this many edges end up in one band
+EDGES_PER_BAND = 8
+
+
+def prepared_engine(geometry):
+    # This function returns a prepared GEOS engine for fast repeated tests
+    from qgis.core import QgsGeometry
+    engine = QgsGeometry.createGeometryEngine(geometry.constGet())
+    engine.prepareGeometry()
+    return engine
+
+
+class PreparedPolygon:
+    # This class answers "which of these points are inside?" for one polygon.
+
+    def __init__(self, rings, geometry=None, edges_per_band=EDGES_PER_BAND):
+        # rings is a list of (n, 2) arrays (exterior rings and holes of all parts),
+        # geometry the QgsGeometry they come from, if any
+        self.rings = rings
+        self.geometry = geometry
+        self._engine = None
+        self.bbox = rings_bbox(rings) if rings else (np.nan, np.nan, np.nan, np.nan)
+        x1, y1, x2, y2 = polygon_edges(rings)
+        # horizontal edges are never crossed by the ray, so they are left out
+        keep = y1 != y2
+        self.edges = (x1[keep], y1[keep], x2[keep], y2[keep])
+
+        # the edge positions sorted by band; an edge is listed in every band its
+        # y range touches, the edges of band b are
+        # band_edges[starts[b]:starts[b + 1]]
+        count = len(self.edges[0])
+        self.bands = max(1, count // edges_per_band)
+        ymin, ymax = (self.bbox[1], self.bbox[3]) if count else (0.0, 1.0)
+        self.ymin = ymin
+        self.band_height = (ymax - ymin) / self.bands or 1.0
+        low = self._band(np.minimum(self.edges[1], self.edges[3]))
+        high = self._band(np.maximum(self.edges[1], self.edges[3]))
+        spans = high - low + 1
+        first = np.cumsum(spans) - spans
+        bands = np.repeat(low, spans) + np.arange(spans.sum()) - np.repeat(first, spans)
+        order = np.argsort(bands, kind="stable")
+        self.band_edges = np.repeat(np.arange(count), spans)[order]
+        self.starts = np.searchsorted(bands[order], np.arange(self.bands + 1))
+
+    @classmethod
+    def from_geometry(cls, geometry):
+        # This method prepares a (multi)polygon QgsGeometry
+        return cls(rings_from_geometry(geometry), geometry)
+
+    def _band(self, y):
+        # This method returns the band number of y values
+        band = np.floor((y - self.ymin) / self.band_height).astype(np.int64)
+        return np.clip(band, 0, self.bands - 1)
+
+    def contains_points(self, points, max_elements=MAX_BLOCK_ELEMENTS):
+        # This method returns a bool array that is True for the points inside the
+        # polygon. Points exactly on the boundary can end up on either side.
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        result = np.zeros(len(points), dtype=bool)
+        if len(points) == 0 or len(self.edges[0]) == 0:
+            return result
+        xmin, ymin, xmax, ymax = self.bbox
+        px = points[:, 0]
+        py = points[:, 1]
+        candidates = np.flatnonzero((px >= xmin) & (px <= xmax) & (py >= ymin) & (py <= ymax))
+        if len(candidates) == 0:
+            return result
+
+        # the candidates grouped by band, each group is tested with its band's edges
+        bands = self._band(py[candidates])
+        order = np.argsort(bands, kind="stable")
+        candidates = candidates[order]
+        bounds = np.searchsorted(bands[order], np.arange(self.bands + 1))
+        for band in np.flatnonzero(np.diff(bounds)):
+            group = candidates[bounds[band]:bounds[band + 1]]
+            selected = self.band_edges[self.starts[band]:self.starts[band + 1]]
+            edges = tuple(values[selected] for values in self.edges)
+            result[group] = _crossings(px[group], py[group], edges, max_elements)
+        return result
+
+    def contains_point(self, x, y):
+        # This method returns True if the point (x, y) is inside the polygon
+        return bool(self.contains_points([(x, y)])[0])
+
+    def engine(self):
+        # This method returns a prepared GEOS engine of the geometry, made once
+        if self._engine is None:
+            if self.geometry is None:
+                raise ValueError("This polygon was prepared without a QgsGeometry")
+            self._engine = prepared_engine(self.geometry)
+        return self._engine
+
+    def contains_geometries(self, geometries):
+        # This method returns a bool list that is True for the QgsGeometries that
+        # lie completely inside the polygon
+        engine = self.engine()
+        return [engine.contains(geometry.constGet()) for geometry in geometries]
+
+
+# the prepared polygons, the most recently used last
+_prepared = OrderedDict()
+
+
+def _cached(key, build):
+    # This function returns the prepared polygon stored under key, or builds and
+    # stores it, dropping the least recently used one when the cache is full
+    prepared = _prepared.get(key)
+    if prepared is not None:
+        _prepared.move_to_end(key)
+        return prepared
+    prepared = build()
+    _prepared[key] = prepared
+    if len(_prepared) > MAX_PREPARED:
+        _prepared.popitem(last=False)
+    return prepared
+
+
+def prepared_feature(layer, feature_id):
+    # This function returns the PreparedPolygon of one feature of a polygon layer.
+    # It is prepared again when the layer changes (see layer_version).
+    key = (layer.id(), feature_id, layer_version(layer))
+    return _cached(key, lambda: PreparedPolygon.from_geometry(layer.getFeature(feature_id).geometry()))
+
+
+def prepared_geometry(geometry):
+    # This function returns the PreparedPolygon of a QgsGeometry. Geometries
+    # without a feature id are recognised by their WKB, so the same district
+    # geometry read again is not prepared again.
+    key = ("wkb", bytes(geometry.asWkb()))
+    return _cached(key, lambda: PreparedPolygon.from_geometry(geometry))
+
+
+def clear_prepared():
+    # This function empties the cache of prepared polygons
+    _prepared.clear()
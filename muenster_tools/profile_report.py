@@ -0,0 +1,162 @@
+# profile_report.py
+# Writing the city district profile PDF (Exercise_7.py).
+# The functions here only need plain python values, so they can run in worker
+# processes while QGIS stays in the main process. The pie chart and the map stay
+# in memory and go straight into ReportLab, nothing is written to the temp folder.
+
+import io
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import spawn
+from matplotlib.figure import Figure
+from reportlab.graphics import renderPDF
+from reportlab.graphics.charts.piecharts import Pie
+from reportlab.graphics.shapes import Drawing
+from reportlab.lib.colors import HexColor
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+from .map_render import render_district_map
+
+# the same colours matplotlib uses, so the vector pie looks like the png one
+PIE_COLOURS = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+               "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf"]
+
+
+def pie_chart_image(type_counts):
+    # This function draws the pie chart of the theme types into an in-memory png
+    labels = list(type_counts.keys())
+    sizes = list(type_counts.values())
+    # the Figure class does not need a GUI backend, so it also works in workers
+    fig = Figure(figsize=(4, 4))
+    ax = fig.subplots()
+    ax.pie(sizes, labels=labels, autopct="%1.1f%%", startangle=90)
+    ax.axis("equal")
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    buffer.seek(0)
+    return ImageReader(buffer)
+
+
+def pie_chart_drawing(type_counts, size=200):
+    # This function builds the pie chart as ReportLab vector graphics
+    total = sum(type_counts.values())
+    drawing = Drawing(size, size)
+    pie = Pie()
+    pie.x = pie.y = size * 0.2
+    pie.width = pie.height = size * 0.6
+    pie.data = list(type_counts.values())
+    pie.labels = [f"{label} ({count / total * 100:.1f}%)" for label, count in type_counts.items()]
+    pie.startAngle = 90
+    pie.direction = "anticlockwise"
+    pie.slices.strokeWidth = 0.5
+    pie.slices.fontSize = 7
+    for i in range(len(pie.data)):
+        pie.slices[i].fillColor = HexColor(PIE_COLOURS[i % len(PIE_COLOURS)])
+    drawing.add(pie)
+    return drawing
+
+
+def map_image(map_data):
+    # This function draws the district map without the map canvas into an in-memory png
+    buffer = io.BytesIO()
+    render_district_map(map_data["parts"], map_data["layers"], buffer,
+                        background=map_data.get("background"))
+    buffer.seek(0)
+    return ImageReader(buffer)
+
+
+def write_profile_pdf(profile, output_file, map_picture=None, vector_pie=False):
+    # This function writes one district profile to a PDF file (a path or a file object).
+    # map_picture can be an image path or an ImageReader; without it the map is
+    # drawn from profile["map"] if it is there. With vector_pie=True the pie chart
+    # is drawn as vector graphics instead of a png.
+    district_name = profile["district_name"]
+    theme = profile["theme"]
+    if map_picture is None and profile.get("map"):
+        map_picture = map_image(profile["map"])
+
+    # Preparing the text for the theme count
+    if profile["theme_count"] == 0:
+        theme_count_text = f"No {theme.lower()} in this district"
+    else:
+        theme_count_text = f"{theme}: {profile['theme_count']}"
+
+
+    # Creating the PDF report using ReportLab
+    c = canvas.Canvas(output_file, pagesize=A4)
+    width, height = A4
+
+    # Setting the PDF title and adding district information
+    c.setFont("Helvetica", 16)
+    c.drawString(100, height - 50, f"City District Profile: {district_name}")
+
+    c.setFont("Helvetica", 12)
+    text = (
+        f"Parent District: {profile['parent_name']}\n"
+        f"District Name: {district_name}\n"
+        f"Area: {profile['area_km2']} km²\n"
+        f"Households: {profile['households']}\n"
+        f"Parcels: {profile['parcels']}\n"
+        f"{theme_count_text}"
+    )
+    if profile.get("population") is not None:
+        text += f"\nPopulation: {profile['population']}"
+    if profile.get("parcels_partial"):
+        text += (f"\nParcels crossing the boundary: {profile['parcels_partial']} "
+                 f"(parcels cover {profile['parcel_area_share']:.0%} of the district)")
+    y = height - 100
+    for line in text.split("\n"):
+        c.drawString(100, y, line)
+        y -= 20
+
+    # Adding the map image to the PDF
+    if map_picture:
+        c.drawImage(map_picture, 50, 200, width=500, preserveAspectRatio=True, mask="auto")
+
+    # Embedding the pie chart for the theme types if there are any
+    if profile["type_counts"]:
+        if vector_pie:
+            renderPDF.draw(pie_chart_drawing(profile["type_counts"]), c, 50, 50)
+        else:
+            c.drawImage(pie_chart_image(profile["type_counts"]), 50, 50, width=200,
+                        preserveAspectRatio=True, mask="auto")
+
+    c.showPage()
+    c.save()
+    return output_file
+
+
+def _write_job(job):
+    # This function unpacks one job for the process pool
+    profile, output_file, map_image_path, vector_pie = job
+    return write_profile_pdf(profile, output_file, map_image_path, vector_pie)
+
+
+def write_profiles(jobs, max_workers=None, vector_pie=False):
+    # This function writes many profiles at once in a process pool.
+    # jobs is a list of (profile, output_file, map_image_path) tuples, where
+    # map_image_path may be None to draw the map from profile["map"].
+    jobs = [(profile, output_file, map_image_path, vector_pie)
+            for profile, output_file, map_image_path in jobs]
+    if max_workers == 1 or len(jobs) < 2:
+        return [_write_job(job) for job in jobs]
+    if max_workers is None:
+        max_workers = min(len(jobs), os.cpu_count() or 1)
+    # the workers are started fresh ("spawn"): forking the QGIS process with its
+    # Qt threads can deadlock the copies
+    context = multiprocessing.get_context("spawn")
+    previous = spawn.get_executable()
+    # inside QGIS sys.executable is the QGIS program itself, the workers need the
+    # python interpreter that ships with it. The setting is shared by everything in
+    # the process, so it is put back once the workers have been started.
+    if os.path.basename(sys.executable).lower().startswith("qgis"):
+        python = "pythonw.exe" if os.name == "nt" else os.path.join("bin", "python3")
+        context.set_executable(os.path.join(sys.exec_prefix, python))
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+            return list(executor.map(_write_job, jobs))
+    finally:
+        context.set_executable(previous)
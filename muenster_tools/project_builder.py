@@ -0,0 +1,88 @@
+# project_builder.py
+# Building a QGIS project from all shapefiles of a folder (Exercise_4_3.py).
+# Opening a layer mostly waits for the disk, so the layers are opened and
+# checked in a thread pool. Missing or outdated spatial indexes are built
+# on the way. The layers are then added in file name order, so the project is
+# the same on every run, and the time and size of every layer is reported.
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .shapefile_reader import ShapefileReader
+from .spatial_index_files import shipped_index
+
+# the files that belong to one shapefile and count for its size
+SHAPEFILE_PARTS = (".shp", ".shx", ".dbf", ".prj", ".cpg", ".qix", ".sbn", ".sbx")
+
+
+def shapefile_paths(folder):
+    # This function returns the paths of all .shp files in folder, sorted by name
+    return sorted(os.path.join(folder, fn) for fn in os.listdir(folder)
+                  if fn.lower().endswith(".shp"))
+
+
+def shapefile_size(shp_path):
+    # This function returns the size in bytes of a shapefile and its side files
+    base = os.path.splitext(shp_path)[0]
+    return sum(os.path.getsize(base + ext) for ext in SHAPEFILE_PARTS
+               if os.path.exists(base + ext))
+
+
+def needs_spatial_index(shp_path):
+    # This function returns True if there is no .qix or .sbn next to the .shp
+    # that matches its records (see spatial_index_files.shipped_index)
+    with ShapefileReader(shp_path) as reader:
+        return shipped_index(reader) is None
+
+
+def open_layer(shp_path, build_index=True):
+    # This function opens one shapefile and returns a dictionary with the layer
+    # (None if it is not valid), the seconds it took and the size on disk.
+    # It is run in the worker threads.
+    from qgis.core import QgsVectorLayer
+    from qgis.PyQt.QtCore import QCoreApplication
+
+    start = time.perf_counter()
+    name = os.path.splitext(os.path.basename(shp_path))[0]
+    layer = QgsVectorLayer(shp_path, name, "ogr")
+    result = {"name": name, "path": shp_path, "layer": None, "features": 0,
+              "index_built": False, "error": None}
+    if not layer.isValid():
+        result["error"] = "not a valid layer"
+    else:
+        if build_index and needs_spatial_index(shp_path):
+            result["index_built"] = layer.dataProvider().createSpatialIndex()
+        result["features"] = layer.featureCount()
+        # the layer was made in this thread and has to live in the main thread
+        application = QCoreApplication.instance()
+        if application is not None:
+            layer.moveToThread(application.thread())
+        result["layer"] = layer
+    result["seconds"] = time.perf_counter() - start
+    result["size"] = shapefile_size(shp_path)
+    return result
+
+
+def build_project(project, folder, max_workers=None, build_index=True):
+    # This function opens all shapefiles of folder in parallel and adds the valid
+    # ones to project in file name order. It returns the open_layer() results.
+    paths = shapefile_paths(folder)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda path: open_layer(path, build_index), paths))
+    for result in results:
+        if result["layer"] is not None:
+            project.addMapLayer(result["layer"])
+    return results
+
+
+def format_report(results):
+    # This function returns the results of build_project() as a text table,
+    # the slowest layer first
+    lines = [f"{'Layer':<40} {'Seconds':>8} {'Size MB':>8} {'Features':>9}  Note"]
+    for result in sorted(results, key=lambda r: r["seconds"], reverse=True):
+        note = result["error"] or ("spatial index built" if result["index_built"] else "")
+        lines.append(f"{result['name']:<40} {result['seconds']:>8.3f} "
+                     f"{result['size'] / 1e6:>8.2f} {result['features']:>9}  {note}")
+    total = sum(r["seconds"] for r in results)
+    lines.append(f"{'Total (sum of all threads)':<40} {total:>8.3f}")
+    return "\n".join(lines)
@@ -0,0 +1,199 @@
+# reverse_geocode.py
+# Finding the district of (latitude, longitude) coordinates, like Exercise_5_2.py,
+# but for many coordinates. A DistrictLookup is built once: the coordinate
+# transform and the district polygons with a bounding box index are kept, and every
+# query only reuses them. Batches of coordinates are transformed and tested with
+# NumPy in one go.
+#
+# It can also be used from the command line without QGIS:
+#   python -m muenster_tools.reverse_geocode < coordinates.txt
+#   python -m muenster_tools.reverse_geocode --csv points.csv --lat lat --lon lon
+
+import argparse
+import csv
+import os
+import sys
+import numpy as np
+from .point_index import GridIndex
+from .district_catalogue import layer_version
+from .prepared_polygon import PreparedPolygon, prepared_feature
+from .shapefile_cache import cached_shapefile
+from .coordinate_transform import transformer
+
+DEFAULT_DATA_FOLDER = os.path.join(os.path.dirname(__file__), "..", "Muenster")
+
+
+class DistrictLookup:
+    # This class answers (lat, lon) -> district name questions.
+
+    def __init__(self, names, polygons, transform):
+        # names is a list of district names, polygons a list of ring lists or
+        # PreparedPolygons in the layer CRS, and transform a function
+        # (lon array, lat array) -> (x, y arrays)
+        self.names = list(names)
+        self.polygons = [p if isinstance(p, PreparedPolygon) else PreparedPolygon(p) for p in polygons]
+        self.transform = transform
+        self.bboxes = [polygon.bbox for polygon in self.polygons]
+        self.grid = GridIndex(self.bboxes)
+
+    @classmethod
+    def from_layer(cls, district_layer, name_field="Name"):
+        # This method builds the lookup from a QGIS district layer
+        from qgis.core import (QgsCoordinateReferenceSystem, QgsCoordinateTransform,
+                               QgsFeatureRequest, QgsPointXY, QgsProject)
+        names = []
+        polygons = []
+        # only the names are read here, the geometries come from the cache of
+        # prepared polygons
+        request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry)
+        request.setSubsetOfAttributes([name_field], district_layer.fields())
+        for feature in district_layer.getFeatures(request):
+            names.append(feature[name_field])
+            polygons.append(prepared_feature(district_layer, feature.id()))
+
+        crs_layer = district_layer.crs()
+        try:
+            return cls(names, polygons, transformer("EPSG:4326", crs_layer.authid()))
+        except ValueError:
+            # a CRS that needs pyproj, but pyproj is missing: the QGIS transform
+            # is used point by point
+            pass
+
+        crs84 = QgsCoordinateReferenceSystem("EPSG:4326")
+        qgs_transform = QgsCoordinateTransform(crs84, crs_layer, QgsProject.instance())
+
+        def transform(lon, lat):
+            points = [qgs_transform.transform(QgsPointXY(x, y)) for x, y in zip(lon, lat)]
+            return (np.array([p.x() for p in points], dtype=float),
+                    np.array([p.y() for p in points], dtype=float))
+
+        return cls(names, polygons, transform)
+
+    @classmethod
+    def from_shapefile(cls, path, name_field="Name", target_crs="EPSG:25832"):
+        # This method builds the lookup straight from a district shapefile, without QGIS
+        reader = cached_shapefile(path)
+        names = reader.column(name_field)
+        polygons = [[np.array(ring) for ring in reader.rings(i)] for i in range(len(reader))]
+        return cls(names, polygons, transformer("EPSG:4326", target_crs))
+
+    def lookup(self, latitude, longitude):
+        # This method returns the district name for one coordinate, or None
+        x, y = self.transform(np.array([longitude], dtype=float), np.array([latitude], dtype=float))
+        point = np.array([[x[0], y[0]]])
+        for p in self.grid.query((x[0], y[0], x[0], y[0])):
+            if self.polygons[p].contains_points(point)[0]:
+                return self.names[p]
+        return None
+
+    def lookup_indexes(self, latitudes, longitudes):
+        # This method returns the district position of every coordinate as an int
+        # array, -1 where the coordinate is outside all districts
+        x, y = self.transform(np.asarray(longitudes, dtype=float),
+                              np.asarray(latitudes, dtype=float))
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        owner = np.full(len(x), -1, dtype=np.int64)
+        for p, polygon in enumerate(self.polygons):
+            # only the free points inside the district bounding box get the exact test
+            xmin, ymin, xmax, ymax = self.bboxes[p]
+            candidates = np.flatnonzero((x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax))
+            candidates = candidates[owner[candidates] < 0]
+            if len(candidates) == 0:
+                continue
+            points = np.column_stack([x[candidates], y[candidates]])
+            inside = polygon.contains_points(points)
+            owner[candidates[inside]] = p
+        return owner
+
+    def lookup_many(self, latitudes, longitudes, chunk_size=1_000_000):
+        # This method returns the district names (None outside) for many coordinates.
+        # The coordinates are handled in chunks so memory use stays bounded.
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        names = np.array(self.names + [None], dtype=object)
+        result = np.empty(len(latitudes), dtype=object)
+        for start in range(0, len(latitudes), chunk_size):
+            stop = start + chunk_size
+            result[start:stop] = names[self.lookup_indexes(latitudes[start:stop],
+                                                           longitudes[start:stop])]
+        return result
+
+
+# one lookup per district layer, so repeated questions do not rebuild it
+_layer_lookups = {}
+
+
+def lookup_for_layer(district_layer):
+    # This function returns a cached DistrictLookup for a district layer and
+    # builds it again when the layer has changed (see layer_version)
+    key = district_layer.id()
+    cached = _layer_lookups.get(key)
+    version = layer_version(district_layer)
+    if cached is None or cached[0] != version:
+        cached = (version, DistrictLookup.from_layer(district_layer))
+        _layer_lookups[key] = cached
+    return cached[1]
+
+
+def _valid_coordinates(rows):
+    # This function turns (row, lat column, lon column) into (row, lat, lon) and
+    # skips the rows without two numbers, with a message on stderr
+    for number, (row, lat_column, lon_column) in enumerate(rows, start=1):
+        try:
+            yield row, float(row[lat_column]), float(row[lon_column])
+        except (IndexError, ValueError):
+            print(f"Skipping row {number}, it has no valid coordinates: {row}", file=sys.stderr)
+
+
+def _coordinate_chunks(rows, chunk_size):
+    # This function groups (row, lat, lon) tuples into chunks of lists
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def main(argv=None):
+    # This function reads coordinates from stdin or a CSV file and writes them
+    # back with the district name as the last column
+    parser = argparse.ArgumentParser(description="Find the Muenster district of lat/lon coordinates.")
+    parser.add_argument("--districts", default=os.path.join(DEFAULT_DATA_FOLDER, "Muenster_City_Districts.shp"),
+                        help="district shapefile")
+    parser.add_argument("--csv", help="CSV file to read instead of 'lat,lon' lines from stdin")
+    parser.add_argument("--lat", default="lat", help="latitude column of the CSV file")
+    parser.add_argument("--lon", default="lon", help="longitude column of the CSV file")
+    parser.add_argument("--delimiter", default=",", help="CSV delimiter")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="coordinates per batch")
+    args = parser.parse_args(argv)
+
+    lookup = DistrictLookup.from_shapefile(args.districts)
+    writer = csv.writer(sys.stdout, delimiter=args.delimiter)
+
+    if args.csv:
+        source = open(args.csv, newline="", encoding="utf-8-sig")
+        reader = csv.reader(source, delimiter=args.delimiter)
+        header = next(reader)
+        lat_column = header.index(args.lat)
+        lon_column = header.index(args.lon)
+        writer.writerow(header + ["district"])
+        rows = ((row, lat_column, lon_column) for row in reader)
+    else:
+        source = sys.stdin
+        rows = ([value.strip() for value in line.split(",")] for line in source if line.strip())
+        rows = ((row, 0, 1) for row in rows)
+
+    with source:
+        for chunk in _coordinate_chunks(_valid_coordinates(rows), args.chunk_size):
+            latitudes = [lat for _, lat, _ in chunk]
+            longitudes = [lon for _, _, lon in chunk]
+            names = lookup.lookup_many(latitudes, longitudes)
+            writer.writerows(row + [name or ""] for (row, _, _), name in zip(chunk, names))
+
+
+if __name__ == "__main__":
+    main()
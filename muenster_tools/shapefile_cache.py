@@ -0,0 +1,224 @@
+# shapefile_cache.py
+# A columnar copy of a shapefile that opens in milliseconds. The .shp and .dbf
+# are read once with ShapefileReader and written into a folder of .npy files
+# next to the shapefile (<name>.cache/):
+#   coordinates.npy     all points of all records, float64 (n, 2)
+#   record_rings.npy    where the rings of every record start, int32
+#   ring_points.npy     where the points of every ring start, int32
+#   bboxes.npy          the bounding box of every record, float64 (n, 4)
+#   <field>.npy         numbers and logical fields as float64 / int64 / bool
+#   <field>.codes.npy   text fields as int32 codes into <field>.values.npy
+# The .npy files are memory mapped, so opening the cache reads almost nothing.
+# info.json remembers the modification time and size of the source files; the
+# cache is built again when they change.
+
+import json
+import os
+import numpy as np
+from .shapefile_reader import ShapefileReader, NULL_SHAPE, POINT_TYPES
+
+# the source files that are checked before the cache is used
+SOURCE_EXTENSIONS = (".shp", ".shx", ".dbf", ".cpg")
+# raised when the layout of the cache files changes, old caches are then rebuilt
+CACHE_FORMAT = 1
+
+
+def _source_versions(base):
+    # This function returns {extension: [mtime, size]} of the source files that exist
+    versions = {}
+    for extension in SOURCE_EXTENSIONS:
+        path = base + extension
+        if os.path.exists(path):
+            versions[extension] = [os.path.getmtime(path), os.path.getsize(path)]
+    return versions
+
+
+def _column_file(folder, name, suffix=".npy"):
+    # This function returns the path of a column file; field names may hold
+    # characters that are not allowed in file names
+    safe = "".join(c if c.isalnum() or c in "_-" else f"%{ord(c):02x}" for c in name)
+    return os.path.join(folder, "field." + safe + suffix)
+
+
+def build_cache(reader, folder):
+    # This function writes the columnar cache of a ShapefileReader into folder
+    os.makedirs(folder, exist_ok=True)
+    count = len(reader)
+    if reader.shape_type in POINT_TYPES:
+        # one ring of one point per record; null shapes are NaN
+        coordinates = np.ascontiguousarray(reader.points(), dtype=np.float64)
+        record_rings = np.arange(count + 1, dtype=np.int32)
+        ring_points = np.arange(count + 1, dtype=np.int32)
+    else:
+        parts = []
+        ring_starts = []
+        record_rings = np.zeros(count + 1, dtype=np.int32)
+        total = 0
+        for i in range(count):
+            rings = [] if reader.record_type(i) == NULL_SHAPE else reader.rings(i)
+            for ring in rings:
+                ring_starts.append(total)
+                parts.append(ring)
+                total += len(ring)
+            record_rings[i + 1] = len(ring_starts)
+        coordinates = np.concatenate(parts).astype(np.float64) if parts else np.empty((0, 2))
+        ring_points = np.array(ring_starts + [total], dtype=np.int32)
+    np.save(os.path.join(folder, "coordinates.npy"), coordinates)
+    np.save(os.path.join(folder, "record_rings.npy"), record_rings)
+    np.save(os.path.join(folder, "ring_points.npy"), ring_points)
+    np.save(os.path.join(folder, "bboxes.npy"), reader.bboxes().astype(np.float64))
+
+    fields = []
+    for name in reader.fields:
+        values = reader.column(name)
+        if isinstance(values, np.ndarray):
+            np.save(_column_file(folder, name), values)
+            fields.append([name, "array"])
+        else:
+            # text columns repeat few values (street names, school types), so
+            # every distinct value is stored once and the rows get its number
+            distinct, codes = np.unique(np.array(values, dtype=str), return_inverse=True)
+            np.save(_column_file(folder, name, ".codes.npy"), codes.astype(np.int32))
+            np.save(_column_file(folder, name, ".values.npy"), distinct)
+            fields.append([name, "dictionary"])
+
+    # info.json is written last, so a half written cache is never used
+    info = {"format": CACHE_FORMAT, "source": _source_versions(reader.base),
+            "shape_type": reader.shape_type, "bbox": list(reader.bbox),
+            "count": count, "fields": fields}
+    with open(os.path.join(folder, "info.json"), "w") as f:
+        json.dump(info, f)
+
+
+def cache_is_current(base, folder):
+    # This function returns True if the cache in folder was built from the
+    # shapefile base (path without extension) as it is now
+    info_path = os.path.join(folder, "info.json")
+    if not os.path.exists(info_path):
+        return False
+    with open(info_path, "r") as f:
+        info = json.load(f)
+    return info.get("format") == CACHE_FORMAT and info["source"] == _source_versions(base)
+
+
+class CachedShapefile:
+    # This class reads a shapefile cache; it has the same methods as
+    # ShapefileReader for geometries and columns.
+
+    def __init__(self, folder):
+        self.folder = folder
+        with open(os.path.join(folder, "info.json"), "r") as f:
+            info = json.load(f)
+        self.shape_type = info["shape_type"]
+        self.bbox = tuple(info["bbox"])
+        self.count = info["count"]
+        self.fields = [name for name, _ in info["fields"]]
+        self._kinds = dict(info["fields"])
+        self.coordinates = self._load("coordinates.npy")
+        self.record_rings = self._load("record_rings.npy")
+        self.ring_points = self._load("ring_points.npy")
+        self._bboxes = self._load("bboxes.npy")
+        self._columns = {}
+
+    def _load(self, name):
+        # This method memory maps one .npy file of the cache
+        return np.load(os.path.join(self.folder, name), mmap_mode="r")
+
+    def __len__(self):
+        return self.count
+
+    # ---- geometry ----
+
+    def points(self):
+        # This method returns all point coordinates of a point layer as an (N, 2) array
+        if self.shape_type not in POINT_TYPES:
+            raise ValueError("points() only works for point layers")
+        return self.coordinates
+
+    def record_points(self, i):
+        # This method returns the points of record i as an (n, 2) view
+        first = self.ring_points[self.record_rings[i]]
+        last = self.ring_points[self.record_rings[i + 1]]
+        return self.coordinates[first:last]
+
+    def rings(self, i):
+        # This method returns the rings of record i as a list of (n, 2) views
+        starts = self.ring_points[self.record_rings[i]:self.record_rings[i + 1] + 1]
+        return [self.coordinates[s:e] for s, e in zip(starts[:-1], starts[1:])]
+
+    def record_bbox(self, i):
+        # This method returns (xmin, ymin, xmax, ymax) of record i
+        return tuple(self._bboxes[i].tolist())
+
+    def bboxes(self):
+        # This method returns the bounding boxes of all records as an (N, 4) array
+        return self._bboxes
+
+    # ---- attributes ----
+
+    def codes(self, name):
+        # This method returns (codes, values) of a text column: the row values are
+        # values[codes]. Grouping or counting by the codes needs no strings at all.
+        if self._kinds[name] != "dictionary":
+            raise ValueError(f"Field '{name}' is not a text field")
+        return (self._load(os.path.basename(_column_file(self.folder, name, ".codes.npy"))),
+                self._load(os.path.basename(_column_file(self.folder, name, ".values.npy"))))
+
+    def column(self, name):
+        # This method returns one column like ShapefileReader.column(): numbers as
+        # (memory mapped) arrays and text as a list of str
+        if name in self._columns:
+            return self._columns[name]
+        if self._kinds[name] == "array":
+            values = self._load(os.path.basename(_column_file(self.folder, name)))
+        else:
+            codes, distinct = self.codes(name)
+            values = np.asarray(distinct)[codes].tolist()
+        self._columns[name] = values
+        return values
+
+    def value(self, i, name):
+        # This method returns a single value without decoding the whole column
+        if name in self._columns:
+            return self._columns[name][i]
+        if self._kinds[name] == "array":
+            return self.column(name)[i].item()
+        codes, distinct = self.codes(name)
+        return str(distinct[codes[i]])
+
+    def record(self, i):
+        # This method returns the attributes of record i as a dictionary
+        return {name: self.value(i, name) for name in self.fields}
+
+
+def cache_folder_for(path, cache_folder=None):
+    # This function returns the cache folder of a shapefile: <name>.cache next to
+    # it, or inside cache_folder
+    base = os.path.splitext(path)[0] if path.lower().endswith(".shp") else path
+    folder = cache_folder or os.path.dirname(base)
+    return os.path.join(folder, os.path.basename(base) + ".cache")
+
+
+# one CachedShapefile per cache folder, so the memory maps are opened once
+_cached_shapefiles = {}
+
+
+def cached_shapefile(path, cache_folder=None):
+    # This function returns a CachedShapefile for a shapefile path, building or
+    # rebuilding the cache first when it is missing or the shapefile has changed
+    base = os.path.splitext(path)[0] if path.lower().endswith(".shp") else path
+    folder = cache_folder_for(base, cache_folder)
+    key = os.path.abspath(folder)
+    if not cache_is_current(base, folder):
+        _cached_shapefiles.pop(key, None)
+        with ShapefileReader(base) as reader:
+            build_cache(reader, folder)
+    if key not in _cached_shapefiles:
+        _cached_shapefiles[key] = CachedShapefile(folder)
+    return _cached_shapefiles[key]
+
+
+def open_cached(folder, layer_name, cache_folder=None):
+    # This function opens one of the shapefiles of a folder through its cache,
+    # for example open_cached("Muenster", "House_Numbers")
+    return cached_shapefile(os.path.join(folder, layer_name + ".shp"), cache_folder)
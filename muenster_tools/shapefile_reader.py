@@ -0,0 +1,292 @@
+# shapefile_reader.py
+# A small shapefile reader that works without QGIS.
+# The .shp, .shx and .dbf files are memory mapped. Point coordinates and polygon
+# rings are returned as NumPy views straight into the mapped .shp file, records are
+# found through the .shx offsets, and the .dbf columns are only decoded when they
+# are asked for, one column at a time.
+
+import codecs
+import mmap
+import os
+import struct
+import numpy as np
+
+# shape types from the ESRI shapefile specification
+NULL_SHAPE = 0
+POINT_TYPES = (1, 11, 21)              # Point, PointZ, PointM
+MULTIPOINT_TYPES = (8, 18, 28)         # MultiPoint, MultiPointZ, MultiPointM
+PART_TYPES = (3, 5, 13, 15, 23, 25)    # PolyLine and Polygon with Z and M variants
+
+
+def _map_file(path):
+    # This function memory maps a file read-only
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _cpg_codec(text):
+    # This function turns the text of a .cpg file into a Python codec name. ESRI
+    # writes code pages like "ANSI 1252", "1252" or "88591" (ISO 8859-1);
+    # values that are not known give latin-1.
+    name = text.strip().upper().replace("ANSI", "").strip()
+    if name.isdigit():
+        name = "iso8859_" + name[4:] if name.startswith("8859") and len(name) > 4 else "cp" + name
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return "latin-1"
+
+
+def _read_cpg(base):
+    # This function reads the encoding of the .dbf from the .cpg file
+    cpg = base + ".cpg"
+    if os.path.exists(cpg):
+        with open(cpg, "r", encoding="ascii", errors="ignore") as f:
+            encoding = f.read().strip()
+        if encoding:
+            return _cpg_codec(encoding)
+    # shapefiles without a .cpg are latin-1 in most cases
+    return "latin-1"
+
+
+class ShapefileReader:
+    # This class gives random access to the records of a shapefile.
+
+    def __init__(self, path, encoding=None):
+        # path can point to the .shp file or be the name without extension
+        self.base = os.path.splitext(path)[0] if path.lower().endswith(".shp") else path
+        self.shp = _map_file(self.base + ".shp")
+        self.shx = _map_file(self.base + ".shx")
+
+        file_code, = struct.unpack(">i", self.shp[0:4])
+        if file_code != 9994:
+            raise ValueError(f"{self.base}.shp is not a shapefile")
+        self.shape_type, = struct.unpack("<i", self.shp[32:36])
+        self.bbox = struct.unpack("<4d", self.shp[36:68])
+
+        # the .shx file has one (offset, length) pair per record, big endian and
+        # counted in 16 bit words
+        count = (len(self.shx) - 100) // 8
+        index = np.frombuffer(self.shx, dtype=">i4", count=count * 2, offset=100)
+        index = index.reshape(count, 2)
+        self.offsets = index[:, 0].astype(np.int64) * 2
+        self.lengths = index[:, 1].astype(np.int64) * 2
+
+        self.encoding = encoding or _read_cpg(self.base)
+        self.dbf = None
+        self.fields = []
+        self._columns = {}
+        if os.path.exists(self.base + ".dbf"):
+            self._open_dbf()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        # This method closes the mapped files. Views handed out before
+        # must not be used afterwards.
+        self._columns = {}
+        for mapped in (self.shp, self.shx, self.dbf):
+            if mapped is not None:
+                try:
+                    mapped.close()
+                except BufferError:
+                    # a NumPy view still points into the file, it is closed
+                    # when the last view is gone
+                    pass
+
+    # ---- geometry ----
+
+    def record_type(self, i):
+        # This method returns the shape type of record i (0 for a null shape)
+        start = self.offsets[i] + 8
+        return struct.unpack("<i", self.shp[start:start + 4])[0]
+
+    def points(self):
+        # This method returns all point coordinates of a point layer as an (N, 2) array.
+        # When the records are stored one after the other without null shapes, which
+        # is the normal case, the array is a strided view into the .shp file.
+        if self.shape_type not in POINT_TYPES:
+            raise ValueError("points() only works for point layers")
+        n = len(self)
+        if n == 0:
+            return np.empty((0, 2))
+        step = int(self.offsets[1] - self.offsets[0]) if n > 1 else 0
+        regular = (
+            np.all(self.lengths == self.lengths[0])
+            and (n == 1 or np.all(np.diff(self.offsets) == step))
+            and self.record_type(0) != NULL_SHAPE
+            and self.lengths[0] >= 20
+        )
+        if regular:
+            return np.ndarray(shape=(n, 2), dtype="<f8", buffer=self.shp,
+                              offset=int(self.offsets[0]) + 12, strides=(step, 8))
+        # irregular file: gather the points one by one, null shapes become NaN
+        result = np.full((n, 2), np.nan)
+        for i in range(n):
+            if self.record_type(i) != NULL_SHAPE:
+                result[i] = self.record_points(i)[0]
+        return result
+
+    def record_points(self, i):
+        # This method returns the points of record i as an (n, 2) view
+        start = int(self.offsets[i]) + 8
+        shape_type = self.record_type(i)
+        if shape_type == NULL_SHAPE:
+            return np.empty((0, 2))
+        if shape_type in POINT_TYPES:
+            return np.frombuffer(self.shp, dtype="<f8", count=2, offset=start + 4).reshape(1, 2)
+        if shape_type in MULTIPOINT_TYPES:
+            num_points, = struct.unpack("<i", self.shp[start + 36:start + 40])
+            return np.frombuffer(self.shp, dtype="<f8", count=num_points * 2,
+                                 offset=start + 40).reshape(num_points, 2)
+        if shape_type in PART_TYPES:
+            num_parts, num_points = struct.unpack("<2i", self.shp[start + 36:start + 44])
+            return np.frombuffer(self.shp, dtype="<f8", count=num_points * 2,
+                                 offset=start + 44 + 4 * num_parts).reshape(num_points, 2)
+        raise ValueError(f"Shape type {shape_type} is not supported")
+
+    def record_parts(self, i):
+        # This method returns the start index of every part (ring) of record i
+        start = int(self.offsets[i]) + 8
+        if self.record_type(i) not in PART_TYPES:
+            return np.zeros(1, dtype=np.int32)
+        num_parts, = struct.unpack("<i", self.shp[start + 36:start + 40])
+        return np.frombuffer(self.shp, dtype="<i4", count=num_parts, offset=start + 44)
+
+    def rings(self, i):
+        # This method returns the rings of record i as a list of (n, 2) views
+        points = self.record_points(i)
+        parts = self.record_parts(i)
+        ends = list(parts[1:]) + [len(points)]
+        return [points[s:e] for s, e in zip(parts, ends)]
+
+    def record_bbox(self, i):
+        # This method returns (xmin, ymin, xmax, ymax) of record i
+        start = int(self.offsets[i]) + 8
+        shape_type = self.record_type(i)
+        if shape_type in POINT_TYPES:
+            x, y = struct.unpack("<2d", self.shp[start + 4:start + 20])
+            return (x, y, x, y)
+        if shape_type == NULL_SHAPE:
+            return (np.nan, np.nan, np.nan, np.nan)
+        return struct.unpack("<4d", self.shp[start + 4:start + 36])
+
+    def bboxes(self):
+        # This method returns the bounding boxes of all records as an (N, 4) array
+        if self.shape_type in POINT_TYPES:
+            points = self.points()
+            return np.hstack([points, points])
+        return np.array([self.record_bbox(i) for i in range(len(self))], dtype=float).reshape(-1, 4)
+
+    # ---- attributes ----
+
+    def _open_dbf(self):
+        # This method reads the .dbf header; the records themselves are not decoded
+        self.dbf = _map_file(self.base + ".dbf")
+        self.num_records, self.header_length, self.record_length = struct.unpack(
+            "<IHH", self.dbf[4:12])
+        self._field_info = {}
+        position = 32
+        field_offset = 1    # every record starts with the deletion flag
+        while self.dbf[position] != 0x0D:
+            descriptor = self.dbf[position:position + 32]
+            name = descriptor[:11].split(b"\0")[0].decode("ascii")
+            field_type = chr(descriptor[11])
+            length = descriptor[16]
+            decimals = descriptor[17]
+            self.fields.append(name)
+            self._field_info[name] = (field_type, field_offset, length, decimals)
+            field_offset += length
+            position += 32
+
+    def raw_column(self, name):
+        # This method returns the undecoded bytes of one column as a view into the .dbf
+        field_type, field_offset, length, decimals = self._field_info[name]
+        return np.ndarray(shape=(self.num_records,), dtype=f"S{length}", buffer=self.dbf,
+                          offset=self.header_length + field_offset,
+                          strides=(self.record_length,))
+
+    def _field_type(self, name):
+        # This method returns the dBase type letter of a field. Type O fields are
+        # binary doubles and not text like the other numbers; they are not supported.
+        field_type = self._field_info[name][0]
+        if field_type == "O":
+            raise ValueError(f"Field '{name}' has the binary dBase 7 type O, which is not supported")
+        return field_type
+
+    def column(self, name, skip_deleted=False):
+        # This method decodes one column, the result is cached.
+        # Numbers become float arrays (int arrays when there are no decimals and no
+        # empty values, empty numbers are NaN), logical fields bool arrays and
+        # everything else a list of str. There is one value per record, so the
+        # column lines up with the geometries; skip_deleted=True leaves out the
+        # records that are marked as deleted in the .dbf (see deleted()).
+        if name not in self._columns:
+            self._columns[name] = self._decode_column(name)
+        values = self._columns[name]
+        if skip_deleted:
+            deleted = self.deleted()
+            if deleted.any():
+                if isinstance(values, np.ndarray):
+                    return values[~deleted]
+                return [value for value, is_deleted in zip(values, deleted.tolist()) if not is_deleted]
+        return values
+
+    def _decode_column(self, name):
+        # This method decodes all values of one column
+        field_type = self._field_type(name)
+        decimals = self._field_info[name][3]
+        raw = self.raw_column(name)
+        if field_type in "NF":
+            stripped = np.char.strip(raw)
+            empty = (stripped == b"") | (np.char.find(stripped, b"*") >= 0)
+            values = np.where(empty, b"nan", stripped).astype(float)
+            if field_type == "N" and decimals == 0 and not empty.any():
+                values = values.astype(np.int64)
+        elif field_type == "L":
+            values = np.isin(raw, [b"T", b"t", b"Y", b"y"])
+        else:
+            encoding = self.encoding
+            values = [value.decode(encoding, errors="replace").rstrip(" \0") for value in raw]
+        return values
+
+    def deleted(self):
+        # This method returns a bool array that marks deleted .dbf records
+        flags = np.ndarray(shape=(self.num_records,), dtype="S1", buffer=self.dbf,
+                           offset=self.header_length, strides=(self.record_length,))
+        return flags == b"*"
+
+    def value(self, i, name):
+        # This method decodes a single value, or takes it from a decoded column.
+        # Empty numbers are NaN, like in column().
+        if name in self._columns:
+            return self._columns[name][i]
+        field_type = self._field_type(name)
+        _, field_offset, length, decimals = self._field_info[name]
+        start = self.header_length + i * self.record_length + field_offset
+        raw = self.dbf[start:start + length]
+        if field_type in "NF":
+            raw = raw.strip()
+            if not raw or b"*" in raw:
+                return float("nan")
+            return int(raw) if field_type == "N" and decimals == 0 else float(raw)
+        if field_type == "L":
+            return raw in (b"T", b"t", b"Y", b"y")
+        return raw.decode(self.encoding, errors="replace").rstrip(" \0")
+
+    def record(self, i):
+        # This method returns the attributes of record i as a dictionary
+        return {name: self.value(i, name) for name in self.fields}
+
+
+def open_shapefile(folder, layer_name, encoding=None):
+    # This function opens one of the shapefiles of a folder by its layer name,
+    # for example open_shapefile("Muenster", "House_Numbers")
+    return ShapefileReader(os.path.join(folder, layer_name + ".shp"), encoding)
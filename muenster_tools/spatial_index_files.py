@@ -0,0 +1,288 @@
+# spatial_index_files.py
+# Using the spatial index files next to the shapefiles for bounding box queries
+# without QGIS: the .qix quadtree written by QGIS/GDAL/MapServer and the ESRI
+# .sbn/.sbx files. A query returns the record numbers whose bounding boxes touch
+# the query box; only those records are then read from the .shp through the
+# .shx offsets (ShapefileReader). Whether an index still belongs to its shapefile
+# is decided from the files themselves (number of records and extent), not from
+# the file times, which a fresh git clone sets in path order. When a shapefile
+# has no usable index, a .qix is built into <name>.cache.qix, so the tracked data
+# folder stays clean. (The .sbn format is only read; new indexes are always .qix.)
+
+import os
+import struct
+import numpy as np
+from .shapefile_reader import ShapefileReader
+
+# the .qix tree depth limit of shapelib, used when the depth is computed
+MAX_DEFAULT_TREE_DEPTH = 12
+# a child node of the quadtree covers 55% of its parent on the split axis
+SPLIT_RATIO = 0.55
+# how far (in map units) the extent in a .sbn header may be off the .shp extent
+BBOX_TOLERANCE = 1e-6
+
+
+def _overlaps(a, b):
+    # This function returns True if two (xmin, ymin, xmax, ymax) boxes touch
+    return a[0] <= b[2] and a[2] >= b[0] and a[1] <= b[3] and a[3] >= b[1]
+
+
+class QixIndex:
+    # This class reads a .qix quadtree. Every node has its bounding box, the
+    # record numbers stored in it and the byte size of its children, so the
+    # children of nodes outside the query box are skipped without reading them.
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = f.read()
+        if self.data[:3] != b"SQT":
+            raise ValueError(f"{path} is not a .qix file")
+        # 1 = little endian, 2 = big endian, 0 = the byte order of the machine
+        self.order = {1: "<", 2: ">"}.get(self.data[3], "=")
+        if self.data[4] != 1:
+            raise ValueError(f"{path} uses the old .qix format, which is not supported")
+        self.shape_count, self.depth = struct.unpack(self.order + "2i", self.data[8:16])
+
+    def query(self, bbox):
+        # This method returns the sorted record numbers (0 based) of the nodes
+        # that touch bbox = (xmin, ymin, xmax, ymax)
+        data = self.data
+        head = struct.Struct(self.order + "i4di")
+        found = []
+        # the nodes still to visit, as positions in the file; a node is
+        # offset, bounds, count, ids, number of children, then the children
+        pending = [16]
+        while pending:
+            position = pending.pop()
+            offset, xmin, ymin, xmax, ymax, count = head.unpack_from(data, position)
+            ids_position = position + head.size
+            children_position = ids_position + 4 * count + 4
+            if not _overlaps((xmin, ymin, xmax, ymax), bbox):
+                continue
+            if count:
+                found.extend(struct.unpack_from(f"{self.order}{count}i", data, ids_position))
+            children, = struct.unpack_from(self.order + "i", data, children_position - 4)
+            # visit the children one after the other, each one knows its own size
+            child = children_position
+            for _ in range(children):
+                pending.append(child)
+                child_offset, = struct.unpack_from(self.order + "i", data, child)
+                child_count, = struct.unpack_from(self.order + "i", data, child + 36)
+                child += 4 + 32 + 4 + 4 * child_count + 4 + child_offset
+        return np.unique(np.array(found, dtype=np.int64))
+
+
+class SbnIndex:
+    # This class reads an ESRI .sbn file. The boxes of the records are stored as
+    # bytes (0..255) relative to the extent of the whole file; they are read into
+    # arrays once and a query compares all of them in one NumPy call.
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        file_code, = struct.unpack(">i", data[:4])
+        if file_code != 9994:
+            raise ValueError(f"{path} is not a .sbn file")
+        self.shape_count, = struct.unpack(">i", data[28:32])
+        self.bbox = struct.unpack(">4d", data[32:64])
+
+        # after the header come records of (bin id, length in 16 bit words); the
+        # first one lists the bins, all others hold 8 bytes per shape: the
+        # byte box xmin, ymin, xmax, ymax and the big endian record number
+        boxes = []
+        ids = []
+        position = 100
+        first = True
+        while position + 8 <= len(data):
+            _, length = struct.unpack(">2i", data[position:position + 8])
+            size = length * 2
+            if not first:
+                entries = np.frombuffer(data, dtype=np.uint8, count=size, offset=position + 8)
+                entries = entries.reshape(-1, 8)
+                boxes.append(entries[:, :4])
+                ids.append(entries[:, 4:].copy().view(">i4").ravel())
+            first = False
+            position += 8 + size
+        self.boxes = np.concatenate(boxes) if boxes else np.empty((0, 4), dtype=np.uint8)
+        self.ids = (np.concatenate(ids) - 1 if ids else np.empty(0)).astype(np.int64)
+
+    def query(self, bbox):
+        # This method returns the sorted record numbers (0 based) whose byte box
+        # touches bbox = (xmin, ymin, xmax, ymax)
+        x0, y0, x1, y1 = self.bbox
+        sx = 255 / (x1 - x0) if x1 > x0 else 0.0
+        sy = 255 / (y1 - y0) if y1 > y0 else 0.0
+        # the byte boxes are rounded outwards, so comparing with the scaled
+        # query box never loses a record
+        qxmin = (bbox[0] - x0) * sx
+        qymin = (bbox[1] - y0) * sy
+        qxmax = (bbox[2] - x0) * sx
+        qymax = (bbox[3] - y0) * sy
+        b = self.boxes
+        mask = (b[:, 0] <= qxmax) & (b[:, 2] >= qxmin) & (b[:, 1] <= qymax) & (b[:, 3] >= qymin)
+        return np.unique(self.ids[mask])
+
+
+def _split(bounds):
+    # This function splits bounds into two boxes that each cover 55% of the
+    # longer side, like shapelib does
+    xmin, ymin, xmax, ymax = bounds
+    if xmax - xmin > ymax - ymin:
+        width = (xmax - xmin) * SPLIT_RATIO
+        return (xmin, ymin, xmin + width, ymax), (xmax - width, ymin, xmax, ymax)
+    height = (ymax - ymin) * SPLIT_RATIO
+    return (xmin, ymin, xmax, ymin + height), (xmin, ymax - height, xmax, ymax)
+
+
+def _quarters(bounds):
+    # This function returns the boxes of the four children of a quadtree node
+    first, second = _split(bounds)
+    return list(_split(first) + _split(second))
+
+
+def _contains(outer, inner):
+    # This function returns True if box inner lies completely inside box outer
+    return (inner[0] >= outer[0] and inner[1] >= outer[1]
+            and inner[2] <= outer[2] and inner[3] <= outer[3])
+
+
+def default_depth(shape_count):
+    # This function returns the tree depth shapelib uses for shape_count records
+    depth = 0
+    nodes = 1
+    while nodes * 4 < shape_count:
+        depth += 1
+        nodes *= 2
+    return min(depth, MAX_DEFAULT_TREE_DEPTH)
+
+
+def qix_cache_path(reader, cache_folder=None):
+    # This function returns where a built .qix of a ShapefileReader is written:
+    # <name>.cache.qix next to the .shp, or inside cache_folder
+    folder = cache_folder or os.path.dirname(reader.base)
+    return os.path.join(folder, os.path.basename(reader.base) + ".cache.qix")
+
+
+def build_qix(reader, path=None, depth=None):
+    # This function builds the .qix quadtree of a ShapefileReader and writes it
+    # (by default to qix_cache_path). Every record goes into the deepest node
+    # that still contains its bounding box. Returns the path of the file.
+    path = path or qix_cache_path(reader)
+    depth = depth or default_depth(len(reader))
+    # a node is [bounds, record numbers, children]
+    root = [tuple(reader.bbox), [], []]
+    for i, bbox in enumerate(reader.bboxes().tolist()):
+        if np.isnan(bbox[0]):
+            continue
+        node = root
+        level = depth
+        while level > 1:
+            quarters = _quarters(node[0])
+            inside = [q for q, quarter in enumerate(quarters) if _contains(quarter, bbox)]
+            if not inside:
+                break
+            if not node[2]:
+                node[2] = [[quarter, [], []] for quarter in quarters]
+            node = node[2][inside[0]]
+            level -= 1
+        node[1].append(i)
+
+    def trim(node):
+        # This function removes the empty children the way shapelib does (the
+        # last child takes the place of a removed one) and replaces a node without
+        # records and with one child by that child. Returns True if node is empty.
+        children = node[2]
+        i = 0
+        while i < len(children):
+            if trim(children[i]):
+                # the moved child is checked next
+                children[i] = children[-1]
+                children.pop()
+            else:
+                i += 1
+        if len(children) == 1 and not node[1]:
+            node[:] = children[0]
+        return not node[1] and not node[2]
+
+    def encode(node):
+        # This function writes a node with its children, children first so that
+        # the size of the children is known
+        children = b"".join(encode(child) for child in node[2])
+        ids = node[1]
+        return (struct.pack("<i4di", len(children), *node[0], len(ids))
+                + struct.pack(f"<{len(ids)}i", *ids)
+                + struct.pack("<i", len(node[2])) + children)
+
+    trim(root)
+    with open(path, "wb") as f:
+        f.write(b"SQT" + bytes([1, 1, 0, 0, 0]) + struct.pack("<2i", len(reader), depth))
+        f.write(encode(root))
+    return path
+
+
+def index_is_current(index, reader):
+    # This function returns True if a QixIndex or SbnIndex belongs to the
+    # shapefile as it is now: the same number of records and, for a .sbn, the
+    # same extent in the header
+    if index.shape_count != len(reader):
+        return False
+    if isinstance(index, SbnIndex):
+        return all(abs(a - b) <= BBOX_TOLERANCE for a, b in zip(index.bbox, reader.bbox))
+    return True
+
+
+def _open_index(path, index_class, reader):
+    # This function opens an index file and returns it, or None if the file is
+    # missing, not readable or does not belong to the shapefile
+    if not os.path.exists(path):
+        return None
+    try:
+        index = index_class(path)
+    except (ValueError, struct.error):
+        return None
+    return index if index_is_current(index, reader) else None
+
+
+def shipped_index(reader):
+    # This function returns the current .qix or .sbn index next to the .shp (a
+    # .qix is preferred), or None if there is none
+    for extension, index_class in ((".qix", QixIndex), (".sbn", SbnIndex)):
+        index = _open_index(reader.base + extension, index_class, reader)
+        if index is not None:
+            return index
+    return None
+
+
+def spatial_index(reader, build=True, cache_folder=None):
+    # This function returns a QixIndex or SbnIndex for a ShapefileReader: the
+    # index files next to the .shp first, then a .qix built before. Without any
+    # of them a .qix is built into the cache when build is True.
+    index = shipped_index(reader)
+    if index is not None:
+        return index
+    path = qix_cache_path(reader, cache_folder)
+    # the built .qix was written after the .shp, so an older one is outdated
+    # even when the number of records is the same
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(reader.base + ".shp"):
+        index = _open_index(path, QixIndex, reader)
+        if index is not None:
+            return index
+    if not build:
+        return None
+    return QixIndex(build_qix(reader, path))
+
+
+def query_records(reader, bbox, index=None):
+    # This function returns the sorted record numbers of the records whose own
+    # bounding box (read through the .shx offsets) touches bbox
+    index = index or spatial_index(reader)
+    candidates = index.query(bbox)
+    return np.array([i for i in candidates.tolist() if _overlaps(reader.record_bbox(i), bbox)],
+                    dtype=np.int64)
+
+
+def open_indexed(path):
+    # This function opens a shapefile together with its spatial index and returns
+    # (ShapefileReader, index)
+    reader = ShapefileReader(path)
+    return reader, spatial_index(reader)
@@ -0,0 +1,45 @@
+# spatial_join.py
+# Joining an attribute of a polygon layer to the points inside the polygons,
+# for example the district name to every swimming pool (exercise_6_2.py).
+# The polygon geometries are read once, the points are put into a FeatureIndex,
+# and the joined values are written back with one changeAttributeValues call.
+
+from .point_index import FeatureIndex
+
+
+def polygon_values(polygon_layer, value_field):
+    # This function reads the geometries and the value_field of a polygon layer once
+    geometries = []
+    values = []
+    for feature in polygon_layer.getFeatures():
+        geometry = feature.geometry()
+        if geometry is None or geometry.isEmpty():
+            continue
+        geometries.append(geometry)
+        values.append(feature[value_field])
+    return geometries, values
+
+
+def join_attribute(point_layer, polygon_layer, value_field, polygons=None):
+    # This function returns {point feature id: value_field of the polygon containing it}.
+    # Points outside every polygon are left out. polygons can be the result of
+    # polygon_values() to reuse it for several point layers.
+    geometries, values = polygons or polygon_values(polygon_layer, value_field)
+    index = FeatureIndex.from_layer(point_layer)
+    owner = index.assign(geometries)
+    return {index.ids[i]: values[p] for i, p in enumerate(owner) if p is not None}
+
+
+def write_attribute_values(layer, field_name, values_by_id, changes=None):
+    # This function writes {feature id: value} into field_name with a single call
+    # to the data provider. changes is an optional {feature id: {field index: value}}
+    # map with other edits that should go into the same call.
+    field_index = layer.fields().indexFromName(field_name)
+    if field_index < 0:
+        raise ValueError(f"Field '{field_name}' not found in layer '{layer.name()}'")
+    changes = changes if changes is not None else {}
+    for feature_id, value in values_by_id.items():
+        changes.setdefault(feature_id, {})[field_index] = value
+    if changes and not layer.dataProvider().changeAttributeValues(changes):
+        raise RuntimeError(f"Could not write the attribute values of layer '{layer.name()}'")
+    return len(changes)
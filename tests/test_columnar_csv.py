@@ -0,0 +1,97 @@
+# test_columnar_csv.py
+# Checks the columnar reader of the semicolon / decimal comma CSV files
+# (muenster_tools/columnar_csv.py) on small files written by the test and on
+# the population file of the Muenster data.
+#   python -m pytest tests
+
+import os
+import numpy as np
+import pytest
+
+from muenster_tools.columnar_csv import (convert_column, decimal_comma_floats, iter_column_chunks,
+                                         read_columns, to_array)
+from muenster_tools.csv_loader import decimal_comma_float
+
+DATA_FOLDER = os.path.join(os.path.dirname(__file__), "..", "Muenster")
+
+CSV = ("\ufeffName;Einwohner;Anteil;Datum\n"
+       "Aaseestadt;12.345;1,5;2022-12-31\n"
+       "\"Altstadt\";987;;2022-01-01\n"
+       "Mecklenbeck;10;\"-0,25\";\n")
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    # This fixture writes a small CSV file like the ones from German software
+    path = tmp_path / "districts.csv"
+    path.write_text(CSV, encoding="utf-8")
+    return str(path)
+
+
+def test_convert_column_guesses_the_type():
+    assert convert_column(["1", " 2", "3 "]).dtype == np.int64
+    np.testing.assert_array_equal(convert_column(["1,5", "2", ""])[:2], [1.5, 2.0])
+    assert np.isnan(convert_column(["1,5", "2", ""])[2])
+    dates = convert_column(["2022-12-31", ""])
+    assert dates.dtype == np.dtype("datetime64[D]") and np.isnat(dates[1])
+    assert convert_column(["a", "1"]).tolist() == ["a", "1"]
+    np.testing.assert_array_equal(convert_column(["1.234,5"], thousands="."), [1234.5])
+    with pytest.raises(ValueError):
+        convert_column(["a"], "float")
+
+
+def test_decimal_comma_floats_match_the_scalar_version():
+    values = ["1.234,5", "12.5", "\"12,5\"", "", " -3,25 ", "7"]
+    vectorized = decimal_comma_floats(values)
+    for number, value in zip(vectorized.tolist(), values):
+        scalar = decimal_comma_float(value)
+        if scalar is None:
+            assert np.isnan(number)
+        else:
+            assert number == scalar
+
+
+def test_read_columns(csv_path):
+    columns = read_columns(csv_path, thousands=".")
+    assert list(columns) == ["Name", "Einwohner", "Anteil", "Datum"]
+    assert columns["Name"].tolist() == ["Aaseestadt", "Altstadt", "Mecklenbeck"]
+    np.testing.assert_array_equal(columns["Einwohner"], [12345, 987, 10])
+    np.testing.assert_array_equal(columns["Anteil"][[0, 2]], [1.5, -0.25])
+    assert np.isnan(columns["Anteil"][1])
+    assert np.isnat(columns["Datum"][2])
+
+
+def test_read_only_some_columns(csv_path):
+    columns = read_columns(csv_path, ["Anteil", "Name"], dtypes={"Name": "str"})
+    assert list(columns) == ["Anteil", "Name"]
+    with pytest.raises(ValueError):
+        read_columns(csv_path, ["Missing"])
+
+
+def test_chunks_give_the_same_columns(csv_path):
+    chunks = list(iter_column_chunks(csv_path, ["Name", "Anteil"], chunk_size=2))
+    assert len(chunks) == 2
+    whole = read_columns(csv_path, ["Name", "Anteil"])
+    np.testing.assert_array_equal(np.concatenate([c["Anteil"] for c in chunks]), whole["Anteil"])
+    assert np.concatenate([c["Name"] for c in chunks]).tolist() == whole["Name"].tolist()
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text("Name;Wert\n", encoding="utf-8")
+    assert read_columns(str(path)) == {}
+    assert list(iter_column_chunks(str(path))) == []
+
+
+def test_to_array():
+    assert to_array(np.array([1, 2], dtype=np.int64)).typecode == "q"
+    assert list(to_array(np.array([1.5, 2.0]))) == [1.5, 2.0]
+
+
+def test_population_file():
+    path = os.path.join(DATA_FOLDER, "Population_Data_per_City_District_2022.csv")
+    columns = read_columns(path, ["District", "Population"])
+    # the byte order mark is not part of the first column name
+    assert "OBJECTID" in read_columns(path)
+    assert columns["Population"].dtype == np.int64
+    assert len(columns["District"]) == len(columns["Population"]) == 45
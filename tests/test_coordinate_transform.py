@@ -0,0 +1,75 @@
+# test_coordinate_transform.py
+# Checks the NumPy Transverse Mercator projection (muenster_tools/coordinate_transform.py)
+# against pyproj (skipped without it) and against itself: forward and inverse
+# must give back the coordinates they started from.
+#   python -m pytest tests
+
+import numpy as np
+import pytest
+
+from muenster_tools.coordinate_transform import (tm_forward, tm_inverse, transform_points,
+                                                 transformer, utm_crs)
+
+
+def lon_lat(count=2000, seed=0):
+    # This function returns longitude / latitude arrays around Muenster and
+    # across UTM zone 32 (6 to 12 degrees east)
+    rng = np.random.default_rng(seed)
+    return rng.uniform(5.5, 12.5, count), rng.uniform(47.0, 55.0, count)
+
+
+@pytest.mark.parametrize("crs, expected", [
+    ("EPSG:25832", (32, False)),
+    ("epsg:32632", (32, False)),
+    ("EPSG:32733", (33, True)),
+    ("EPSG:4326", None),
+    ("EPSG:3857", None),
+    ("not a crs", None),
+])
+def test_utm_crs(crs, expected):
+    result = utm_crs(crs)
+    assert (result[:2] if result else None) == expected
+
+
+@pytest.mark.parametrize("target", ["EPSG:25832", "EPSG:32632", "EPSG:32733"])
+def test_numpy_projection_matches_pyproj(target):
+    pyproj = pytest.importorskip("pyproj")
+    lon, lat = lon_lat()
+    if utm_crs(target)[1]:
+        lat = -lat
+    x, y = transformer("EPSG:4326", target, use_pyproj=False)(lon, lat)
+    px, py = pyproj.Transformer.from_crs("EPSG:4326", target, always_xy=True).transform(lon, lat)
+    # well below a millimetre inside and next to the zone
+    assert np.abs(x - px).max() < 1e-3
+    assert np.abs(y - py).max() < 1e-3
+
+    back_lon, back_lat = transformer(target, "EPSG:4326", use_pyproj=False)(px, py)
+    assert np.abs(back_lon - lon).max() < 1e-9
+    assert np.abs(back_lat - lat).max() < 1e-9
+
+
+def test_round_trip():
+    lon, lat = lon_lat()
+    x, y = tm_forward(lon, lat, 9)
+    back_lon, back_lat = tm_inverse(x, y, 9)
+    np.testing.assert_allclose(back_lon, lon, rtol=0, atol=1e-10)
+    np.testing.assert_allclose(back_lat, lat, rtol=0, atol=1e-10)
+
+
+def test_known_point():
+    # the Prinzipalmarkt in Muenster, the result of PROJ for EPSG:25832
+    x, y = transform_points([(7.6286, 51.9623)], "EPSG:4326", "EPSG:25832", use_pyproj=False)[0]
+    assert x == pytest.approx(405775.733, abs=1e-3)
+    assert y == pytest.approx(5757733.343, abs=1e-3)
+
+
+def test_empty_and_same_crs():
+    x, y = transformer("EPSG:4326", "EPSG:25832", use_pyproj=False)(np.empty(0), np.empty(0))
+    assert x.shape == y.shape == (0,)
+    points = transform_points([(1.0, 2.0)], "EPSG:25832", "EPSG:25832", use_pyproj=False)
+    np.testing.assert_array_equal(points, [(1.0, 2.0)])
+
+
+def test_unsupported_pair_needs_pyproj():
+    with pytest.raises(ValueError):
+        transformer("EPSG:4326", "EPSG:3857", use_pyproj=False)
@@ -0,0 +1,58 @@
+# test_csv_loader.py
+# Checks the WKT to WKB conversion and the batch parsing of the CSV loader
+# (muenster_tools/csv_loader.py) against shapely (skipped without it). Loading
+# into a layer needs QGIS and is not tested here.
+#   python -m pytest tests
+
+import pytest
+
+from muenster_tools.csv_loader import decimal_comma_float, parse_rows, text, wkt_to_wkb
+
+GEOMETRIES = [
+    "POINT (7.62 51.96)",
+    "POINT Z (1 2 3)",
+    "LINESTRING (0 0, 1 1, 2 0)",
+    "POLYGON ((0 0, 10 0, 10 10, 0 10, 0 0), (3 3, 7 3, 7 7, 3 7, 3 3))",
+    "MULTIPOINT ((1 2), (3 4))",
+    "MULTIPOINT (1 2, 3 4)",
+    "MULTILINESTRING ((0 0, 1 1), (2 2, 3 3))",
+    "MULTIPOLYGON (((0 0, 1 0, 1 1, 0 0)), ((5 5, 6 5, 6 6, 5 5)))",
+    "multipolygon z (((0 0 1, 1 0 1, 1 1 1, 0 0 1)))",
+    "POINT (-1.5e3 2.25E-2)",
+]
+
+
+@pytest.mark.parametrize("wkt", GEOMETRIES)
+def test_wkb_matches_shapely(wkt):
+    shapely = pytest.importorskip("shapely")
+    expected = shapely.from_wkt(wkt)
+    result = shapely.from_wkb(wkt_to_wkb(wkt))
+    assert result.geom_type == expected.geom_type
+    assert result.has_z == expected.has_z
+    assert shapely.equals_exact(result, expected, tolerance=0)
+
+
+@pytest.mark.parametrize("wkt", [
+    "POINT EMPTY",
+    "POINT M (1 2 3)",
+    "POINT ZM (1 2 3 4)",
+    "GEOMETRYCOLLECTION (POINT (1 2))",
+    "POLYGON ((0 0, 1 1",
+    "POINT (1 2))",
+    "POINT (1 2) (3 4)",
+    "",
+    "not wkt",
+])
+def test_other_geometries_are_left_to_qgis(wkt):
+    assert wkt_to_wkb(wkt) is None
+
+
+def test_parse_rows():
+    rows = [["Aasee", "1.234,5", "POINT (1 2)"],
+            ["Zoo", "", "POINT EMPTY"]]
+    parsed = parse_rows(rows, [(0, text), (1, decimal_comma_float)], 2)
+    assert parsed[0][0] == ["Aasee", 1234.5]
+    assert parsed[0][1] == wkt_to_wkb("POINT (1 2)")
+    # empty numbers become None, geometries that cannot be converted stay WKT
+    assert parsed[1] == (["Zoo", None], "POINT EMPTY")
+    assert parse_rows([], [(0, text)], 1) == []
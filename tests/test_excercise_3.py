@@ -0,0 +1,82 @@
+# test_excercise_3.py
+# Checks the batch calculator and the fast shopping basket of Excercise_3
+# against the plain calculators and ShoppingBasket classes.
+#   python -m pytest tests
+
+import os
+import pickle
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Excercise_3"))
+from calculator import batch_calculators, calculators
+from shopping import FastShoppingBasket, ShoppingBasket
+
+
+@pytest.mark.parametrize("operation", ["addition", "subtraction", "multiplication", "division"])
+def test_batch_matches_the_plain_calculator(operation):
+    a = [1.5, -2.0, 10.0, 7.0]
+    b = [0.5, 4.0, -3.0, 2.0]
+    expected = [getattr(calculators(), operation)(x, y) for x, y in zip(a, b)]
+    np.testing.assert_allclose(getattr(batch_calculators(), operation)(a, b), expected)
+
+
+def test_division_by_zero():
+    with pytest.raises(ValueError):
+        calculators().division(1, 0)
+    result, zero = batch_calculators().division_with_mask([1, 2, 3], [1, 0, 2], fill_value=-1)
+    np.testing.assert_array_equal(result, [1.0, -1.0, 1.5])
+    np.testing.assert_array_equal(zero, [False, True, False])
+    assert np.isnan(batch_calculators().division([1], [0])[0])
+
+
+def test_stream():
+    chunks = [([1, 2], [1, 0]), ([6], [3])]
+    divided = list(batch_calculators().stream("division", chunks, fill_value=0))
+    np.testing.assert_array_equal(np.concatenate(divided), [1.0, 0.0, 2.0])
+    # the division options are not passed to the other operations
+    added = list(batch_calculators().stream("addition", chunks, fill_value=0))
+    np.testing.assert_array_equal(np.concatenate(added), [2.0, 2.0, 9.0])
+    assert list(batch_calculators().stream("addition", [])) == []
+
+
+def test_fast_basket_matches_the_plain_basket():
+    plain = ShoppingBasket()
+    fast = FastShoppingBasket()
+    steps = [("add", "apple", 3), ("add", "pear", 1), ("remove", "apple", 1),
+             ("add", "milk", 2), ("remove", "pear", None), ("remove", "milk", 5)]
+    for action, name, quantity in steps:
+        for basket in (plain, fast):
+            if action == "add":
+                basket.add_an_item(name, quantity)
+            else:
+                basket.remove_an_item(name, quantity)
+        assert dict(fast.list_items()) == plain.list_items()
+        assert fast.total_items() == plain.total_items()
+
+
+def test_many_items_at_once():
+    basket = FastShoppingBasket(["apple", "apple", "pear"])
+    basket.add_many({"milk": 2})
+    assert dict(basket.items) == {"apple": 2, "pear": 1, "milk": 2}
+    with pytest.raises(ValueError):
+        basket.add_many({"bread": 1, "butter": 0})
+    with pytest.raises(ValueError):
+        basket.remove_many(["apple", "bread"])
+    # nothing was changed by the two failed calls
+    assert basket.total_items() == 5 and "bread" not in basket.items
+    basket.merge(FastShoppingBasket({"pear": 4}))
+    assert basket.items["pear"] == 5 and basket.total_items() == 9
+    with pytest.raises(TypeError):
+        basket.items["pear"] = 0
+
+
+def test_pickle():
+    basket = FastShoppingBasket({"apple": 2, "pear": 1})
+    copy = pickle.loads(pickle.dumps(basket))
+    assert dict(copy.items) == {"apple": 2, "pear": 1}
+    assert copy.total_items() == 3
+    # the view of the copy follows the copy, not the original
+    copy.add_an_item("milk")
+    assert "milk" in copy.list_items() and "milk" not in basket.list_items()
@@ -0,0 +1,80 @@
+# test_nearest_neighbour.py
+# Checks the grid based nearest neighbour and radius search
+# (muenster_tools/nearest_neighbour.py) against measuring every pair, also for
+# empty queries and grids of very few or coincident points.
+#   python -m pytest tests
+
+import numpy as np
+import pytest
+
+from muenster_tools.nearest_neighbour import PointGrid, brute_force_nearest
+
+
+def random_points(count, seed, size=10000.0):
+    # This function returns count points in a size x size square
+    return np.random.default_rng(seed).uniform(0, size, size=(count, 2))
+
+
+def brute_force_within(points, queries, radius):
+    # This function returns the sorted distances of the points within radius of every query
+    result = []
+    for x, y in queries:
+        distances = np.hypot(points[:, 0] - x, points[:, 1] - y)
+        result.append(np.sort(distances[distances <= radius]))
+    return result
+
+
+@pytest.mark.parametrize("count", [1, 2, 30, 100, 2000])
+@pytest.mark.parametrize("k", [1, 3])
+def test_nearest_matches_brute_force(count, k):
+    points = random_points(count, 1)
+    # the queries also lie far outside the points
+    queries = random_points(3000, 2, size=30000.0) - 10000.0
+    positions, distances = PointGrid(points).nearest(queries, k)
+    expected_positions, expected_distances = brute_force_nearest(points, queries, k)
+    assert positions.shape == distances.shape == (len(queries), min(k, count))
+    # positions can differ for points at the same distance, the distances cannot
+    np.testing.assert_allclose(distances, expected_distances)
+    offsets = points[positions] - queries[:, None, :]
+    np.testing.assert_allclose(np.hypot(offsets[..., 0], offsets[..., 1]), distances)
+
+
+def test_clustered_points():
+    # most points in one corner, a few far away: cells of very different fill
+    rng = np.random.default_rng(3)
+    points = np.concatenate([rng.normal(100, 5, size=(1000, 2)), rng.uniform(0, 10000, size=(50, 2))])
+    queries = random_points(2000, 4)
+    _, distances = PointGrid(points).nearest(queries, 5)
+    np.testing.assert_allclose(distances, brute_force_nearest(points, queries, 5)[1])
+
+
+def test_coincident_points():
+    # all points at the same place give a grid of one tiny cell
+    points = np.repeat([(500.0, 500.0)], 40, axis=0)
+    queries = random_points(500, 5)
+    positions, distances = PointGrid(points).nearest(queries, 2)
+    np.testing.assert_allclose(distances, brute_force_nearest(points, queries, 2)[1])
+    assert positions.max() < 40
+
+
+def test_within_matches_brute_force():
+    points = random_points(3000, 6)
+    queries = random_points(200, 7)
+    found = PointGrid(points).within(queries, 400)
+    expected = brute_force_within(points, queries, 400)
+    for query, (positions, distances), expected_distances in zip(queries, found, expected):
+        np.testing.assert_allclose(distances, expected_distances)
+        np.testing.assert_allclose(np.hypot(*(points[positions] - query).T), distances)
+
+
+def test_empty_queries():
+    grid = PointGrid(random_points(100, 8))
+    positions, distances = grid.nearest(np.empty((0, 2)), 3)
+    assert positions.shape == distances.shape == (0, 3)
+    assert grid.within(np.empty((0, 2)), 100) == []
+    assert grid.nearest([], 1)[0].shape == (0, 1)
+
+
+def test_no_points():
+    with pytest.raises(ValueError):
+        PointGrid(np.empty((0, 2)))
@@ -0,0 +1,106 @@
+# test_orthophoto.py
+# Checks the cache of the aerial image (muenster_tools/orthophoto.py) on a small
+# generated image: the pyramid levels, the windows that are read and when the
+# cache is built again. The first tests feed the image through a stand-in with
+# the GDAL dataset methods, the last one writes a real GeoTIFF and needs GDAL.
+#   python -m pytest tests
+
+import os
+import numpy as np
+import pytest
+
+from muenster_tools.orthophoto import Orthophoto
+
+WIDTH = 1000
+HEIGHT = 700
+PIXEL_SIZE = 0.5
+LEFT = 400000.0
+TOP = 5760000.0
+
+
+class ArrayDataset:
+    # This class reads a (bands, rows, columns) array like a GDAL dataset
+
+    def __init__(self, pixels):
+        self.pixels = pixels
+        self.RasterCount, self.RasterYSize, self.RasterXSize = pixels.shape
+
+    def ReadAsArray(self, column, row, columns, rows):
+        return self.pixels[:, row:row + rows, column:column + columns].copy()
+
+
+@pytest.fixture
+def image(tmp_path):
+    # This fixture writes the world file and a stand-in .tif and returns
+    # (tif path, (rows, columns, bands) pixels)
+    pixels = np.random.default_rng(0).integers(0, 256, size=(HEIGHT, WIDTH, 3), dtype=np.uint8)
+    tif_path = str(tmp_path / "image.tif")
+    with open(tif_path, "wb") as f:
+        f.write(b"stand-in")
+    with open(str(tmp_path / "image.tfw"), "w") as f:
+        f.write(f"{PIXEL_SIZE}\n0\n0\n{-PIXEL_SIZE}\n{LEFT + PIXEL_SIZE / 2}\n{TOP - PIXEL_SIZE / 2}\n")
+    return tif_path, pixels
+
+
+def build(tif_path, pixels, tmp_path):
+    # This function builds the cache from the pixels and returns the Orthophoto
+    photo = Orthophoto(tif_path, cache_folder=str(tmp_path / "cache"))
+    photo.build_cache(strip_rows=128, dataset=ArrayDataset(pixels.transpose(2, 0, 1)))
+    return photo
+
+
+def test_pyramid_levels(image, tmp_path):
+    tif_path, pixels = image
+    photo = build(tif_path, pixels, tmp_path)
+    assert photo.cache_is_current()
+    levels = photo._open_levels()
+    # 1000 -> 500 -> 250 pixels, the last level is below 256
+    assert [level.shape for level in levels] == [(700, 1000, 3), (350, 500, 3), (175, 250, 3)]
+    np.testing.assert_array_equal(levels[0], pixels)
+    np.testing.assert_array_equal(levels[1], pixels[::2, ::2])
+    np.testing.assert_array_equal(levels[2], pixels[::4, ::4])
+
+
+def test_read_window(image, tmp_path):
+    tif_path, pixels = image
+    photo = build(tif_path, pixels, tmp_path)
+    # columns 100..300 and rows 50..250 of the full image
+    bbox = (LEFT + 100 * PIXEL_SIZE, TOP - 250 * PIXEL_SIZE, LEFT + 300 * PIXEL_SIZE, TOP - 50 * PIXEL_SIZE)
+    window, extent = photo.read_window(bbox)
+    np.testing.assert_array_equal(window, pixels[50:250, 100:300])
+    np.testing.assert_allclose(extent, (bbox[0], bbox[2], bbox[1], bbox[3]))
+
+    # 200 pixels wide, so max_size=100 reads the level with half the pixels
+    window, extent = photo.read_window(bbox, max_size=100)
+    np.testing.assert_array_equal(window, pixels[50:250:2, 100:300:2])
+    np.testing.assert_allclose(extent, (bbox[0], bbox[2], bbox[1], bbox[3]))
+
+
+def test_window_outside_the_image(image, tmp_path):
+    tif_path, pixels = image
+    photo = build(tif_path, pixels, tmp_path)
+    window, _ = photo.read_window((LEFT - 100, TOP - 50, LEFT - 10, TOP))
+    assert window.size == 0
+
+
+def test_cache_is_rebuilt_when_the_image_changes(image, tmp_path):
+    tif_path, pixels = image
+    photo = build(tif_path, pixels, tmp_path)
+    with open(tif_path, "ab") as f:
+        f.write(b"changed")
+    assert not photo.cache_is_current()
+
+
+def test_build_cache_with_gdal(image, tmp_path):
+    gdal = pytest.importorskip("osgeo.gdal")
+    tif_path, pixels = image
+    os.remove(tif_path)
+    dataset = gdal.GetDriverByName("GTiff").Create(tif_path, WIDTH, HEIGHT, 3, gdal.GDT_Byte,
+                                                    options=["COMPRESS=DEFLATE"])
+    for band in range(3):
+        dataset.GetRasterBand(band + 1).WriteArray(pixels[:, :, band])
+    dataset = None
+
+    photo = Orthophoto(tif_path, cache_folder=str(tmp_path / "cache"))
+    photo.build_cache(strip_rows=128)
+    np.testing.assert_array_equal(photo._open_levels()[0], pixels)
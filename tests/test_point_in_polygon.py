@@ -0,0 +1,114 @@
+# test_point_in_polygon.py
+# Checks the vectorized point in polygon test (muenster_tools/point_in_polygon.py)
+# and the prepared polygons (muenster_tools/prepared_polygon.py) against shapely
+# (skipped without it), on a polygon with a hole, a multipart polygon and the
+# Muenster districts.
+#   python -m pytest tests
+
+import os
+import numpy as np
+import pytest
+
+from muenster_tools.point_in_polygon import (points_in_polygon, points_in_polygon_chunked,
+                                             points_in_polygons)
+from muenster_tools.prepared_polygon import PreparedPolygon
+from muenster_tools.shapefile_reader import ShapefileReader
+
+DATA_FOLDER = os.path.join(os.path.dirname(__file__), "..", "Muenster")
+
+# a square with a square hole, and a second part to the right of it
+SQUARE_WITH_HOLE = [np.array([(0, 0), (10, 0), (10, 10), (0, 10), (0, 0)], dtype=float),
+                    np.array([(3, 3), (7, 3), (7, 7), (3, 7), (3, 3)], dtype=float)]
+SECOND_PART = [np.array([(20, 0), (30, 5), (20, 10), (20, 0)], dtype=float)]
+
+
+def expected(rings_by_part, points):
+    # This function returns what shapely says for (multi)polygon rings; the
+    # first ring of every part is its outer ring
+    shapely = pytest.importorskip("shapely")
+    polygon = shapely.MultiPolygon([(rings[0], rings[1:]) for rings in rings_by_part])
+    return shapely.contains_xy(polygon, points[:, 0], points[:, 1])
+
+
+def random_points(bbox, count, seed=0):
+    # This function returns points in and a bit around bbox
+    xmin, ymin, xmax, ymax = bbox
+    margin = 0.1 * max(xmax - xmin, ymax - ymin)
+    return np.random.default_rng(seed).uniform((xmin - margin, ymin - margin),
+                                               (xmax + margin, ymax + margin), size=(count, 2))
+
+
+def districts():
+    # This function returns the rings of the Muenster districts
+    with ShapefileReader(os.path.join(DATA_FOLDER, "Muenster_City_Districts.shp")) as reader:
+        return [[np.array(ring) for ring in reader.rings(i)] for i in range(len(reader))]
+
+
+def test_hole_and_parts():
+    points = random_points((0, 0, 30, 10), 20000)
+    rings = SQUARE_WITH_HOLE + SECOND_PART
+    truth = expected([SQUARE_WITH_HOLE, SECOND_PART], points)
+    np.testing.assert_array_equal(points_in_polygon(points, rings), truth)
+    np.testing.assert_array_equal(PreparedPolygon(rings).contains_points(points), truth)
+    # small blocks give the same result
+    np.testing.assert_array_equal(points_in_polygon(points, rings, max_elements=100), truth)
+    np.testing.assert_array_equal(PreparedPolygon(rings).contains_points(points, max_elements=100), truth)
+
+
+def test_open_rings():
+    # rings without the closing point are closed by the test itself
+    points = random_points((0, 0, 10, 10), 5000)
+    closed = points_in_polygon(points, SQUARE_WITH_HOLE)
+    opened = points_in_polygon(points, [ring[:-1] for ring in SQUARE_WITH_HOLE])
+    np.testing.assert_array_equal(opened, closed)
+
+
+def test_chunked():
+    points = random_points((0, 0, 10, 10), 10000)
+    chunks = list(points_in_polygon_chunked(points, SQUARE_WITH_HOLE, chunk_size=999))
+    assert len(chunks) == 11
+    np.testing.assert_array_equal(np.concatenate(chunks), points_in_polygon(points, SQUARE_WITH_HOLE))
+
+
+def test_empty_input():
+    empty = np.empty((0, 2))
+    assert points_in_polygon(empty, SQUARE_WITH_HOLE).shape == (0,)
+    assert PreparedPolygon(SQUARE_WITH_HOLE).contains_points(empty).shape == (0,)
+    assert points_in_polygons(empty, [SQUARE_WITH_HOLE]).shape == (0,)
+    # a polygon without rings contains nothing
+    assert not points_in_polygon([(1, 1)], []).any()
+    assert not PreparedPolygon([]).contains_points([(1, 1)]).any()
+
+
+def test_degenerate_rings():
+    # rings with fewer than 3 points and horizontal edges are skipped
+    rings = [np.array([(0, 0), (1, 1)], dtype=float),
+             np.array([(0, 0), (4, 0), (4, 4), (0, 4), (0, 0)], dtype=float)]
+    prepared = PreparedPolygon(rings)
+    assert prepared.contains_point(2, 2)
+    assert not prepared.contains_point(5, 2)
+
+
+def test_muenster_districts():
+    shapely = pytest.importorskip("shapely")
+    polygons = districts()
+    points = random_points((395000, 5744000, 416000, 5769000), 20000, seed=1)
+    owner = points_in_polygons(points, polygons)
+    for p, rings in enumerate(polygons[:10]):
+        # the parts and holes of a district are not told apart in the shapefile,
+        # the even-odd rule of shapely on all rings together gives the same answer
+        polygon = shapely.Polygon(rings[0])
+        for ring in rings[1:]:
+            polygon = polygon.symmetric_difference(shapely.Polygon(ring))
+        truth = shapely.contains_xy(polygon, points[:, 0], points[:, 1])
+        np.testing.assert_array_equal(points_in_polygon(points, rings), truth)
+        np.testing.assert_array_equal(PreparedPolygon(rings).contains_points(points), truth)
+        # the districts do not overlap, so the first district that contains a point is its own
+        np.testing.assert_array_equal(owner == p, truth)
+    # every point inside the city belongs to exactly one district
+    inside_any = np.zeros(len(points), dtype=bool)
+    for rings in polygons:
+        inside = points_in_polygon(points, rings)
+        assert not (inside & inside_any).any()
+        inside_any |= inside
+    np.testing.assert_array_equal(owner >= 0, inside_any)
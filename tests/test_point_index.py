@@ -0,0 +1,61 @@
+# test_point_index.py
+# Checks the bounding box grid (GridIndex in muenster_tools/point_index.py)
+# against checking every box, also for an empty index and a one point index
+# queried with a district sized box.
+#   python -m pytest tests
+
+import time
+import numpy as np
+import pytest
+
+from muenster_tools.point_index import GridIndex
+
+
+def random_boxes(count, seed, largest=0.0):
+    # This function returns count boxes of up to largest metres in a 10 km square
+    rng = np.random.default_rng(seed)
+    corners = rng.uniform(0, 10000, size=(count, 2))
+    sizes = rng.uniform(0, largest, size=(count, 2))
+    return [(x, y, x + w, y + h) for (x, y), (w, h) in zip(corners.tolist(), sizes.tolist())]
+
+
+def brute_force(boxes, bbox, within=False):
+    # This function checks every box
+    qxmin, qymin, qxmax, qymax = bbox
+    if within:
+        return [i for i, b in enumerate(boxes)
+                if b[0] >= qxmin and b[1] >= qymin and b[2] <= qxmax and b[3] <= qymax]
+    return [i for i, b in enumerate(boxes)
+            if b[0] <= qxmax and b[2] >= qxmin and b[1] <= qymax and b[3] >= qymin]
+
+
+@pytest.mark.parametrize("largest", [0.0, 300.0])
+@pytest.mark.parametrize("within", [False, True])
+def test_query_matches_brute_force(largest, within):
+    boxes = random_boxes(3000, 1, largest)
+    index = GridIndex(boxes)
+    for bbox in random_boxes(100, 2, 2000.0) + [(-5000, -5000, 20000, 20000), (20000, 0, 30000, 10)]:
+        assert index.query(bbox, within) == brute_force(boxes, bbox, within)
+
+
+def test_given_cell_size():
+    boxes = random_boxes(500, 3, 50.0)
+    index = GridIndex(boxes, cell_size=17.0)
+    bbox = (2000, 2000, 6000, 5000)
+    assert index.query(bbox) == brute_force(boxes, bbox)
+
+
+def test_empty_index():
+    index = GridIndex([])
+    assert len(index) == 0
+    assert index.query((0, 0, 100, 100)) == []
+
+
+def test_one_point_with_a_large_box():
+    # the cells of a one point index are 2 m wide; a district sized box must
+    # only visit the occupied cell
+    index = GridIndex([(400000.0, 5755000.0, 400000.0, 5755000.0)])
+    start = time.perf_counter()
+    assert index.query((395000, 5744000, 416000, 5769000)) == [0]
+    assert index.query((395000, 5744000, 399000, 5769000)) == []
+    assert time.perf_counter() - start < 0.5
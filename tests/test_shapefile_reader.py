@@ -0,0 +1,169 @@
+# test_shapefile_reader.py
+# Checks the shapefile reader without QGIS (muenster_tools/shapefile_reader.py)
+# on small shapefiles written by the test itself and on the Muenster data:
+# geometries, the decoding of the .dbf columns, deleted records and the .cpg
+# encodings.
+#   python -m pytest tests
+
+import os
+import struct
+import numpy as np
+import pytest
+
+from muenster_tools.shapefile_reader import ShapefileReader, _cpg_codec
+
+DATA_FOLDER = os.path.join(os.path.dirname(__file__), "..", "Muenster")
+
+
+def write_points(base, points):
+    # This function writes a point .shp and .shx; None in points is a null shape
+    records = []
+    for point in points:
+        if point is None:
+            records.append(struct.pack("<i", 0))
+        else:
+            records.append(struct.pack("<i2d", 1, *point))
+    xy = np.array([p for p in points if p is not None], dtype=float)
+    bbox = (*xy.min(axis=0), *xy.max(axis=0))
+
+    def header(length):
+        return (struct.pack(">7i", 9994, 0, 0, 0, 0, 0, length // 2)
+                + struct.pack("<2i4d4d", 1000, 1, *bbox, 0, 0, 0, 0))
+
+    body = b""
+    index = b""
+    offset = 100
+    for number, content in enumerate(records, start=1):
+        body += struct.pack(">2i", number, len(content) // 2) + content
+        index += struct.pack(">2i", offset // 2, len(content) // 2)
+        offset += 8 + len(content)
+    with open(base + ".shp", "wb") as f:
+        f.write(header(100 + len(body)) + body)
+    with open(base + ".shx", "wb") as f:
+        f.write(header(100 + len(index)) + index)
+
+
+def write_dbf(base, fields, rows, deleted=()):
+    # This function writes a .dbf; fields is a list of (name, type, length,
+    # decimals), rows a list of lists of already formatted byte strings
+    record_length = 1 + sum(length for _, _, length, _ in fields)
+    header_length = 32 + 32 * len(fields) + 1
+    data = struct.pack("<B3BIHH20x", 3, 124, 1, 1, len(rows), header_length, record_length)
+    for name, field_type, length, decimals in fields:
+        data += struct.pack("<11sc4xBB14x", name.encode("ascii"), field_type.encode("ascii"),
+                            length, decimals)
+    data += b"\r"
+    for i, row in enumerate(rows):
+        data += b"*" if i in deleted else b" "
+        for value, (_, field_type, length, _) in zip(row, fields):
+            data += value.rjust(length) if field_type in "NF" else value.ljust(length)
+    with open(base + ".dbf", "wb") as f:
+        f.write(data + b"\x1a")
+
+
+@pytest.fixture
+def points_layer(tmp_path):
+    # This fixture writes a layer of four points (the third one a null shape)
+    # with a text, an integer, a float with an empty value and a logical field
+    base = str(tmp_path / "points")
+    write_points(base, [(1.0, 2.0), (3.0, 4.0), None, (5.0, 6.0)])
+    fields = [("Name", "C", 10, 0), ("Count", "N", 5, 0), ("Share", "N", 8, 2), ("Open", "L", 1, 0)]
+    rows = [[b"Aasee", b"3", b"0.50", b"T"],
+            [b"M\xfcnster", b"12", b"", b"F"],
+            [b"Null", b"0", b"1.25", b"?"],
+            [b"Zoo", b"7", b"2.00", b"Y"]]
+    write_dbf(base, fields, rows, deleted={1})
+    return base
+
+
+def test_points_and_null_shapes(points_layer):
+    with ShapefileReader(points_layer) as reader:
+        assert len(reader) == 4
+        assert reader.bbox == (1.0, 2.0, 5.0, 6.0)
+        points = reader.points()
+        np.testing.assert_array_equal(points[[0, 1, 3]], [(1, 2), (3, 4), (5, 6)])
+        assert np.isnan(points[2]).all()
+        assert reader.record_bbox(1) == (3.0, 4.0, 3.0, 4.0)
+        assert reader.record_points(2).shape == (0, 2)
+
+
+def test_columns(points_layer):
+    with ShapefileReader(points_layer) as reader:
+        assert reader.fields == ["Name", "Count", "Share", "Open"]
+        # without a .cpg the text is latin-1
+        assert reader.column("Name") == ["Aasee", "Münster", "Null", "Zoo"]
+        count = reader.column("Count")
+        assert count.dtype == np.int64
+        np.testing.assert_array_equal(count, [3, 12, 0, 7])
+        share = reader.column("Share")
+        np.testing.assert_array_equal(share[[0, 2, 3]], [0.5, 1.25, 2.0])
+        assert np.isnan(share[1])
+        np.testing.assert_array_equal(reader.column("Open"), [True, False, False, True])
+
+
+def test_value_agrees_with_column(points_layer):
+    # value() decodes a single cell without the column, it must give the same
+    with ShapefileReader(points_layer) as reader:
+        values = [reader.record(i) for i in range(len(reader))]
+    with ShapefileReader(points_layer) as reader:
+        for name in reader.fields:
+            column = reader.column(name)
+            for i, record in enumerate(values):
+                if isinstance(column[i], float) and np.isnan(column[i]):
+                    assert np.isnan(record[name])
+                else:
+                    assert record[name] == column[i]
+
+
+def test_deleted_records(points_layer):
+    with ShapefileReader(points_layer) as reader:
+        np.testing.assert_array_equal(reader.deleted(), [False, True, False, False])
+        # one value per record by default, so the columns line up with the geometries
+        assert len(reader.column("Name")) == 4
+        assert reader.column("Name", skip_deleted=True) == ["Aasee", "Null", "Zoo"]
+        np.testing.assert_array_equal(reader.column("Count", skip_deleted=True), [3, 0, 7])
+
+
+def test_type_o_fields_are_rejected(tmp_path):
+    base = str(tmp_path / "binary")
+    write_points(base, [(0.0, 0.0)])
+    write_dbf(base, [("Value", "O", 8, 0)], [[struct.pack("<d", 1.5)]])
+    with ShapefileReader(base) as reader:
+        with pytest.raises(ValueError):
+            reader.column("Value")
+        with pytest.raises(ValueError):
+            reader.value(0, "Value")
+
+
+@pytest.mark.parametrize("text, codec", [
+    ("UTF-8", "utf-8"),
+    ("ANSI 1252", "cp1252"),
+    ("1252", "cp1252"),
+    ("88591", "iso8859-1"),
+    ("885915", "iso8859-15"),
+    ("something else", "latin-1"),
+])
+def test_cpg_codecs(text, codec):
+    assert _cpg_codec(text) == codec
+
+
+def test_cpg_is_used(points_layer):
+    with open(points_layer + ".cpg", "w") as f:
+        f.write("ANSI 1252")
+    with ShapefileReader(points_layer) as reader:
+        assert reader.encoding == "cp1252"
+        assert reader.column("Name")[1] == "Münster"
+
+
+def test_muenster_districts():
+    shapely = pytest.importorskip("shapely")
+    with ShapefileReader(os.path.join(DATA_FOLDER, "Muenster_City_Districts.shp")) as reader:
+        assert len(reader) == len(reader.column("Name")) == 45
+        for i in range(len(reader)):
+            rings = reader.rings(i)
+            xmin, ymin, xmax, ymax = reader.record_bbox(i)
+            points = np.concatenate(rings)
+            assert points[:, 0].min() == xmin and points[:, 1].max() == ymax
+            # every ring is closed, like the specification asks
+            assert all(np.array_equal(ring[0], ring[-1]) for ring in rings)
+            assert all(shapely.LinearRing(ring).is_valid for ring in rings)
@@ -0,0 +1,99 @@
+# test_spatial_index_files.py
+# Checks the readers of the .qix and .sbn spatial index files and the .qix
+# writer (muenster_tools/spatial_index_files.py): queries through an index must
+# find the same records as checking the bounding box of every record, and an
+# index must be used or rebuilt depending on its contents, not its file time.
+#   python -m pytest tests
+
+import os
+import shutil
+import numpy as np
+import pytest
+
+from muenster_tools.shapefile_reader import ShapefileReader
+from muenster_tools.spatial_index_files import (QixIndex, SbnIndex, build_qix, qix_cache_path,
+                                                query_records, shipped_index, spatial_index)
+
+DATA_FOLDER = os.path.join(os.path.dirname(__file__), "..", "Muenster")
+
+
+def copy_layer(name, folder, extensions=(".shp", ".shx", ".dbf", ".cpg", ".sbn", ".sbx", ".qix")):
+    # This function copies the files of a shapefile into folder and returns the new base path
+    for extension in extensions:
+        source = os.path.join(DATA_FOLDER, name + extension)
+        if os.path.exists(source):
+            shutil.copy(source, folder)
+    return os.path.join(str(folder), name)
+
+
+def scan(reader, bbox):
+    # This function finds the records by reading the bounding box of every record
+    xmin, ymin, xmax, ymax = bbox
+    b = reader.bboxes()
+    return np.flatnonzero((b[:, 0] <= xmax) & (b[:, 2] >= xmin) & (b[:, 1] <= ymax) & (b[:, 3] >= ymin))
+
+
+def boxes(count=50, size=800):
+    # This function returns query boxes spread over the city
+    corners = np.random.default_rng(0).uniform((395000, 5744000), (415000, 5768000), size=(count, 2))
+    return [(x, y, x + size, y + size) for x, y in corners]
+
+
+@pytest.mark.parametrize("name, index_class", [
+    ("Schools", QixIndex),
+    ("Muenster_Parcels", SbnIndex),
+    ("House_Numbers", SbnIndex),
+])
+def test_shipped_index_finds_the_same_records(name, index_class, tmp_path):
+    base = copy_layer(name, tmp_path)
+    with ShapefileReader(base) as reader:
+        index = spatial_index(reader, build=False)
+        assert isinstance(index, index_class)
+        for bbox in boxes():
+            np.testing.assert_array_equal(query_records(reader, bbox, index), scan(reader, bbox))
+
+
+def test_index_older_than_the_shp_is_used(tmp_path):
+    # a fresh git clone writes the files in path order, the .sbn then looks older
+    base = copy_layer("Muenster_Parcels", tmp_path)
+    os.utime(base + ".sbn", (0, 0))
+    with ShapefileReader(base) as reader:
+        assert isinstance(shipped_index(reader), SbnIndex)
+        spatial_index(reader)
+    assert not os.path.exists(base + ".qix")
+    assert not os.path.exists(base + ".cache.qix")
+
+
+def test_index_of_other_records_is_not_used(tmp_path):
+    # the .sbn of the districts next to the parcels: other records, other extent
+    base = copy_layer("Muenster_Parcels", tmp_path, (".shp", ".shx", ".dbf"))
+    shutil.copy(os.path.join(DATA_FOLDER, "Muenster_City_Districts.sbn"), base + ".sbn")
+    with ShapefileReader(base) as reader:
+        assert shipped_index(reader) is None
+        assert spatial_index(reader, build=False) is None
+
+
+def test_built_qix_goes_to_the_cache(tmp_path):
+    base = copy_layer("Muenster_Parcels", tmp_path, (".shp", ".shx", ".dbf"))
+    with ShapefileReader(base) as reader:
+        index = spatial_index(reader)
+        assert isinstance(index, QixIndex)
+        assert os.path.exists(qix_cache_path(reader))
+        assert not os.path.exists(base + ".qix")
+        for bbox in boxes():
+            np.testing.assert_array_equal(query_records(reader, bbox, index), scan(reader, bbox))
+        # the next call reads the built file instead of building it again
+        modified = os.path.getmtime(qix_cache_path(reader))
+        assert isinstance(spatial_index(reader, build=False), QixIndex)
+        assert os.path.getmtime(qix_cache_path(reader)) == modified
+
+
+def test_build_qix_of_points(tmp_path):
+    base = copy_layer("House_Numbers", tmp_path, (".shp", ".shx"))
+    with ShapefileReader(base) as reader:
+        index = QixIndex(build_qix(reader, str(tmp_path / "points.qix")))
+        assert index.shape_count == len(reader)
+        for bbox in boxes(size=300):
+            np.testing.assert_array_equal(query_records(reader, bbox, index), scan(reader, bbox))
+        # a box outside the city finds nothing
+        assert len(query_records(reader, (0, 0, 10, 10), index)) == 0